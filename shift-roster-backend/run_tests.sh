@@ -7,6 +7,12 @@ set -e
 echo "Seeding the database for test..."
 python run_seed.py
 
+# Script tests; each seeds its own temporary database (see tests/support.py)
+for test in tests/test_*.py; do
+    echo "Running $test..."
+    python "$test"
+done
+
 # Start the server in the background
 echo "Starting server..."
 python src/main.py > server.log 2>&1 &
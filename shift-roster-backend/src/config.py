@@ -1,6 +1,10 @@
 import os
+import tempfile
 from datetime import timedelta
 
+def _env_flag(name, default):
+    return os.environ.get(name, default).lower() in ('1', 'true', 'yes')
+
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'your-secret-key-change-in-production'
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
@@ -10,6 +14,18 @@ class Config:
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'jwt-secret-string-change-in-production'
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
+    # Embed role name + permission bitmask in access tokens so role/permission
+    # checks can skip the database. Stale tokens (role version changed) fall
+    # back to a database lookup. Limits:
+    # - Checks trust the token, not the users row. Editing a role, changing a
+    #   user's role or deleting an employee bumps the role version, which
+    #   makes every token issued for that role fall back. Any other change to
+    #   a user does not take effect until the token expires.
+    # - A bump is seen at once by the worker that made it, and by other
+    #   worker processes within ROLE_VERSION_TTL seconds.
+    JWT_ROLE_CLAIMS = os.environ.get('JWT_ROLE_CLAIMS', '').lower() in ('1', 'true', 'yes')
+    # How long (seconds) a worker trusts its cached role versions before re-reading them
+    ROLE_VERSION_TTL = int(os.environ.get('ROLE_VERSION_TTL', 30))
     
     # Google OAuth Configuration
     GOOGLE_CLIENT_ID = os.environ.get('GOOGLE_CLIENT_ID')
@@ -33,11 +49,72 @@ class Config:
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     UPLOAD_FOLDER = os.path.join(os.path.dirname(__file__), 'uploads')
 
+    # What roster writes do when the employee is already scheduled that day:
+    # 'error' (reject), 'skip' (keep existing) or 'replace' (overwrite).
+    # Requests to /api/roster and /api/roster/bulk can override it with "on_conflict".
+    ROSTER_CONFLICT_POLICY = os.environ.get('ROSTER_CONFLICT_POLICY', 'error')
+
+    # Background export jobs (/api/export/jobs)
+    EXPORT_JOB_DIR = os.environ.get('EXPORT_JOB_DIR') or os.path.join(tempfile.gettempdir(), 'shift-roster-exports')
+    EXPORT_JOB_WORKERS = int(os.environ.get('EXPORT_JOB_WORKERS', 2))
+    EXPORT_JOB_TTL = int(os.environ.get('EXPORT_JOB_TTL', 3600))  # seconds a finished artifact is kept
+    # Seconds after which a job still queued or running is treated as abandoned (e.g. its worker died)
+    EXPORT_JOB_STALE_AFTER = int(os.environ.get('EXPORT_JOB_STALE_AFTER', 6 * 3600))
+
+    # Analytics response cache: 'local' (per process), 'shared' (Redis at
+    # ANALYTICS_CACHE_URL; 'memory://' for an in-process stand-in) or 'none'
+    ANALYTICS_CACHE_BACKEND = os.environ.get('ANALYTICS_CACHE_BACKEND', 'local')
+    ANALYTICS_CACHE_URL = os.environ.get('ANALYTICS_CACHE_URL')
+    ANALYTICS_CACHE_TTL = int(os.environ.get('ANALYTICS_CACHE_TTL', 300))  # seconds
+    ANALYTICS_CACHE_MAXSIZE = int(os.environ.get('ANALYTICS_CACHE_MAXSIZE', 512))  # entries (local backend)
+
+    # Seconds before each process fully reloads its in-memory leave calendar
+    # (its own commits refresh it immediately; this bounds staleness across workers)
+    LEAVE_CALENDAR_TTL = int(os.environ.get('LEAVE_CALENDAR_TTL', 300))
+
+    # JSON encoder for responses: 'auto' (orjson if installed), 'orjson' or 'stdlib'
+    JSON_BACKEND = os.environ.get('JSON_BACKEND', 'auto')
+
+    # Compress text responses of at least this many bytes (brotli if installed, else gzip)
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+    COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', 6))  # gzip, 1-9
+    COMPRESS_BR_LEVEL = int(os.environ.get('COMPRESS_BR_LEVEL', 4))  # brotli, 0-11
+
+    # Logging: level, and whether records are handed to a background thread
+    # (QueueHandler) instead of being written by the request thread
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'DEBUG')
+    LOG_BUFFERED = _env_flag('LOG_BUFFERED', 'false')
+
+    # Connection pool (see src/models/engine.py). None keeps SQLAlchemy's defaults.
+    DB_POOL_SIZE = None
+    DB_MAX_OVERFLOW = None
+    DB_POOL_TIMEOUT = None
+    DB_POOL_RECYCLE = None  # seconds; server-side databases only
+    DB_POOL_PRE_PING = False  # server-side databases only
+
+    # PRAGMAs applied to every new SQLite connection: a profile from
+    # SQLITE_PRAGMA_PROFILES ('tuned' or 'none'), plus per-PRAGMA overrides
+    SQLITE_PRAGMA_PROFILE = os.environ.get('SQLITE_PRAGMA_PROFILE', 'tuned')
+    SQLITE_PRAGMAS = {}
+
 class DevelopmentConfig(Config):
     DEBUG = True
+    PROPAGATE_EXCEPTIONS = True
 
 class ProductionConfig(Config):
     DEBUG = False
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+    LOG_BUFFERED = _env_flag('LOG_BUFFERED', 'true')
+
+    # Sized for a few gunicorn workers per host, each with its own pool
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 20))
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 30))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    DB_POOL_PRE_PING = _env_flag('DB_POOL_PRE_PING', 'true')
+
+    # Export artifacts contain employee data; no default under the shared temp dir
+    EXPORT_JOB_DIR = os.environ.get('EXPORT_JOB_DIR')
 
 config = {
     'development': DevelopmentConfig,
@@ -10,22 +10,36 @@ from flask_jwt_extended import JWTManager
 from src.models.models import db
 from src.routes.user import user_bp
 from src.config import config
-import logging
+from src.utils.json_provider import FastJSONProvider
+from src.utils.http_cache import init_http_cache
+from src.utils.log_config import configure_logging
+from src.models.engine import engine_options, install_sqlite_pragmas, release_startup_connections, sqlite_pragmas
 
-logging.basicConfig(level=logging.DEBUG)
-
-def create_app():
+def create_app(config_name=None):
     # Load env vars from .env if present (dev convenience)
     load_dotenv()
     app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
     
-    # Load configuration
-    app.config.from_object(config['development'])
-    app.config['DEBUG'] = True
-    app.config['PROPAGATE_EXCEPTIONS'] = True
+    # Load configuration: FLASK_ENV=production selects the production profile
+    config_name = config_name or os.environ.get('FLASK_ENV') or 'default'
+    if config_name not in config:
+        raise ValueError(f"Unknown configuration '{config_name}'. Use one of: {', '.join(config)}")
+    app.config.from_object(config[config_name])
+    if not app.config.get('EXPORT_JOB_DIR'):
+        raise ValueError('EXPORT_JOB_DIR must be set to a directory for export job files')
+    configure_logging(app.config)
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config))
+
+    # orjson-backed JSON responses with native date/datetime/Decimal encoding
+    app.json = FastJSONProvider(app, backend=app.config.get('JSON_BACKEND', 'auto'))
+
+    # gzip/brotli for large responses; ETags come from per-table change counters
+    init_http_cache(app)
 
     # Initialize extensions
     db.init_app(app)
+    with app.app_context():
+        install_sqlite_pragmas(db.engine, sqlite_pragmas(app.config))
     jwt = JWTManager(app)
 
     # JWT error handlers to normalize responses
@@ -93,6 +107,7 @@ def create_app():
     from src.routes.licenses import licenses_bp
     from src.routes.leave import leave_bp
     from src.routes.reports import reports_bp
+    from src.routes.import_data import import_bp
     from src.routes.designations import designations_bp
     from src.routes.community import community_bp
 
@@ -108,6 +123,17 @@ def create_app():
     app.register_blueprint(timesheets_bp, url_prefix='/api/timesheets')
     app.register_blueprint(licenses_bp, url_prefix='/api/licenses')
     app.register_blueprint(leave_bp, url_prefix='/api/leave')
+    app.register_blueprint(reports_bp, url_prefix='/api/reports')
+    app.register_blueprint(import_bp, url_prefix='/api/import')
+
+    # CLI: flask --app src.main index-advisor | rollup-rebuild | leave-recompute
+    from src.utils.index_advisor import index_advisor_command
+    from src.models.rollups import rollup_rebuild_command, rollups_missing
+    from src.utils.leave_ledger import leave_recompute_command, ledger_missing, recompute_balances, years_with_leave
+    from src.utils.roster_writes import duplicate_roster_pairs, get_leave_shift_id, has_roster_unique_index
+    app.cli.add_command(index_advisor_command)
+    app.cli.add_command(rollup_rebuild_command)
+    app.cli.add_command(leave_recompute_command)
 
     # Create database tables and apply lightweight migrations
     with app.app_context():
@@ -124,6 +150,9 @@ def create_app():
                     alter_stmts.append("ALTER TABLE users ADD COLUMN alt_contact_name VARCHAR(100)")
                 if 'alt_contact_no' not in col_names:
                     alter_stmts.append("ALTER TABLE users ADD COLUMN alt_contact_no VARCHAR(20)")
+                role_cols = conn.execute(text("PRAGMA table_info(roles)")).fetchall()
+                if 'version' not in {c[1] for c in role_cols}:
+                    alter_stmts.append("ALTER TABLE roles ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
                 # ...existing code...
                 for stmt in alter_stmts:
                     try:
@@ -135,9 +164,70 @@ def create_app():
                 conn.execute(text("CREATE TABLE IF NOT EXISTS licenses (id INTEGER PRIMARY KEY, name VARCHAR(100) UNIQUE NOT NULL, description TEXT, created_at DATETIME)"))
                 # Ensure employee_licenses table exists
                 conn.execute(text("CREATE TABLE IF NOT EXISTS employee_licenses (id INTEGER PRIMARY KEY, employee_id INTEGER NOT NULL, license_id INTEGER NOT NULL, expiry_date DATE, created_at DATETIME, FOREIGN KEY(employee_id) REFERENCES users(id), FOREIGN KEY(license_id) REFERENCES licenses(id))"))
+
+                # Indexes added after the initial schema (no-ops once present)
+                index_stmts = [
+                    "CREATE UNIQUE INDEX IF NOT EXISTS uq_timesheets_roster_id ON timesheets (roster_id)",
+                    "CREATE UNIQUE INDEX IF NOT EXISTS uq_shift_roster_employee_date ON shift_roster (employee_id, date)",
+                    "CREATE INDEX IF NOT EXISTS ix_shift_roster_date_status ON shift_roster (date, status)",
+                    "CREATE INDEX IF NOT EXISTS ix_shift_roster_shift_date ON shift_roster (shift_id, date)",
+                    "CREATE INDEX IF NOT EXISTS ix_timesheets_date ON timesheets (date)",
+                    "CREATE INDEX IF NOT EXISTS ix_timesheets_employee_date ON timesheets (employee_id, date)",
+                    "CREATE INDEX IF NOT EXISTS ix_leave_requests_employee_status ON leave_requests (employee_id, status)",
+                    "CREATE INDEX IF NOT EXISTS ix_leave_requests_start_end ON leave_requests (start_date, end_date)",
+                    "CREATE INDEX IF NOT EXISTS ix_activity_logs_timestamp ON activity_logs (timestamp)",
+                ]
+                for stmt in index_stmts:
+                    try:
+                        conn.execute(text(stmt))
+                    except Exception as e:
+                        # e.g. existing duplicate rows; leave the table as is and report it
+                        app.logger.warning(f'Could not apply "{stmt}": {e}')
         except Exception:
             # Best-effort; ignore if migration check fails
             pass
+
+        # Roster writes upsert against the (employee_id, date) index; without it
+        # (existing duplicates) they fall back to read-then-write
+        try:
+            if not has_roster_unique_index():
+                app.logger.error(
+                    'shift_roster has no unique (employee_id, date) index: '
+                    f'{duplicate_roster_pairs()} employee/date pairs are scheduled more than once. '
+                    'Roster writes use the slower read-then-write path and are not protected '
+                    'against concurrent double booking. Remove the duplicates and restart.'
+                )
+        except Exception as e:
+            app.logger.warning(f'Could not check the roster index: {e}')
+
+        # Rebuilding rollups rewrites the whole table, so it is not done by
+        # every worker at startup; an upgraded database needs the CLI once
+        try:
+            if rollups_missing():
+                app.logger.warning(
+                    'Dashboard rollups are empty while roster data exists; dashboard totals '
+                    'read as zero until `flask --app src.main rollup-rebuild` is run.'
+                )
+        except Exception as e:
+            app.logger.warning(f'Could not check dashboard rollups: {e}')
+
+        # Open leave balances from the existing leave history on first run
+        try:
+            if ledger_missing():
+                for leave_year in years_with_leave():
+                    recompute_balances(leave_year)
+                db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            app.logger.warning(f'Could not build leave balances: {e}')
+
+        # Look up the 'On Leave' shift once; leave authorisation reuses the id
+        try:
+            get_leave_shift_id()
+        except Exception as e:
+            app.logger.warning(f'Could not load the On Leave shift: {e}')
+
+        release_startup_connections(db.engine)
     
     @app.route('/', defaults={'path': ''})
     @app.route('/<path:path>')
@@ -161,9 +251,7 @@ def create_app():
     
     @app.errorhandler(Exception)
     def handle_exception(e):
-        import traceback
-        print("Exception occurred:", e)
-        traceback.print_exc()
+        app.logger.exception(f'Unhandled exception: {e}')
         return {"error": str(e)}, 500
 
     return app
@@ -171,5 +259,5 @@ def create_app():
 app = create_app()
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5001, debug=True)
+    app.run(host='0.0.0.0', port=5001, debug=app.debug)
 
@@ -0,0 +1,85 @@
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+# Engine setup per configuration profile.
+#
+# engine_options() turns the DB_POOL_* settings into SQLALCHEMY_ENGINE_OPTIONS
+# (read by Flask-SQLAlchemy when the engine is created). Server databases get
+# a sized QueuePool with pre-ping and recycling, so connections dropped by the
+# server or a proxy are replaced instead of failing a request. File-based
+# SQLite keeps its pooled connections open and reuses them; in-memory SQLite
+# is left to SQLAlchemy's defaults. install_sqlite_pragmas() applies the
+# SQLite PRAGMA profile (sqlite_pragmas()) to each new SQLite connection.
+
+# SQLITE_PRAGMA_PROFILE values. 'tuned' lets readers and the writer run
+# concurrently: WAL journal (readers see the last commit instead of blocking
+# on the writer), fsync only at checkpoints, and a busy timeout so competing
+# writers queue instead of failing with "database is locked".
+#
+# foreign_keys is deliberately left off: existing databases predate it and
+# the delete routes do not yet remove or check every child table (leave
+# ledger and balances, activity logs, employee licenses), so deletes that
+# work today would fail. Opt in with SQLITE_PRAGMAS = {'foreign_keys': 'ON'}.
+SQLITE_PRAGMA_PROFILES = {
+    'tuned': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 10000,  # ms
+        'mmap_size': 256 * 1024 * 1024,  # bytes
+        'cache_size': -20000,  # negative: KiB per connection
+        'temp_store': 'MEMORY',
+    },
+    'none': {},
+}
+
+def _is_sqlite(url):
+    return make_url(url).get_backend_name() == 'sqlite'
+
+def _is_sqlite_memory(url):
+    database = make_url(url).database
+    return not database or database == ':memory:' or database.startswith('file::memory:')
+
+def engine_options(config):
+    """SQLALCHEMY_ENGINE_OPTIONS for the configured database and pool settings."""
+    url = config['SQLALCHEMY_DATABASE_URI']
+    sqlite = _is_sqlite(url)
+    if sqlite and _is_sqlite_memory(url):
+        return {}
+    options = {
+        'pool_size': config.get('DB_POOL_SIZE'),
+        'max_overflow': config.get('DB_MAX_OVERFLOW'),
+        'pool_timeout': config.get('DB_POOL_TIMEOUT'),
+    }
+    if not sqlite:
+        options['pool_recycle'] = config.get('DB_POOL_RECYCLE')
+        options['pool_pre_ping'] = config.get('DB_POOL_PRE_PING') or None
+    return {key: value for key, value in options.items() if value is not None}
+
+def sqlite_pragmas(config):
+    """PRAGMAs for SQLITE_PRAGMA_PROFILE, with SQLITE_PRAGMAS overriding individual entries."""
+    profile = config.get('SQLITE_PRAGMA_PROFILE', 'tuned')
+    if profile not in SQLITE_PRAGMA_PROFILES:
+        raise ValueError(f"SQLITE_PRAGMA_PROFILE must be one of: {', '.join(SQLITE_PRAGMA_PROFILES)}")
+    return {**SQLITE_PRAGMA_PROFILES[profile], **(config.get('SQLITE_PRAGMAS') or {})}
+
+def install_sqlite_pragmas(engine, pragmas):
+    """Run PRAGMA <name> = <value> on every new connection of a SQLite engine."""
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+    statements = [f'PRAGMA {name} = {value}' for name, value in pragmas.items()]
+
+    @event.listens_for(engine, 'connect')
+    def _apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+def release_startup_connections(engine):
+    """Close the pool's connections after startup work so forked workers (gunicorn --preload) open their own."""
+    if engine.dialect.name == 'sqlite' and _is_sqlite_memory(engine.url):
+        # Closing them would discard the in-memory database
+        return
+    engine.dispose()
@@ -0,0 +1,68 @@
+from sqlalchemy.orm import joinedload, selectinload
+from src.models.models import User, ShiftRoster, Timesheet, EmployeeLicense
+
+# Shared eager-loading options for roster/timesheet read paths.
+# Every relationship touched by ShiftRoster.to_dict() / Timesheet.to_dict()
+# (and by the export routes) is loaded up front, so a listing runs a fixed
+# number of queries no matter how many rows it returns.
+
+
+def _employee_options(rel):
+    """Employee relationship plus the role/area it is serialized with.
+
+    User.skills is mapped lazy='subquery'; roster payloads never use it,
+    so it is switched back to lazy loading here to avoid the extra query.
+    """
+    return (
+        joinedload(rel).joinedload(User.role_ref),
+        joinedload(rel).joinedload(User.area_ref),
+        joinedload(rel).lazyload(User.skills),
+    )
+
+
+def roster_options(include_timesheets=True):
+    """Loader options for ShiftRoster queries.
+
+    include_timesheets -- also load the roster's timesheets (needed by
+    ShiftRoster.to_dict(); exports can skip it).
+    """
+    options = [
+        *_employee_options(ShiftRoster.employee),
+        joinedload(ShiftRoster.shift),
+        joinedload(ShiftRoster.area),
+        joinedload(ShiftRoster.approver).lazyload(User.skills),
+    ]
+    if include_timesheets:
+        options.append(
+            selectinload(ShiftRoster.timesheets).options(
+                joinedload(Timesheet.timesheet_approver).lazyload(User.skills),
+            )
+        )
+    return options
+
+
+def timesheet_options():
+    """Loader options for Timesheet queries (including the roster's shift)."""
+    return [
+        joinedload(Timesheet.employee).lazyload(User.skills),
+        joinedload(Timesheet.timesheet_approver).lazyload(User.skills),
+        joinedload(Timesheet.roster).joinedload(ShiftRoster.shift),
+    ]
+
+
+def employee_options():
+    """Loader options for User listings serialized with role/area/skills."""
+    return [
+        joinedload(User.role_ref),
+        joinedload(User.area_ref),
+        selectinload(User.skills),
+    ]
+
+
+def employee_detail_options():
+    """employee_options() plus everything else User.to_dict() reads (licenses, designation)."""
+    return [
+        *employee_options(),
+        joinedload(User.designation_ref),
+        selectinload(User.licenses_assoc).joinedload(EmployeeLicense.license),
+    ]
@@ -37,6 +37,7 @@ class Role(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(50), unique=True, nullable=False)
     permissions = db.Column(db.Text)  # JSON string for permissions
+    version = db.Column(db.Integer, nullable=False, default=1)  # Bumped on change; invalidates role claims in JWTs
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relationships
@@ -136,6 +137,52 @@ class EmployeeLicense(db.Model):
     # Relationships
     license = db.relationship('License', backref='employee_assoc', lazy=True)
 
+# Fields of the 'summary' user view (User.to_summary_dict(), src/models/serializers.py)
+USER_SUMMARY_FIELDS = ('id', 'name', 'surname', 'email', 'employee_id')
+
+def license_detail(license, license_id, expiry_date, today):
+    """One entry of a user payload's licenses_detailed."""
+    days_to_expiry = (expiry_date - today).days if expiry_date else None
+    return {
+        'license': license,
+        'license_id': license_id,
+        'expiry_date': expiry_date.isoformat() if expiry_date else None,
+        'days_to_expiry': days_to_expiry,
+        'expired': days_to_expiry is not None and days_to_expiry < 0,
+        'expiring_soon': days_to_expiry is not None and days_to_expiry <= 30
+    }
+
+def user_payload(user, designation, role, area, skills, licenses_detailed):
+    """The User.to_dict() payload.
+
+    user is a User or any row with the same column attributes (the 'full'
+    view in src/models/serializers.py); related objects come already serialized.
+    """
+    return {
+        'id': user.id,
+        'google_id': user.google_id,
+        'email': user.email,
+        'name': user.name,
+        'surname': user.surname,
+        'employee_id': user.employee_id,
+        'contact_no': user.contact_no,
+        'alt_contact_name': user.alt_contact_name,
+        'alt_contact_no': user.alt_contact_no,
+        'licenses_detailed': licenses_detailed,
+        'designation': designation,
+        'role_id': user.role_id,
+        'role': role,
+        'area_of_responsibility_id': user.area_of_responsibility_id,
+        'area_of_responsibility': area,
+        'rate_type': user.rate_type,
+        'rate_value': float(user.rate_value) if user.rate_value is not None else None,
+        'skills': skills,
+        'created_at': user.created_at.isoformat() if user.created_at else None,
+        'updated_at': user.updated_at.isoformat() if user.updated_at else None,
+        'total_no_leave_days_annual': float(user.total_no_leave_days_annual) if user.total_no_leave_days_annual is not None else None,
+        'total_no_leave_days_annual_float': float(user.total_no_leave_days_annual_float) if user.total_no_leave_days_annual_float is not None else None
+    }
+
 class User(db.Model):
     __tablename__ = 'users'
     
@@ -170,45 +217,22 @@ class User(db.Model):
     def __repr__(self):
         return f'<User {self.name} {self.surname}>'
     
+    def to_summary_dict(self):
+        return {field: getattr(self, field) for field in USER_SUMMARY_FIELDS}
+
     def to_dict(self):
-        licenses_detailed = []
         today = date_cls.today()
-        for assoc in self.licenses_assoc or []:
-            exp = assoc.expiry_date
-            days_to_expiry = (exp - today).days if exp else None
-            licenses_detailed.append({
-                'license': assoc.license.to_dict() if assoc.license else None,
-                'license_id': assoc.license_id,
-                'expiry_date': exp.isoformat() if exp else None,
-                'days_to_expiry': days_to_expiry,
-                'expired': days_to_expiry is not None and days_to_expiry < 0,
-                'expiring_soon': days_to_expiry is not None and days_to_expiry <= 30
-            })
-
-        return {
-            'id': self.id,
-            'google_id': self.google_id,
-            'email': self.email,
-            'name': self.name,
-            'surname': self.surname,
-            'employee_id': self.employee_id,
-            'contact_no': self.contact_no,
-            'alt_contact_name': self.alt_contact_name,
-            'alt_contact_no': self.alt_contact_no,
-            'licenses_detailed': licenses_detailed,
-            'designation': self.designation_ref.designation_name if self.designation_ref else None,
-            'role_id': self.role_id,
-            'role': self.role_ref.to_dict() if self.role_ref else None,
-            'area_of_responsibility_id': self.area_of_responsibility_id,
-            'area_of_responsibility': self.area_ref.to_dict() if self.area_ref else None,
-            'rate_type': self.rate_type,
-            'rate_value': float(self.rate_value) if self.rate_value is not None else None,
-            'skills': [skill.to_dict() for skill in self.skills],
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-            'total_no_leave_days_annual': float(self.total_no_leave_days_annual) if self.total_no_leave_days_annual is not None else None,
-            'total_no_leave_days_annual_float': float(self.total_no_leave_days_annual_float) if self.total_no_leave_days_annual_float is not None else None
-        }
+        return user_payload(
+            self,
+            designation=self.designation_ref.designation_name if self.designation_ref else None,
+            role=self.role_ref.to_dict() if self.role_ref else None,
+            area=self.area_ref.to_dict() if self.area_ref else None,
+            skills=[skill.to_dict() for skill in self.skills],
+            licenses_detailed=[
+                license_detail(assoc.license.to_dict() if assoc.license else None, assoc.license_id, assoc.expiry_date, today)
+                for assoc in self.licenses_assoc or []
+            ],
+        )
 
 class Shift(db.Model):
     __tablename__ = 'shifts'
@@ -242,6 +266,12 @@ class Shift(db.Model):
 
 class ShiftRoster(db.Model):
     __tablename__ = 'shift_roster'
+    __table_args__ = (
+        # One assignment per employee per day; roster writes upsert against this
+        db.Index('uq_shift_roster_employee_date', 'employee_id', 'date', unique=True),
+        db.Index('ix_shift_roster_date_status', 'date', 'status'),
+        db.Index('ix_shift_roster_shift_date', 'shift_id', 'date'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     employee_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -279,7 +309,7 @@ class ShiftRoster(db.Model):
             'shift': self.shift.to_dict() if self.shift else None,
             'area_of_responsibility_id': self.area_of_responsibility_id,
             'area': self.area.to_dict() if self.area else None,
-            'date': self.date.isoformat() if self.date else None,
+            'date': self.date,
             'hours': self.hours,
             'status': self.status,
             'approved_by': self.approved_by,
@@ -288,15 +318,21 @@ class ShiftRoster(db.Model):
                 'name': self.approver.name,
                 'surname': self.approver.surname
             } if self.approver else None,
-            'approved_at': self.approved_at.isoformat() if self.approved_at else None,
-            'accepted_at': self.accepted_at.isoformat() if self.accepted_at else None,
+            'approved_at': self.approved_at,
+            'accepted_at': self.accepted_at,
             'notes': self.notes,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'created_at': self.created_at,
             'timesheet': self.timesheets[0].to_dict() if self.timesheets else None
         }
 
 class Timesheet(db.Model):
     __tablename__ = 'timesheets'
+    __table_args__ = (
+        # At most one timesheet per roster entry; generation relies on this to stay idempotent
+        db.Index('uq_timesheets_roster_id', 'roster_id', unique=True),
+        db.Index('ix_timesheets_date', 'date'),
+        db.Index('ix_timesheets_employee_date', 'employee_id', 'date'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     employee_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -324,7 +360,7 @@ class Timesheet(db.Model):
                 'employee_id': self.employee.employee_id
             } if self.employee else None,
             'roster_id': self.roster_id,
-            'date': self.date.isoformat() if self.date else None,
+            'date': self.date,
             'hours_worked': self.hours_worked,
             'status': self.status,
             'approved_by': self.approved_by,
@@ -333,14 +369,18 @@ class Timesheet(db.Model):
                 'name': self.timesheet_approver.name,
                 'surname': self.timesheet_approver.surname
             } if self.timesheet_approver else None,
-            'approved_at': self.approved_at.isoformat() if self.approved_at else None,
+            'approved_at': self.approved_at,
             'notes': self.notes,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'accepted_at': self.accepted_at.isoformat() if self.accepted_at else None
+            'created_at': self.created_at,
+            'accepted_at': self.accepted_at
         }
 
 class LeaveRequest(db.Model):
     __tablename__ = 'leave_requests'
+    __table_args__ = (
+        db.Index('ix_leave_requests_employee_status', 'employee_id', 'status'),
+        db.Index('ix_leave_requests_start_end', 'start_date', 'end_date'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     employee_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -404,8 +444,64 @@ class LeaveRequest(db.Model):
             'total_no_leave_days_annual': float(self.employee.total_no_leave_days_annual) if self.employee and self.employee.total_no_leave_days_annual is not None else None
         }
 
+class LeaveBalance(db.Model):
+    """Running leave balance per employee and leave year, maintained by src/utils/leave_ledger.py."""
+    __tablename__ = 'leave_balances'
+
+    employee_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    leave_year = db.Column(db.Integer, primary_key=True)
+    allocated = db.Column(db.Float, nullable=False, default=0)
+    used = db.Column(db.Float, nullable=False, default=0)
+    balance = db.Column(db.Float, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'employee_id': self.employee_id,
+            'leave_year': self.leave_year,
+            'allocated': self.allocated,
+            'used': self.used,
+            'balance': self.balance,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+class LeaveLedgerEntry(db.Model):
+    """Append-only history of leave balance changes."""
+    __tablename__ = 'leave_ledger'
+    __table_args__ = (
+        db.Index('ix_leave_ledger_employee_year', 'employee_id', 'leave_year', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    employee_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    leave_year = db.Column(db.Integer, nullable=False)
+    entry_type = db.Column(db.String(20), nullable=False)  # allocation, leave, recompute
+    days = db.Column(db.Float, nullable=False)  # signed change to the balance
+    balance = db.Column(db.Float, nullable=False)  # balance after this entry
+    leave_request_id = db.Column(db.Integer, db.ForeignKey('leave_requests.id'), nullable=True)
+    note = db.Column(db.String(255))
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'employee_id': self.employee_id,
+            'leave_year': self.leave_year,
+            'entry_type': self.entry_type,
+            'days': self.days,
+            'balance': self.balance,
+            'leave_request_id': self.leave_request_id,
+            'note': self.note,
+            'created_by': self.created_by,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
 class ActivityLog(db.Model):
     __tablename__ = 'activity_logs'
+    __table_args__ = (
+        db.Index('ix_activity_logs_timestamp', 'timestamp'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -424,6 +520,32 @@ class ActivityLog(db.Model):
             'timestamp': self.timestamp.isoformat()
         }
 
+class DashboardDailyRollup(db.Model):
+    """Per-day dashboard aggregates, kept current by src/models/rollups.py."""
+    __tablename__ = 'dashboard_daily_rollup'
+
+    date = db.Column(db.Date, primary_key=True)
+    approved_shifts = db.Column(db.Integer, nullable=False, default=0)
+    pending_shifts = db.Column(db.Integer, nullable=False, default=0)
+    approved_hours = db.Column(db.Float, nullable=False, default=0)
+    employees_on_shift = db.Column(db.Integer, nullable=False, default=0)  # distinct, approved shifts
+    employees_on_leave = db.Column(db.Integer, nullable=False, default=0)  # distinct, approved leave
+    timesheet_hours = db.Column(db.Float, nullable=False, default=0)
+    pending_timesheets = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'date': self.date.isoformat(),
+            'approved_shifts': self.approved_shifts,
+            'pending_shifts': self.pending_shifts,
+            'approved_hours': self.approved_hours,
+            'employees_on_shift': self.employees_on_shift,
+            'employees_on_leave': self.employees_on_leave,
+            'timesheet_hours': self.timesheet_hours,
+            'pending_timesheets': self.pending_timesheets
+        }
+
 class CommunityPost(db.Model):
     __tablename__ = 'community_posts'
     id = db.Column(db.Integer, primary_key=True)
@@ -436,15 +558,18 @@ class CommunityPost(db.Model):
     author = db.relationship('User', backref='community_posts')
     replies = db.relationship('PostReply', backref='post', lazy='dynamic', cascade='all, delete-orphan')
 
-    def to_dict(self):
+    def to_dict(self, author=None, reply_count=None):
+        """author / reply_count: precomputed values for listings (default: loaded here)."""
+        if author is None and self.author:
+            author = self.author.to_summary_dict()
         return {
             'id': self.id,
-            'author': self.author.to_dict() if self.author else None,
+            'author': author,
             'post_type': self.post_type,
             'title': self.title,
             'content': self.content,
             'created_at': self.created_at.isoformat(),
-            'reply_count': self.replies.count()
+            'reply_count': self.replies.count() if reply_count is None else reply_count
         }
 
 class PostReply(db.Model):
@@ -460,8 +585,15 @@ class PostReply(db.Model):
     def to_dict(self):
         return {
             'id': self.id,
-            'author': self.author.to_dict() if self.author else None,
+            'author': self.author.to_summary_dict() if self.author else None,
             'post_id': self.post_id,
             'content': self.content,
             'created_at': self.created_at.isoformat()
         }
+
+class TableVersion(db.Model):
+    """Per-table change counter, bumped by every commit that writes the table (src/utils/http_cache.py)."""
+    __tablename__ = 'table_versions'
+
+    table_name = db.Column(db.String(100), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
@@ -0,0 +1,174 @@
+from datetime import datetime, timedelta
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import event, func, case, delete, insert, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, attributes
+from src.models.models import db, ShiftRoster, Timesheet, LeaveRequest, DashboardDailyRollup
+from src.utils.table_tracking import REFRESH, on_before_commit
+
+# Daily dashboard rollups.
+#
+# Writes to shift_roster, timesheets and leave_requests record the dates they
+# touch in session.info; just before the transaction commits, the rollup rows
+# for exactly those dates are recomputed from the base tables (indexed by
+# date) in the same transaction. ORM changes are picked up automatically by a
+# before_flush hook. Core bulk writes that bypass the ORM must call
+# mark_dates_dirty() / mark_range_dirty() themselves.
+#
+# `flask --app src.main rollup-rebuild` recomputes every day from scratch;
+# run it once after upgrading a database that predates the rollups.
+
+_DIRTY_KEY = 'rollup_dirty_dates'
+
+ROLLUP_BATCH_SIZE = 500
+
+_UPSERT_INSERTS = {'sqlite': sqlite_insert, 'postgresql': postgresql_insert}
+
+_EMPTY_ROW = {
+    'approved_shifts': 0, 'pending_shifts': 0, 'approved_hours': 0.0, 'employees_on_shift': 0,
+    'employees_on_leave': 0, 'timesheet_hours': 0.0, 'pending_timesheets': 0,
+}
+_ROLLUP_COLUMNS = list(_EMPTY_ROW) + ['updated_at']
+
+# Leave statuses counted as "on leave" by the dashboard
+ON_LEAVE_STATUSES = ('approved',)
+
+def mark_dates_dirty(session, dates):
+    """Recompute the rollups for these dates when the session commits."""
+    session.info.setdefault(_DIRTY_KEY, set()).update(d for d in dates if d is not None)
+
+def mark_range_dirty(session, start, end):
+    if start is None or end is None:
+        return
+    mark_dates_dirty(session, (start + timedelta(days=i) for i in range((end - start).days + 1)))
+
+def _history_values(obj, key):
+    history = attributes.get_history(obj, key)
+    return [v for v in history.sum() if v is not None]
+
+@event.listens_for(Session, 'before_flush')
+def _collect_dirty_dates(session, flush_context, instances):
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, (ShiftRoster, Timesheet)):
+            mark_dates_dirty(session, _history_values(obj, 'date'))
+        elif isinstance(obj, LeaveRequest):
+            starts = _history_values(obj, 'start_date')
+            ends = _history_values(obj, 'end_date')
+            if starts and ends:
+                mark_range_dirty(session, min(starts), max(ends))
+
+# Runs before the table version bump, which then counts dashboard_daily_rollup
+@on_before_commit(REFRESH)
+def _refresh_dirty_dates(session):
+    dates = session.info.pop(_DIRTY_KEY, None)
+    if dates:
+        refresh_rollups(session, dates)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_dirty_dates(session):
+    session.info.pop(_DIRTY_KEY, None)
+
+def _chunks(items, size=ROLLUP_BATCH_SIZE):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+def refresh_rollups(session, dates):
+    """Recompute the rollup rows for the given dates from the base tables."""
+    for chunk in _chunks(sorted(set(dates))):
+        rows = {d: {'date': d} for d in chunk}
+
+        roster_totals = session.execute(
+            select(
+                ShiftRoster.date,
+                func.sum(case((ShiftRoster.status == 'approved', 1), else_=0)),
+                func.sum(case((ShiftRoster.status == 'pending', 1), else_=0)),
+                func.sum(case((ShiftRoster.status == 'approved', ShiftRoster.hours), else_=0)),
+                func.count(func.distinct(case((ShiftRoster.status == 'approved', ShiftRoster.employee_id)))),
+            )
+            .where(ShiftRoster.date.in_(chunk))
+            .group_by(ShiftRoster.date)
+        )
+        for day, approved, pending, hours, on_shift in roster_totals:
+            rows[day].update(approved_shifts=approved or 0, pending_shifts=pending or 0,
+                             approved_hours=float(hours or 0), employees_on_shift=on_shift or 0)
+
+        timesheet_totals = session.execute(
+            select(
+                Timesheet.date,
+                func.sum(Timesheet.hours_worked),
+                func.sum(case((Timesheet.status == 'pending', 1), else_=0)),
+            )
+            .where(Timesheet.date.in_(chunk))
+            .group_by(Timesheet.date)
+        )
+        for day, hours, pending in timesheet_totals:
+            rows[day].update(timesheet_hours=float(hours or 0), pending_timesheets=pending or 0)
+
+        leaves = session.execute(
+            select(LeaveRequest.employee_id, LeaveRequest.start_date, LeaveRequest.end_date)
+            .where(
+                LeaveRequest.start_date <= chunk[-1],
+                LeaveRequest.end_date >= chunk[0],
+                LeaveRequest.status.in_(ON_LEAVE_STATUSES),
+            )
+        ).all()
+        if leaves:
+            for day in chunk:
+                on_leave = {employee_id for employee_id, start, end in leaves if start <= day <= end}
+                if on_leave:
+                    rows[day]['employees_on_leave'] = len(on_leave)
+
+        # Days with nothing on them have no row; readers treat a missing day as zeros
+        now = datetime.utcnow()
+        values = [dict(_EMPTY_ROW, **row, updated_at=now) for row in rows.values() if len(row) > 1]
+        empty_days = [day for day, row in rows.items() if len(row) == 1]
+        if empty_days:
+            session.execute(delete(DashboardDailyRollup).where(DashboardDailyRollup.date.in_(empty_days)))
+        if values:
+            _write_rows(session, values)
+
+def _write_rows(session, values):
+    upsert = _UPSERT_INSERTS.get(session.get_bind().dialect.name)
+    if upsert is None:
+        session.execute(delete(DashboardDailyRollup).where(DashboardDailyRollup.date.in_([v['date'] for v in values])))
+        session.execute(insert(DashboardDailyRollup), values)
+        return
+    # Upsert per date: two transactions refreshing the same day both succeed
+    # (the later commit wins) instead of one failing on the primary key
+    stmt = upsert(DashboardDailyRollup)
+    session.execute(
+        stmt.on_conflict_do_update(index_elements=['date'], set_={c: stmt.excluded[c] for c in _ROLLUP_COLUMNS}),
+        values
+    )
+
+def rebuild_rollups(session=None):
+    """Recompute every rollup row covering the roster, timesheet and leave data."""
+    session = session or db.session
+    bounds = [
+        session.query(func.min(ShiftRoster.date), func.max(ShiftRoster.date)).one(),
+        session.query(func.min(Timesheet.date), func.max(Timesheet.date)).one(),
+        session.query(func.min(LeaveRequest.start_date), func.max(LeaveRequest.end_date)).one(),
+    ]
+    starts = [b[0] for b in bounds if b[0] is not None]
+    ends = [b[1] for b in bounds if b[1] is not None]
+    session.execute(delete(DashboardDailyRollup))
+    if starts and ends:
+        start, end = min(starts), max(ends)
+        refresh_rollups(session, [start + timedelta(days=i) for i in range((end - start).days + 1)])
+
+def rollups_missing():
+    """True when there is roster data but no rollups yet (e.g. right after upgrading)."""
+    return (
+        db.session.query(DashboardDailyRollup.date).first() is None
+        and db.session.query(ShiftRoster.id).first() is not None
+    )
+
+@click.command('rollup-rebuild')
+@with_appcontext
+def rollup_rebuild_command():
+    """Recompute the dashboard daily rollups from scratch."""
+    rebuild_rollups()
+    db.session.commit()
+    click.echo(f'{DashboardDailyRollup.query.count()} daily rollup rows written')
@@ -0,0 +1,192 @@
+from collections import defaultdict
+from datetime import date
+from flask import request
+from sqlalchemy.orm import aliased
+from src.models.models import (
+    db, User, Role, AreaOfResponsibility, Designation, Skill, License, EmployeeLicense,
+    employee_skills, license_detail, user_payload, USER_SUMMARY_FIELDS
+)
+
+# Projection-based serializers for user listings.
+#
+# A view names the fields of a user payload. Rows are read with one column
+# query -- the caller's User query (filters, joins, order, limit) narrowed to
+# the view's columns, with role/area/designation outer-joined -- and turned
+# into dicts directly, without loading User objects or their relationships.
+# The 'full' view also reads skills and licenses with one query each for the
+# whole result; its payloads are built by the same code as User.to_dict()
+# (user_payload(), and the related models' to_dict() on detached instances
+# made once per role/area/skill/license). Views:
+#   summary -- identity only (USER_SUMMARY_FIELDS), e.g. post authors
+#   card    -- summary plus contact, designation, role and area names
+#   full    -- the same payload as User.to_dict()
+
+USER_VIEWS = ('summary', 'card', 'full')
+
+# Above this many users, collections are read unfiltered and matched in memory
+MAX_IN_LIST = 500
+
+# Aliased so caller queries that already join these tables keep working
+_role = aliased(Role, name='view_role')
+_area = aliased(AreaOfResponsibility, name='view_area')
+_designation = aliased(Designation, name='view_designation')
+
+_SUMMARY_COLUMNS = [getattr(User, field) for field in USER_SUMMARY_FIELDS]
+
+_CARD_COLUMNS = _SUMMARY_COLUMNS + [
+    User.contact_no,
+    _designation.designation_name.label('designation'),
+    User.role_id,
+    _role.name.label('role_name'),
+    User.area_of_responsibility_id,
+    _area.name.label('area_name'),
+    _area.color.label('area_color'),
+]
+
+_FULL_COLUMNS = _SUMMARY_COLUMNS + [
+    User.google_id, User.contact_no, User.alt_contact_name, User.alt_contact_no,
+    _designation.designation_name.label('designation'),
+    User.role_id,
+    _role.name.label('role_name'),
+    _role.permissions.label('role_permissions'),
+    _role.created_at.label('role_created_at'),
+    User.area_of_responsibility_id,
+    _area.name.label('area_name'),
+    _area.description.label('area_description'),
+    _area.color.label('area_color'),
+    _area.created_at.label('area_created_at'),
+    User.rate_type, User.rate_value, User.created_at, User.updated_at,
+    User.total_no_leave_days_annual, User.total_no_leave_days_annual_float,
+]
+
+_DETAIL_JOINS = (
+    (_designation, _designation.designation_id == User.designation_id),
+    (_role, _role.id == User.role_id),
+    (_area, _area.id == User.area_of_responsibility_id),
+)
+
+_COLUMNS = {'summary': _SUMMARY_COLUMNS, 'card': _CARD_COLUMNS, 'full': _FULL_COLUMNS}
+
+_JOINS = {'summary': (), 'card': _DETAIL_JOINS, 'full': _DETAIL_JOINS}
+
+
+class UnknownViewError(ValueError):
+    """Raised for a ``view`` that is not one of USER_VIEWS."""
+
+
+def get_view_arg(default='full'):
+    """Read the ``view`` query parameter (default: the route's legacy payload)."""
+    view = request.args.get('view', default)
+    if view not in USER_VIEWS:
+        raise UnknownViewError(f"view must be one of: {', '.join(USER_VIEWS)}")
+    return view
+
+
+def project_users(query, view='full'):
+    """Narrow a User query (any filters/joins/order/limit) to the view's columns.
+
+    Keyset pagination works on the result like on the User query; feed the
+    rows to user_dicts().
+    """
+    query = query.with_entities(*_COLUMNS[view])
+    for target, onclause in _JOINS[view]:
+        query = query.outerjoin(target, onclause)
+    return query
+
+
+def _skills_by_user(user_ids):
+    query = db.session.query(
+        employee_skills.c.employee_id, Skill.id, Skill.name, Skill.description, Skill.created_at
+    ).join(Skill, Skill.id == employee_skills.c.skill_id)
+    if len(user_ids) <= MAX_IN_LIST:
+        query = query.filter(employee_skills.c.employee_id.in_(user_ids))
+    skills = {}
+    by_user = defaultdict(list)
+    for employee_id, skill_id, name, description, created_at in query.order_by(Skill.id):
+        if employee_id not in user_ids:
+            continue
+        if skill_id not in skills:
+            skills[skill_id] = Skill(id=skill_id, name=name, description=description, created_at=created_at).to_dict()
+        by_user[employee_id].append(skills[skill_id])
+    return by_user
+
+
+def _licenses_by_user(user_ids):
+    query = db.session.query(
+        EmployeeLicense.employee_id, EmployeeLicense.license_id, EmployeeLicense.expiry_date,
+        License.name, License.description, License.created_at
+    ).outerjoin(License, License.id == EmployeeLicense.license_id)
+    if len(user_ids) <= MAX_IN_LIST:
+        query = query.filter(EmployeeLicense.employee_id.in_(user_ids))
+    today = date.today()
+    licenses = {}
+    by_user = defaultdict(list)
+    for employee_id, license_id, expiry, name, description, created_at in query.order_by(EmployeeLicense.id):
+        if employee_id not in user_ids:
+            continue
+        if name is not None and license_id not in licenses:
+            licenses[license_id] = License(id=license_id, name=name, description=description, created_at=created_at).to_dict()
+        by_user[employee_id].append(license_detail(licenses.get(license_id), license_id, expiry, today))
+    return by_user
+
+
+def _summary(row):
+    return {field: getattr(row, field) for field in USER_SUMMARY_FIELDS}
+
+
+def _card(row):
+    data = _summary(row)
+    data.update({
+        'contact_no': row.contact_no,
+        'designation': row.designation,
+        'role_id': row.role_id,
+        'role_name': row.role_name,
+        'area_of_responsibility_id': row.area_of_responsibility_id,
+        'area_name': row.area_name,
+        'area_color': row.area_color,
+    })
+    return data
+
+
+def _full_dicts(rows):
+    user_ids = {row.id for row in rows}
+    skills = _skills_by_user(user_ids) if user_ids else {}
+    licenses = _licenses_by_user(user_ids) if user_ids else {}
+    # Role/area payloads are built (and permissions parsed) once per role/area
+    roles, areas = {}, {}
+    results = []
+    for row in rows:
+        role = None
+        if row.role_name is not None:
+            role = roles.get(row.role_id)
+            if role is None:
+                role = roles[row.role_id] = Role(
+                    id=row.role_id, name=row.role_name, permissions=row.role_permissions,
+                    created_at=row.role_created_at
+                ).to_dict()
+        area = None
+        if row.area_name is not None:
+            area = areas.get(row.area_of_responsibility_id)
+            if area is None:
+                area = areas[row.area_of_responsibility_id] = AreaOfResponsibility(
+                    id=row.area_of_responsibility_id, name=row.area_name, description=row.area_description,
+                    color=row.area_color, created_at=row.area_created_at
+                ).to_dict()
+        results.append(user_payload(
+            row, designation=row.designation, role=role, area=area,
+            skills=skills.get(row.id, []), licenses_detailed=licenses.get(row.id, [])
+        ))
+    return results
+
+
+def user_dicts(rows, view='full'):
+    """Payload dicts for rows returned by project_users(query, view)."""
+    if view == 'full':
+        return _full_dicts(rows)
+    build = _card if view == 'card' else _summary
+    return [build(row) for row in rows]
+
+
+def serialize_users(query, view='full'):
+    """Payload dicts for the users a User query selects, in the query's order."""
+    return user_dicts(project_users(query, view).all(), view)
@@ -1,7 +1,9 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required
 from src.models.models import db, Role, AreaOfResponsibility, Skill, Shift, License
-from src.utils.decorators import permission_required, role_required
+from src.utils.decorators import permission_required, role_required, invalidate_role_permissions
+from src.utils.roster_writes import invalidate_leave_shift
+from src.utils.claims import bump_role_version
 from datetime import time
 import json
 
@@ -73,8 +75,12 @@ def update_role(role_id):
         
         if 'permissions' in data:
             role.permissions = json.dumps(data['permissions'])
+
+        if 'name' in data or 'permissions' in data:
+            bump_role_version(role)
         
         db.session.commit()
+        invalidate_role_permissions(role_id)
         
         return jsonify({
             'message': 'Role updated successfully',
@@ -100,6 +106,7 @@ def delete_role(role_id):
         
         db.session.delete(role)
         db.session.commit()
+        invalidate_role_permissions(role_id)
         
         return jsonify({'message': 'Role deleted successfully'}), 200
         
@@ -366,6 +373,7 @@ def create_shift():
         
         db.session.add(shift)
         db.session.commit()
+        invalidate_leave_shift()
         
         return jsonify({
             'message': 'Shift created successfully',
@@ -419,6 +427,7 @@ def update_shift(shift_id):
             shift.color = data['color']
         
         db.session.commit()
+        invalidate_leave_shift()
         
         return jsonify({
             'message': 'Shift updated successfully',
@@ -444,6 +453,7 @@ def delete_shift(shift_id):
         
         db.session.delete(shift)
         db.session.commit()
+        invalidate_leave_shift()
         
         return jsonify({'message': 'Shift deleted successfully'}), 200
         
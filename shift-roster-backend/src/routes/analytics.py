@@ -1,14 +1,21 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required
-from src.models.models import db, User, ShiftRoster, Shift, Role, AreaOfResponsibility, Skill, LeaveRequest, ActivityLog
-from src.utils.decorators import get_current_user
+from src.models.models import db, User, ShiftRoster, Shift, Role, AreaOfResponsibility, Skill, LeaveRequest, ActivityLog, DashboardDailyRollup
+from src.utils.decorators import get_current_user, manager_required
+from src.utils.analytics_cache import cached_analytics, CACHE_DEPENDENCIES
+from src.utils.http_cache import conditional_get
+from src.utils.availability import availability_snapshot
+from src.utils.leave_calendar import get_leave_calendar
+from src.models.serializers import get_view_arg, serialize_users, UnknownViewError
 from datetime import datetime, date, timedelta
-from sqlalchemy import func, and_, or_
+from sqlalchemy import func, and_, or_, case
+from sqlalchemy.orm import joinedload
 
 analytics_bp = Blueprint('analytics', __name__)
 
 @analytics_bp.route('/dashboard', methods=['GET'])
 @jwt_required()
+@conditional_get('dashboard_daily_rollup', 'shift_roster', 'leave_requests', 'activity_logs')
 def get_dashboard_metrics():
     """Get main dashboard metrics"""
     try:
@@ -35,47 +42,40 @@ def get_dashboard_metrics():
         # Total employees
         total_employees = User.query.count()
         
-        # Employees on shift (for the date range)
-        employees_on_shift = db.session.query(func.count(func.distinct(ShiftRoster.employee_id))).filter(
-            and_(
-                ShiftRoster.date >= start_date_obj,
-                ShiftRoster.date <= end_date_obj,
-                ShiftRoster.status == 'approved'
-            )
-        ).scalar()
-        
-        # Employees on leave
-        employees_on_leave = db.session.query(func.count(func.distinct(LeaveRequest.employee_id))).filter(
-            and_(
-                LeaveRequest.start_date <= end_date_obj,
-                LeaveRequest.end_date >= start_date_obj,
-                LeaveRequest.status == 'approved'
-            )
-        ).scalar()
+        # Per-day counters come from the daily rollup table (range-sum over one row per day)
+        pending_rosters, total_hours = db.session.query(
+            func.coalesce(func.sum(DashboardDailyRollup.pending_shifts), 0),
+            func.coalesce(func.sum(DashboardDailyRollup.approved_hours), 0)
+        ).filter(
+            DashboardDailyRollup.date >= start_date_obj,
+            DashboardDailyRollup.date <= end_date_obj
+        ).one()
+        
+        if start_date_obj == end_date_obj:
+            # Single day: distinct counts are stored on the rollup row
+            rollup = db.session.get(DashboardDailyRollup, start_date_obj)
+            employees_on_shift = rollup.employees_on_shift if rollup else 0
+            employees_on_leave = rollup.employees_on_leave if rollup else 0
+        else:
+            # Distinct employees over several days are not a sum of daily counts,
+            # so these come from the (date, status) index and the leave calendar.
+            employees_on_shift = db.session.query(func.count(func.distinct(ShiftRoster.employee_id))).filter(
+                and_(
+                    ShiftRoster.date >= start_date_obj,
+                    ShiftRoster.date <= end_date_obj,
+                    ShiftRoster.status == 'approved'
+                )
+            ).scalar()
+            
+            employees_on_leave = len(get_leave_calendar().employees_on_leave(start_date_obj, end_date_obj))
         
         # Available employees (not on shift or leave)
         available_employees = total_employees - employees_on_shift - employees_on_leave
-        
-        # Pending approvals
-        pending_rosters = ShiftRoster.query.filter(
-            and_(
-                ShiftRoster.date >= start_date_obj,
-                ShiftRoster.date <= end_date_obj,
-                ShiftRoster.status == 'pending'
-            )
-        ).count()
-        
-        # Total scheduled hours
-        total_hours = db.session.query(func.sum(ShiftRoster.hours)).filter(
-            and_(
-                ShiftRoster.date >= start_date_obj,
-                ShiftRoster.date <= end_date_obj,
-                ShiftRoster.status == 'approved'
-            )
-        ).scalar() or 0
 
-        # Get recent activities
-        recent_activities = ActivityLog.query.order_by(ActivityLog.timestamp.desc()).limit(30).all()
+        # Get recent activities (user loaded in the same query for to_dict)
+        recent_activities = ActivityLog.query.options(
+            joinedload(ActivityLog.user).lazyload(User.skills)
+        ).order_by(ActivityLog.timestamp.desc()).limit(30).all()
         
         return jsonify({
             'date_range': {
@@ -97,14 +97,12 @@ def get_dashboard_metrics():
         return jsonify({'error': str(e)}), 500
 
 @analytics_bp.route('/skill-distribution', methods=['GET'])
-@jwt_required()
+@manager_required
+@conditional_get(*CACHE_DEPENDENCIES['skill-distribution'])
+@cached_analytics('skill-distribution')
 def get_skill_distribution():
     """Get the distribution of skills across all employees"""
     try:
-        current_user = get_current_user()
-        if current_user.role_ref.name not in ['Admin', 'Manager']:
-            return jsonify({'error': 'Insufficient permissions'}), 403
-
         # Query to count employees for each skill
         skill_counts = db.session.query(
             Skill.name,
@@ -124,14 +122,12 @@ def get_skill_distribution():
         return jsonify({'error': str(e)}), 500
 
 @analytics_bp.route('/weekly-approval-trends', methods=['GET'])
-@jwt_required()
+@manager_required
+@conditional_get(*CACHE_DEPENDENCIES['weekly-approval-trends'])
+@cached_analytics('weekly-approval-trends', daily=True)
 def get_weekly_approval_trends():
     """Get weekly shift approval trends for the last 12 weeks"""
     try:
-        current_user = get_current_user()
-        if current_user.role_ref.name not in ['Admin', 'Manager']:
-            return jsonify({'error': 'Insufficient permissions'}), 403
-
         today = date.today()
         # Go back to the beginning of the week (Monday) for the start date
         start_of_period = today - timedelta(days=today.weekday()) - timedelta(weeks=11)
@@ -166,15 +162,12 @@ def get_weekly_approval_trends():
         return jsonify({'error': str(e)}), 500
 
 @analytics_bp.route('/employees-by-shift', methods=['GET'])
-@jwt_required()
+@manager_required
+@conditional_get(*CACHE_DEPENDENCIES['employees-by-shift'])
+@cached_analytics('employees-by-shift', params=('start_date', 'end_date'), daily=True)
 def get_employees_by_shift():
     """Get employee count by shift type"""
     try:
-        current_user = get_current_user()
-        
-        if current_user.role_ref.name not in ['Admin', 'Manager']:
-            return jsonify({'error': 'Insufficient permissions'}), 403
-        
         # Get date range
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
@@ -223,14 +216,12 @@ def get_employees_by_shift():
         return jsonify({'error': str(e)}), 500
 
 @analytics_bp.route('/employees-by-role', methods=['GET'])
-@jwt_required()
+@manager_required
+@conditional_get(*CACHE_DEPENDENCIES['employees-by-role'])
+@cached_analytics('employees-by-role')
 def get_employees_by_role():
     """Get employee count by role"""
     try:
-        current_user = get_current_user()
-        if current_user.role_ref.name not in ['Admin', 'Manager']:
-            return jsonify({'error': 'Insufficient permissions'}), 403
-        
         # Query employee count by role
         role_counts = db.session.query(
             Role.name,
@@ -250,14 +241,12 @@ def get_employees_by_role():
         return jsonify({'error': str(e)}), 500
 
 @analytics_bp.route('/employees-by-area', methods=['GET'])
-@jwt_required()
+@manager_required
+@conditional_get(*CACHE_DEPENDENCIES['employees-by-area'])
+@cached_analytics('employees-by-area')
 def get_employees_by_area():
     """Get employee and shift count by area of responsibility"""
     try:
-        current_user = get_current_user()
-        if current_user.role_ref.name not in ['Admin', 'Manager']:
-            return jsonify({'error': 'Insufficient permissions'}), 403
-        
         # Subquery for employee counts per area
         emp_counts_sub = db.session.query(
             User.area_of_responsibility_id,
@@ -298,15 +287,12 @@ def get_employees_by_area():
         return jsonify({'error': str(e)}), 500
 
 @analytics_bp.route('/leave-summary', methods=['GET'])
-@jwt_required()
+@manager_required
+@conditional_get(*CACHE_DEPENDENCIES['leave-summary'])
+@cached_analytics('leave-summary', params=('start_date', 'end_date'), daily=True)
 def get_leave_summary():
     """Get leave summary by type"""
     try:
-        current_user = get_current_user()
-        
-        if current_user.role_ref.name not in ['Admin', 'Manager']:
-            return jsonify({'error': 'Insufficient permissions'}), 403
-        
         # Get date range
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
@@ -378,42 +364,20 @@ def skill_search():
         if role_name:
             query = query.join(Role).filter(Role.name.ilike(f'%{role_name}%'))
         
-        employees = query.all()
+        employees = serialize_users(query.distinct().order_by(User.id), get_view_arg())
         
-        # Get current shift status for each employee
-        today = date.today()
+        # Get current shift status for all matched employees at once
+        snapshot = availability_snapshot([employee['id'] for employee in employees], with_rosters=True)
         result = []
         
-        for employee in employees:
-            # Check if employee has a shift today
-            today_roster = ShiftRoster.query.filter(
-                and_(
-                    ShiftRoster.employee_id == employee.id,
-                    ShiftRoster.date == today,
-                    ShiftRoster.status == 'approved'
-                )
-            ).first()
-            
-            shift_status = 'available'
-            if today_roster:
-                shift_status = 'on_shift'
-            
-            # Check if on leave
-            on_leave = LeaveRequest.query.filter(
-                and_(
-                    LeaveRequest.employee_id == employee.id,
-                    LeaveRequest.start_date <= today,
-                    LeaveRequest.end_date >= today,
-                    LeaveRequest.status == 'approved'
-                )
-            ).first()
-            
-            if on_leave:
-                shift_status = f'on_{on_leave.leave_type}_leave'
+        for employee_data in employees:
+            availability = snapshot[employee_data['id']]
+            shift_status = availability.status
+            if availability.leave_type:
+                shift_status = f'on_{availability.leave_type}_leave'
             
-            employee_data = employee.to_dict()
             employee_data['shift_status'] = shift_status
-            employee_data['today_shift'] = today_roster.to_dict() if today_roster else None
+            employee_data['today_shift'] = availability.roster.to_dict() if availability.roster else None
             
             result.append(employee_data)
         
@@ -426,18 +390,121 @@ def skill_search():
             'total': len(result)
         }), 200
         
+    except UnknownViewError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# Statuses counted as planned cover; 'actual' is approved shifts up to today
+PLANNED_STATUSES = ('pending', 'approved')
+
+COVERAGE_GROUPS = ('day', 'area')
+
+# Widest range the per-day coverage matrix will render
+MAX_COVERAGE_MATRIX_DAYS = 366
+
+def _utilization(planned, actual):
+    return int((actual / planned) * 100) if planned > 0 else 0
+
+def _shift_coverage(start_date, end_date, by_day=False, by_area=False, area_id=None):
+    """Planned/actual shift counts per shift (and optionally per day and area) in one query.
+
+    Every shift type appears at least once, with zero counts when nothing is
+    rostered on it; those rows have date/area None.
+    """
+    today = date.today()
+    join_on = [
+        ShiftRoster.shift_id == Shift.id,
+        ShiftRoster.date >= start_date,
+        ShiftRoster.date <= end_date,
+        ShiftRoster.status.in_(PLANNED_STATUSES),
+    ]
+    if area_id is not None:
+        join_on.append(ShiftRoster.area_of_responsibility_id == area_id)
+
+    columns = [
+        Shift.id, Shift.name, Shift.color,
+        func.coalesce(func.sum(case((ShiftRoster.id.isnot(None), 1), else_=0)), 0).label('planned'),
+        func.coalesce(func.sum(case((and_(ShiftRoster.status == 'approved', ShiftRoster.date <= today), 1), else_=0)), 0).label('actual'),
+    ]
+    group_by = [Shift.id, Shift.name, Shift.color]
+    if by_day:
+        columns.append(ShiftRoster.date)
+        group_by.append(ShiftRoster.date)
+    if by_area:
+        columns += [ShiftRoster.area_of_responsibility_id, AreaOfResponsibility.name]
+        group_by += [ShiftRoster.area_of_responsibility_id, AreaOfResponsibility.name]
+
+    query = db.session.query(*columns).outerjoin(ShiftRoster, and_(*join_on))
+    if by_area:
+        query = query.outerjoin(AreaOfResponsibility, AreaOfResponsibility.id == ShiftRoster.area_of_responsibility_id)
+
+    rows = []
+    for row in query.group_by(*group_by).order_by(*group_by[:1] + group_by[3:]).all():
+        entry = {
+            'shift_id': row[0],
+            'shift_name': row[1],
+            'color': row[2],
+            'planned': row.planned,
+            'actual': row.actual,
+            'utilization': _utilization(row.planned, row.actual),
+        }
+        rest = list(row[5:])
+        if by_day:
+            day = rest.pop(0)
+            entry['date'] = day.isoformat() if day else None
+        if by_area:
+            entry['area_id'], entry['area_name'] = rest
+        rows.append(entry)
+    return rows
+
+def _coverage_matrix(rows, start_date, end_date, by_area=False):
+    """Dense shift x day grid (one cell per date, zeros where nothing is rostered)."""
+    dates = [(start_date + timedelta(days=i)).isoformat() for i in range((end_date - start_date).days + 1)]
+    index = {d: i for i, d in enumerate(dates)}
+    totals = [{'planned': 0, 'actual': 0} for _ in dates]
+
+    lines = {}
+    for row in rows:
+        if by_area and row['date'] is None:
+            # Shift type with nothing rostered: there is no area to put it under
+            continue
+        key = (row['shift_id'], row.get('area_id')) if by_area else row['shift_id']
+        line = lines.get(key)
+        if line is None:
+            line = {'shift_id': row['shift_id'], 'shift_name': row['shift_name'], 'color': row['color']}
+            if by_area:
+                line['area_id'] = row['area_id']
+                line['area_name'] = row['area_name']
+            line.update(planned=0, actual=0, cells=[{'planned': 0, 'actual': 0} for _ in dates])
+            lines[key] = line
+        if row['date'] is None:
+            continue
+        i = index[row['date']]
+        line['cells'][i] = {'planned': row['planned'], 'actual': row['actual']}
+        line['planned'] += row['planned']
+        line['actual'] += row['actual']
+        totals[i]['planned'] += row['planned']
+        totals[i]['actual'] += row['actual']
+
+    shifts = list(lines.values())
+    for line in shifts + [{'cells': totals}]:
+        for cell in line['cells']:
+            cell['utilization'] = _utilization(cell['planned'], cell['actual'])
+    for line in shifts:
+        line['utilization'] = _utilization(line['planned'], line['actual'])
+    return {'dates': dates, 'shifts': shifts, 'totals': totals}
+
 @analytics_bp.route('/shift-coverage', methods=['GET'])
-@jwt_required()
+@manager_required
+@conditional_get('shift_roster', 'shifts', 'areas_of_responsibility')
 def get_shift_coverage():
-    """Get shift coverage analysis"""
+    """Get shift coverage analysis.
+
+    Query params: start_date, end_date, area_id, group_by (comma list of
+    day/area) and mode=matrix for a per-day shift x date grid.
+    """
     try:
-        current_user = get_current_user()
-        if current_user.role_ref.name not in ['Admin', 'Manager']:
-            return jsonify({'error': 'Insufficient permissions'}), 403
-        
         # Get date range
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
@@ -452,40 +519,33 @@ def get_shift_coverage():
             end_date_obj = datetime.strptime(end_date, '%Y-%m-%d').date()
         except ValueError:
             return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
-        
-        # Get planned (pending+approved) and actual (approved and date <= today) counts per shift type
-        today = date.today()
-        shift_types = db.session.query(Shift.id, Shift.name, Shift.color).all()
-        utilization = []
-        for shift_id, shift_name, color in shift_types:
-            planned = db.session.query(func.count(ShiftRoster.id)).filter(
-                ShiftRoster.shift_id == shift_id,
-                ShiftRoster.date >= start_date_obj,
-                ShiftRoster.date <= end_date_obj,
-                ShiftRoster.status.in_(['pending', 'approved'])
-            ).scalar() or 0
-            actual = db.session.query(func.count(ShiftRoster.id)).filter(
-                ShiftRoster.shift_id == shift_id,
-                ShiftRoster.date >= start_date_obj,
-                ShiftRoster.date <= end_date_obj,
-                ShiftRoster.status == 'approved',
-                ShiftRoster.date <= today
-            ).scalar() or 0
-            utilization.append({
-                'shift_name': shift_name,
-                'color': color,
-                'planned': planned,
-                'actual': actual,
-                'utilization': int((actual / planned) * 100) if planned > 0 else 0
-            })
+
+        area_id = request.args.get('area_id', type=int)
+        groups = {g.strip() for g in request.args.get('group_by', '').split(',') if g.strip()}
+        unknown = groups - set(COVERAGE_GROUPS)
+        if unknown:
+            return jsonify({'error': f"Invalid group_by '{', '.join(sorted(unknown))}'. Use day and/or area"}), 400
+        by_area = 'area' in groups
+
+        date_range = {
+            'start_date': start_date,
+            'end_date': end_date
+        }
+
+        if request.args.get('mode') == 'matrix':
+            if end_date_obj < start_date_obj:
+                return jsonify({'error': 'end_date must not be before start_date'}), 400
+            if (end_date_obj - start_date_obj).days + 1 > MAX_COVERAGE_MATRIX_DAYS:
+                return jsonify({'error': f'Matrix range is limited to {MAX_COVERAGE_MATRIX_DAYS} days'}), 400
+            rows = _shift_coverage(start_date_obj, end_date_obj, by_day=True, by_area=by_area, area_id=area_id)
+            return jsonify(dict(date_range=date_range, **_coverage_matrix(rows, start_date_obj, end_date_obj, by_area))), 200
+
+        # Planned (pending+approved) and actual (approved and date <= today) counts per shift type
+        utilization = _shift_coverage(start_date_obj, end_date_obj, by_day='day' in groups, by_area=by_area, area_id=area_id)
         return jsonify({
-            'date_range': {
-                'start_date': start_date,
-                'end_date': end_date
-            },
+            'date_range': date_range,
             'utilization': utilization
         }), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-
@@ -3,6 +3,8 @@ from flask_jwt_extended import create_access_token, create_refresh_token, jwt_re
 from google.auth.transport import requests
 from google.oauth2 import id_token
 from src.models.models import db, User, Role
+from src.utils.claims import build_role_claims
+from src.utils.decorators import get_role_permissions
 from datetime import datetime
 import json
 
@@ -67,7 +69,8 @@ def google_auth():
         
         # Create JWT tokens
         # Identity in JWT should be a string to satisfy PyJWT 'sub' claim requirements
-        access_token = create_access_token(identity=str(user.id))
+        role_claims = build_role_claims(user, get_role_permissions(user.role_ref))
+        access_token = create_access_token(identity=str(user.id), additional_claims=role_claims)
         refresh_token = create_refresh_token(identity=str(user.id))
 
         return jsonify({
@@ -94,7 +97,8 @@ def refresh():
         if not user:
             return jsonify({'error': 'User not found'}), 404
 
-        new_token = create_access_token(identity=str(user.id))
+        role_claims = build_role_claims(user, get_role_permissions(user.role_ref))
+        new_token = create_access_token(identity=str(user.id), additional_claims=role_claims)
         return jsonify({'access_token': new_token}), 200
 
     except Exception as e:
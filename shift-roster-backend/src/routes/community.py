@@ -2,6 +2,8 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required
 from src.models.models import db, CommunityPost, PostReply, User
 from src.utils.decorators import get_current_user, manager_required
+from src.models.serializers import serialize_users
+from sqlalchemy import func
 
 community_bp = Blueprint('community', __name__)
 
@@ -11,7 +13,18 @@ def get_posts():
     """Get all community posts, newest first."""
     try:
         posts = CommunityPost.query.order_by(CommunityPost.created_at.desc()).all()
-        return jsonify([post.to_dict() for post in posts]), 200
+        author_ids = {post.user_id for post in posts}
+        authors = {
+            author['id']: author
+            for author in serialize_users(User.query.filter(User.id.in_(author_ids)), 'summary')
+        } if author_ids else {}
+        reply_counts = dict(
+            db.session.query(PostReply.post_id, func.count(PostReply.id)).group_by(PostReply.post_id)
+        )
+        return jsonify([
+            post.to_dict(author=authors.get(post.user_id), reply_count=reply_counts.get(post.id, 0))
+            for post in posts
+        ]), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
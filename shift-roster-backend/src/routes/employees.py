@@ -2,6 +2,11 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required
 from src.models.models import db, User, Role, AreaOfResponsibility, Skill, License, EmployeeLicense
 from src.utils.decorators import permission_required, get_current_user
+from src.utils.pagination import get_page_args, paginate, CursorError
+from src.utils.http_cache import conditional_get
+from src.models.serializers import get_view_arg, project_users, user_dicts, UnknownViewError
+from src.utils.claims import bump_role_version
+from src.utils.leave_ledger import set_allocation
 from datetime import datetime
 
 employees_bp = Blueprint('employees', __name__)
@@ -21,6 +26,7 @@ def test_employees():
 
 @employees_bp.route('', methods=['GET'])
 @jwt_required()
+@conditional_get('areas_of_responsibility', 'designations', 'skills', 'employee_skills', 'licenses', 'employee_licenses')
 def get_employees():
     """Get all employees with optional filtering"""
     try:
@@ -65,13 +71,30 @@ def get_employees():
                     (User.employee_id.ilike(search_filter))
                 )
         
-        employees = query.all()
+        # Payload shape: ?view=summary|card|full (default full, as User.to_dict())
+        view = get_view_arg()
+        query = project_users(query, view)
+
+        # Opt-in keyset pagination on id
+        limit, cursor = get_page_args()
+        if limit is not None:
+            rows, next_cursor = paginate(query, [(User.id, False)], lambda row: (row.id,), limit, cursor)
+            employees = user_dicts(rows, view)
+            return jsonify({
+                'employees': employees,
+                'total': len(employees),
+                'next_cursor': next_cursor
+            }), 200
+
+        employees = user_dicts(query.all(), view)
         
         return jsonify({
-            'employees': [emp.to_dict() for emp in employees],
+            'employees': employees,
             'total': len(employees)
         }), 200
         
+    except (CursorError, UnknownViewError) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -194,6 +217,12 @@ def update_employee(employee_id):
                         role = Role.query.get(data[field])
                         if not role:
                             return jsonify({'error': 'Invalid role ID'}), 400
+                    if data[field] != employee.role_id:
+                        # Role claims carry no user id, so invalidate tokens for both roles
+                        if employee.role_ref:
+                            bump_role_version(employee.role_ref)
+                        if data[field]:
+                            bump_role_version(role)
                     employee.role_id = data[field]
                 elif field == 'area_of_responsibility_id':
                     if data[field]:
@@ -204,19 +233,16 @@ def update_employee(employee_id):
                 elif field == 'designation_id':
                     employee.designation_id = data[field]
                 elif field == 'total_no_leave_days_annual':
-                    employee.total_no_leave_days_annual = data[field]
-                    # When admin updates annual leave allocation, reset remaining days
-                    # unless there are already approved leaves that need to be accounted for
-                    if data[field] is not None:
-                        from src.models.models import LeaveRequest
-                        approved_leaves = LeaveRequest.query.filter_by(
-                            employee_id=employee.id, 
-                            status='approved'
-                        ).all()
-                        total_used_days = sum(float(leave.days) for leave in approved_leaves)
-                        employee.total_no_leave_days_annual_float = float(data[field]) - total_used_days
-                    else:
+                    # When admin updates annual leave allocation, the ledger carries
+                    # this year's authorised leave over into the new remaining days.
+                    # Clearing the allocation leaves the ledger as it is.
+                    if data[field] is None:
+                        employee.total_no_leave_days_annual = None
                         employee.total_no_leave_days_annual_float = None
+                    else:
+                        remaining = set_allocation(employee, data[field], created_by=current_user.id)
+                        employee.total_no_leave_days_annual = data[field]
+                        employee.total_no_leave_days_annual_float = remaining
                 else:
                     setattr(employee, field, data[field])
         
@@ -245,6 +271,10 @@ def delete_employee(employee_id):
         if employee.shift_rosters or employee.timesheets:
             return jsonify({'error': 'Cannot delete employee with existing shift rosters or timesheets'}), 400
         
+        # Tokens carrying role claims would keep authorising the deleted user;
+        # bumping the role sends them back to the database lookup (404)
+        if employee.role_ref:
+            bump_role_version(employee.role_ref)
         db.session.delete(employee)
         db.session.commit()
         
@@ -1,8 +1,10 @@
-from flask import Blueprint, request, jsonify, send_file, current_app
+from flask import Blueprint, request, jsonify, send_file, current_app, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from src.models.models import User as Employee, ShiftRoster as Roster, Shift, Role, AreaOfResponsibility as Area, Skill, Timesheet
-from src.utils.decorators import admin_required, manager_required
-import pandas as pd
+from src.models.loaders import roster_options, timesheet_options, employee_options
+from src.utils.decorators import admin_required, manager_required, get_current_principal
+from src.utils.excel import write_xlsx
+from src.utils import export_jobs
 import io
 import csv
 from datetime import datetime, timedelta
@@ -16,114 +18,395 @@ import os
 
 export_bp = Blueprint('export', __name__)
 
-@export_bp.route('/employees/csv', methods=['GET'])
-@jwt_required()
-@manager_required
-def export_employees_csv():
-    """Export employees data to CSV format"""
-    try:
-        employees = Employee.query.all()
-
-        # Prepare data for CSV
-        data = []
-        for emp in employees:
-            role_name = emp.role_ref.name if getattr(emp, 'role_ref', None) else ''
-            area_name = emp.area_ref.name if getattr(emp, 'area_ref', None) else ''
-            skills = ', '.join([skill.name for skill in getattr(emp, 'skills', [])])
-
-            data.append({
-                'Employee ID': emp.employee_id or '',
-                'Name': emp.name or '',
-                'Surname': emp.surname or '',
-                'Email': emp.email or '',
-                'Contact Number': emp.contact_no or '',
-                'Role': role_name,
-                'Area of Responsibility': area_name,
-                'Skills': skills,
-                'Hire Date': '',
-                'Status': 'Active'
-            })
+# Rows fetched per round-trip when streaming exports (ORM yield_per / keyset windows)
+EXPORT_BATCH_SIZE = 500
+
+EMPLOYEE_EXPORT_FIELDS = [
+    'Employee ID', 'Name', 'Surname', 'Email', 'Contact Number', 'Role',
+    'Area of Responsibility', 'Skills', 'Hire Date', 'Status'
+]
+
+ROSTER_EXPORT_FIELDS = [
+    'Date', 'Employee ID', 'Employee Name', 'Role', 'Area', 'Shift', 'Start Time',
+    'End Time', 'Duration (Hours)', 'Status', 'Approved By', 'Approved At'
+]
+
+TIMESHEET_EXPORT_FIELDS = [
+    'Date', 'Employee ID', 'Employee Name', 'Shift', 'Hours Worked', 'Status', 'Approved By'
+]
+
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+PDF_TABLE_STYLE = [
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 1), (-1, -1), 8),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black)
+]
+
+# --- Row builders and queries ---
+
+def _employee_export_row(emp):
+    role_name = emp.role_ref.name if getattr(emp, 'role_ref', None) else ''
+    area_name = emp.area_ref.name if getattr(emp, 'area_ref', None) else ''
+    skills = ', '.join([skill.name for skill in getattr(emp, 'skills', [])])
+    return {
+        'Employee ID': emp.employee_id or '',
+        'Name': emp.name or '',
+        'Surname': emp.surname or '',
+        'Email': emp.email or '',
+        'Contact Number': emp.contact_no or '',
+        'Role': role_name,
+        'Area of Responsibility': area_name,
+        'Skills': skills,
+        'Hire Date': '',
+        'Status': 'Active'
+    }
+
+def _roster_export_row(entry):
+    employee = entry.employee
+    shift = entry.shift
+    return {
+        'Date': entry.date.strftime('%Y-%m-%d'),
+        'Employee ID': employee.employee_id,
+        'Employee Name': f"{employee.name} {employee.surname}",
+        'Role': employee.role_ref.name if employee.role_ref else '',
+        'Area': employee.area_ref.name if employee.area_ref else '',
+        'Shift': shift.name,
+        'Start Time': shift.start_time.strftime('%H:%M') if shift.start_time else '',
+        'End Time': shift.end_time.strftime('%H:%M') if shift.end_time else '',
+        'Duration (Hours)': shift.hours,
+        'Status': entry.status.title(),
+        'Approved By': entry.approver.name if entry.approver else '',
+        'Approved At': entry.approved_at.strftime('%Y-%m-%d %H:%M') if entry.approved_at else ''
+    }
+
+def _timesheet_export_row(ts):
+    employee = ts.employee
+    shift = ts.roster.shift if ts.roster else None
+    return {
+        'Date': ts.date.strftime('%Y-%m-%d'),
+        'Employee ID': employee.employee_id,
+        'Employee Name': f"{employee.name} {employee.surname}",
+        'Shift': shift.name if shift else 'N/A',
+        'Hours Worked': ts.hours_worked,
+        'Status': ts.status.title(),
+        'Approved By': ts.timesheet_approver.name if ts.timesheet_approver else 'Pending'
+    }
+
+def _employee_query():
+    return Employee.query.options(*employee_options()).order_by(Employee.id)
+
+def _keyset_windows(query, key, size=EXPORT_BATCH_SIZE):
+    """Iterate query (ordered by key) one window of size rows at a time.
+
+    For queries with selectinload options, which SQLAlchemy refuses to run
+    with yield_per once a do_orm_execute listener is registered (the caches
+    register several).
+    """
+    last = None
+    while True:
+        window = query if last is None else query.filter(key > last)
+        rows = window.limit(size).all()
+        yield from rows
+        if len(rows) < size:
+            return
+        last = getattr(rows[-1], key.key)
+
+def _roster_query(args):
+    query = Roster.query
+    if args.get('start_date'):
+        query = query.filter(Roster.date >= args['start_date'])
+    if args.get('end_date'):
+        query = query.filter(Roster.date <= args['end_date'])
+    return query.options(*roster_options(include_timesheets=False)).order_by(Roster.date, Roster.id)
+
+def _timesheet_query(args):
+    query = Timesheet.query
+    if args.get('start_date'):
+        query = query.filter(Timesheet.date >= args['start_date'])
+    if args.get('end_date'):
+        query = query.filter(Timesheet.date <= args['end_date'])
+    if args.get('employee_id'):
+        query = query.filter(Timesheet.employee_id == args['employee_id'])
+    return query.options(*timesheet_options()).order_by(Timesheet.date, Timesheet.id)
+
+def _counted(rows, report):
+    """Pass rows through, publishing progress every EXPORT_BATCH_SIZE rows."""
+    count = 0
+    for row in rows:
+        yield row
+        count += 1
+        if report and count % EXPORT_BATCH_SIZE == 0:
+            report(count)
+    if report:
+        report(count)
+
+def _employee_rows(report=None):
+    return _counted((_employee_export_row(emp) for emp in _keyset_windows(_employee_query(), Employee.id)), report)
+
+def _roster_rows(args, report=None):
+    return _counted((_roster_export_row(entry) for entry in _roster_query(args).yield_per(EXPORT_BATCH_SIZE)), report)
+
+def _timesheet_rows(args, report=None):
+    return _counted((_timesheet_export_row(ts) for ts in _timesheet_query(args).yield_per(EXPORT_BATCH_SIZE)), report)
+
+# --- Renderers: write one export into a binary file object ---
+# Shared by the synchronous routes and by background export jobs.
+
+def _write_csv(output, fieldnames, rows):
+    text = io.TextIOWrapper(output, encoding='utf-8', newline='')
+    writer = csv.DictWriter(text, fieldnames=fieldnames)
+    writer.writeheader()
+    writer.writerows(rows)
+    text.flush()
+    text.detach()
+
+def _render_employees_csv(args, output, report=None):
+    _write_csv(output, EMPLOYEE_EXPORT_FIELDS, _employee_rows(report))
+
+def _render_roster_csv(args, output, report=None):
+    _write_csv(output, ROSTER_EXPORT_FIELDS, _roster_rows(args, report))
+
+def _render_employees_excel(args, output, report=None):
+    write_xlsx('Employees', EMPLOYEE_EXPORT_FIELDS, _employee_rows(report), max_width=50, output=output)
+
+def _render_roster_excel(args, output, report=None):
+    write_xlsx('Roster', ROSTER_EXPORT_FIELDS, _roster_rows(args, report), max_width=50, output=output)
+
+def _render_timesheets_excel(args, output, report=None):
+    write_xlsx('Timesheets', TIMESHEET_EXPORT_FIELDS, _timesheet_rows(args, report), output=output)
+
+def _render_roster_grid_excel(args, output, report=None):
+    if not args.get('start_date') or not args.get('end_date'):
+        raise ValueError('start_date and end_date are required')
+
+    start_date = datetime.strptime(args['start_date'], '%Y-%m-%d').date()
+    end_date = datetime.strptime(args['end_date'], '%Y-%m-%d').date()
+
+    # Only the shift name is needed per cell: (employee_id, date) -> shift name
+    roster_map = {
+        (employee_id, roster_date): shift_name or 'Unknown'
+        for employee_id, roster_date, shift_name in Roster.query
+            .outerjoin(Shift, Roster.shift_id == Shift.id)
+            .filter(Roster.date.between(start_date, end_date))
+            .with_entities(Roster.employee_id, Roster.date, Shift.name)
+    }
+
+    # Create date range for columns
+    dates = [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+    headers = ['Employee'] + [dt.strftime('%Y-%m-%d (%a)') for dt in dates]
+
+    employees = Employee.query.with_entities(Employee.id, Employee.name, Employee.surname).order_by(Employee.name)
+    rows = (
+        [f"{name} {surname}"] + [roster_map.get((emp_id, dt), '') for dt in dates]
+        for emp_id, name, surname in employees.yield_per(EXPORT_BATCH_SIZE)
+    )
+    write_xlsx('Roster Grid', headers, _counted(rows, report), output=output)
+
+def _render_roster_pdf(args, output, report=None):
+    start_date = args.get('start_date')
+    end_date = args.get('end_date')
+
+    doc = SimpleDocTemplate(output, pagesize=A4)
+    styles = getSampleStyleSheet()
+    story = []
+    title = Paragraph("Shift Roster", styles['Heading1'])
+    story.append(title)
+    story.append(Spacer(1, 12))
+    if start_date and end_date:
+        story.append(Paragraph(f"Period: {start_date} to {end_date}", styles['Normal']))
+        story.append(Spacer(1, 12))
 
-        # Create CSV in memory
-        output = io.StringIO()
-        if data:
-            fieldnames = list(data[0].keys())
-            writer = csv.DictWriter(output, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(data)
+    data = [['Date', 'Employee', 'Shift', 'Time', 'Hours', 'Status', 'Approved By']]
+    for entry in _counted(_roster_query(args).yield_per(EXPORT_BATCH_SIZE), report):
+        emp = entry.employee
+        shift = entry.shift
+        approver = entry.approver.name if entry.approver else ''
+        data.append([
+            entry.date.strftime('%Y-%m-%d'),
+            f"{emp.name} {emp.surname}",
+            shift.name if shift else '',
+            f"{shift.start_time.strftime('%H:%M') if shift and shift.start_time else ''} - {shift.end_time.strftime('%H:%M') if shift and shift.end_time else ''}",
+            str(entry.hours),
+            entry.status.title(),
+            approver
+        ])
+
+    table = Table(data)
+    table.setStyle(TableStyle(PDF_TABLE_STYLE))
+    story.append(table)
+    doc.build(story)
+
+def _render_timesheets_pdf(args, output, report=None):
+    start_date = args.get('start_date')
+    end_date = args.get('end_date')
+
+    doc = SimpleDocTemplate(output, pagesize=A4)
+
+    # Styles
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=16,
+        spaceAfter=30,
+        alignment=1  # Center alignment
+    )
+
+    # Content
+    story = []
+
+    # Title
+    title = Paragraph("Timesheet Report", title_style)
+    story.append(title)
+    story.append(Spacer(1, 12))
+
+    # Date range info
+    if start_date and end_date:
+        date_info = Paragraph(f"Period: {start_date} to {end_date}", styles['Normal'])
+        story.append(date_info)
+        story.append(Spacer(1, 12))
 
-        # Create response
-        output.seek(0)
-        response_data = output.getvalue()
+    # Table data
+    data = [['Date', 'Employee', 'Shift', 'Hours', 'Status', 'Approved By']]
+
+    for timesheet in _counted(_timesheet_query(args).yield_per(EXPORT_BATCH_SIZE), report):
+        employee = timesheet.employee
+        shift = timesheet.roster.shift if timesheet.roster else None
+        approved_by = timesheet.timesheet_approver.name if timesheet.timesheet_approver else 'Pending'
+
+        data.append([
+            timesheet.date.strftime('%Y-%m-%d'),
+            f"{employee.name} {employee.surname}",
+            shift.name if shift else 'N/A',
+            str(timesheet.hours_worked),
+            timesheet.status.title(),
+            approved_by
+        ])
+
+    # Create table
+    table = Table(data)
+    table.setStyle(TableStyle(PDF_TABLE_STYLE))
+    story.append(table)
+
+    # Build PDF
+    doc.build(story)
+
+# (export, format) -> (renderer, file extension, mimetype, download name prefix)
+EXPORT_JOB_TYPES = {
+    ('employees', 'csv'): (_render_employees_csv, 'csv', 'text/csv', 'employees'),
+    ('employees', 'excel'): (_render_employees_excel, 'xlsx', XLSX_MIMETYPE, 'employees'),
+    ('roster', 'csv'): (_render_roster_csv, 'csv', 'text/csv', 'roster'),
+    ('roster', 'excel'): (_render_roster_excel, 'xlsx', XLSX_MIMETYPE, 'roster'),
+    ('roster', 'pdf'): (_render_roster_pdf, 'pdf', 'application/pdf', 'roster'),
+    ('roster_grid', 'excel'): (_render_roster_grid_excel, 'xlsx', XLSX_MIMETYPE, 'roster_grid'),
+    ('timesheets', 'excel'): (_render_timesheets_excel, 'xlsx', XLSX_MIMETYPE, 'timesheets'),
+    ('timesheets', 'pdf'): (_render_timesheets_pdf, 'pdf', 'application/pdf', 'timesheets'),
+}
+
+EXPORT_JOB_PARAMS = ('start_date', 'end_date', 'employee_id')
+
+# --- Response helpers ---
+
+def _timestamp():
+    return datetime.now().strftime("%Y%m%d_%H%M%S")
+
+def _xlsx_response(output, download_name):
+    """Send a temp .xlsx produced by write_xlsx(); closing it removes the file."""
+    return send_file(output, mimetype=XLSX_MIMETYPE, as_attachment=True, download_name=download_name)
+
+def _render_xlsx_response(renderer, args, download_name):
+    output = tempfile.TemporaryFile(suffix='.xlsx')
+    try:
+        renderer(args, output)
+    except Exception:
         output.close()
-
-        # Create file-like object for response
-        file_obj = io.BytesIO(response_data.encode('utf-8'))
-
-        return send_file(
-            file_obj,
-            mimetype='text/csv',
-            as_attachment=True,
-            download_name=f'employees_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
-        )
-
+        raise
+    output.seek(0)
+    return _xlsx_response(output, download_name)
+
+def _render_pdf_response(renderer, args, download_name):
+    buffer = io.BytesIO()
+    renderer(args, buffer)
+    buffer.seek(0)
+    return send_file(buffer, mimetype='application/pdf', as_attachment=True, download_name=download_name)
+
+def _date_arg_error(args):
+    """Error message for a start_date/end_date that is not YYYY-MM-DD, else None."""
+    for key in ('start_date', 'end_date'):
+        if args.get(key):
+            try:
+                datetime.strptime(args[key], '%Y-%m-%d')
+            except ValueError:
+                return f'Invalid {key} format. Use YYYY-MM-DD'
+    return None
+
+def _csv_stream_response(rows, fieldnames, download_name):
+    """Stream dict rows as a CSV attachment.
+
+    Output is flushed to the client every EXPORT_BATCH_SIZE rows, so memory
+    use does not grow with the export and the first bytes go out immediately.
+    The first row is read before the response starts, so a failing query is
+    still answered with a 500. Once streaming, the status has been sent: an
+    error is logged and re-raised, which aborts the connection instead of
+    ending a truncated file cleanly.
+    """
+    rows = iter(rows)
+    try:
+        first = next(rows, None)
     except Exception as e:
+        current_app.logger.exception(f'Export {download_name} failed')
         return jsonify({'error': str(e)}), 500
 
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=fieldnames)
+        writer.writeheader()
+        if first is None:
+            yield buffer.getvalue()
+            return
+        writer.writerow(first)
+        try:
+            for i, row in enumerate(rows, 2):
+                writer.writerow(row)
+                if i % EXPORT_BATCH_SIZE == 0:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate(0)
+        except Exception:
+            current_app.logger.exception(f'Export {download_name} failed while streaming')
+            raise
+        yield buffer.getvalue()
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/csv',
+        headers={'Content-Disposition': f'attachment; filename={download_name}'}
+    )
+
+# --- Synchronous export routes ---
+
+@export_bp.route('/employees/csv', methods=['GET'])
+@jwt_required()
+@manager_required
+def export_employees_csv():
+    """Export employees data to CSV format"""
+    return _csv_stream_response(_employee_rows(), EMPLOYEE_EXPORT_FIELDS, f'employees_{_timestamp()}.csv')
+
 @export_bp.route('/timesheets/excel', methods=['GET'])
 @jwt_required()
 @manager_required
 def export_timesheets_excel():
     """Export timesheets to Excel format"""
     try:
-        start_date = request.args.get('start_date')
-        end_date = request.args.get('end_date')
-        employee_id = request.args.get('employee_id')
-
-        query = Timesheet.query
-        if start_date:
-            query = query.filter(Timesheet.date >= start_date)
-        if end_date:
-            query = query.filter(Timesheet.date <= end_date)
-        if employee_id:
-            query = query.filter(Timesheet.employee_id == employee_id)
-
-        timesheets = query.all()
-
-        data = []
-        for ts in timesheets:
-            employee = ts.employee
-            shift = ts.roster.shift if ts.roster else None
-            approved_by = ts.timesheet_approver.name if ts.timesheet_approver else 'Pending'
-
-            data.append({
-                'Date': ts.date.strftime('%Y-%m-%d'),
-                'Employee ID': employee.employee_id,
-                'Employee Name': f"{employee.name} {employee.surname}",
-                'Shift': shift.name if shift else 'N/A',
-                'Hours Worked': ts.hours_worked,
-                'Status': ts.status.title(),
-                'Approved By': approved_by
-            })
-
-        df = pd.DataFrame(data)
-        output = io.BytesIO()
-
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name='Timesheets', index=False)
-            worksheet = writer.sheets['Timesheets']
-            for column in worksheet.columns:
-                max_length = max(df[column.column].astype(str).map(len).max(), len(column.column))
-                worksheet.column_dimensions[column.column_letter].width = max_length + 2
-
-        output.seek(0)
-
-        return send_file(
-            output,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            as_attachment=True,
-            download_name=f'timesheets_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-        )
+        return _render_xlsx_response(_render_timesheets_excel, request.args, f'timesheets_{_timestamp()}.xlsx')
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -140,50 +423,10 @@ def export_roster_grid_excel():
         if not start_date_str or not end_date_str:
             return jsonify({'error': 'start_date and end_date are required'}), 400
 
-        start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
-        end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
-
-        # Fetch all employees and roster entries for the period
-        employees = Employee.query.order_by(Employee.name).all()
-        roster_entries = Roster.query.filter(Roster.date.between(start_date, end_date)).all()
-
-        # Create a map for quick lookup
-        roster_map = {}
-        for entry in roster_entries:
-            key = (entry.employee_id, entry.date)
-            roster_map[key] = entry.shift.name if entry.shift else 'Unknown'
-
-        # Create date range for columns
-        date_range = pd.date_range(start=start_date, end=end_date)
-
-        # Prepare data for DataFrame
-        data = []
-        for emp in employees:
-            row = {'Employee': f"{emp.name} {emp.surname}"}
-            for dt in date_range:
-                shift_name = roster_map.get((emp.id, dt.date()), '')
-                row[dt.strftime('%Y-%m-%d (%a)')] = shift_name
-            data.append(row)
-
-        df = pd.DataFrame(data)
-
-        output = io.BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name='Roster Grid', index=False)
-            worksheet = writer.sheets['Roster Grid']
-            # Adjust column widths
-            for i, col in enumerate(df.columns):
-                column_letter = chr(ord('A') + i)
-                max_len = max(df[col].astype(str).map(len).max(), len(col))
-                worksheet.column_dimensions[column_letter].width = max_len + 2
-
-        output.seek(0)
-
-        return send_file(
-            output,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            as_attachment=True,
-            download_name=f'roster_grid_{start_date_str}_to_{end_date_str}.xlsx'
+        return _render_xlsx_response(
+            _render_roster_grid_excel,
+            request.args,
+            f'roster_grid_{start_date_str}_to_{end_date_str}.xlsx'
         )
 
     except Exception as e:
@@ -195,57 +438,7 @@ def export_roster_grid_excel():
 def export_employees_excel():
     """Export employees data to Excel format"""
     try:
-        employees = Employee.query.all()
-
-        # Prepare data for Excel
-        data = []
-        for emp in employees:
-            role_name = emp.role_ref.name if getattr(emp, 'role_ref', None) else ''
-            area_name = emp.area_ref.name if getattr(emp, 'area_ref', None) else ''
-            skills = ', '.join([skill.name for skill in getattr(emp, 'skills', [])])
-
-            data.append({
-                'Employee ID': emp.employee_id or '',
-                'Name': emp.name or '',
-                'Surname': emp.surname or '',
-                'Email': emp.email or '',
-                'Contact Number': emp.contact_no or '',
-                'Role': role_name,
-                'Area of Responsibility': area_name,
-                'Skills': skills,
-                'Hire Date': '',
-                'Status': 'Active'
-            })
-
-        # Create Excel file in memory
-        df = pd.DataFrame(data)
-        output = io.BytesIO()
-
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name='Employees', index=False)
-
-            # Auto-adjust column widths
-            worksheet = writer.sheets['Employees']
-            for column in worksheet.columns:
-                max_length = 0
-                column_letter = column[0].column_letter
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except Exception:
-                        pass
-                adjusted_width = min(max_length + 2, 50)
-                worksheet.column_dimensions[column_letter].width = adjusted_width
-
-        output.seek(0)
-
-        return send_file(
-            output,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            as_attachment=True,
-            download_name=f'employees_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-        )
+        return _render_xlsx_response(_render_employees_excel, request.args, f'employees_{_timestamp()}.xlsx')
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -255,62 +448,10 @@ def export_employees_excel():
 @manager_required
 def export_roster_csv():
     """Export roster data to CSV format"""
-    try:
-        start_date = request.args.get('start_date')
-        end_date = request.args.get('end_date')
-
-        query = Roster.query
-        if start_date:
-            query = query.filter(Roster.date >= start_date)
-        if end_date:
-            query = query.filter(Roster.date <= end_date)
-            
-        roster_entries = query.all()
-        
-        # Prepare data for CSV
-        data = []
-        for entry in roster_entries:
-            employee = entry.employee
-            shift = entry.shift
-            
-            data.append({
-                'Date': entry.date.strftime('%Y-%m-%d'),
-                'Employee ID': employee.employee_id,
-                'Employee Name': f"{employee.name} {employee.surname}",
-                'Role': employee.role_ref.name if employee.role_ref else '',
-                'Area': employee.area_ref.name if employee.area_ref else '',
-                'Shift': shift.name,
-                'Start Time': shift.start_time.strftime('%H:%M') if shift.start_time else '',
-                'End Time': shift.end_time.strftime('%H:%M') if shift.end_time else '',
-                'Duration (Hours)': shift.hours,
-                'Status': entry.status.title(),
-                'Approved By': entry.approver.name if entry.approver else '',
-                'Approved At': entry.approved_at.strftime('%Y-%m-%d %H:%M') if entry.approved_at else ''
-            })
-        
-        # Create CSV in memory
-        output = io.StringIO()
-        if data:
-            fieldnames = data[0].keys()
-            writer = csv.DictWriter(output, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(data)
-        
-        output.seek(0)
-        response_data = output.getvalue()
-        output.close()
-        
-        file_obj = io.BytesIO(response_data.encode('utf-8'))
-        
-        return send_file(
-            file_obj,
-            mimetype='text/csv',
-            as_attachment=True,
-            download_name=f'roster_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
-        )
-        
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    date_error = _date_arg_error(request.args)
+    if date_error:
+        return jsonify({'error': date_error}), 400
+    return _csv_stream_response(_roster_rows(request.args), ROSTER_EXPORT_FIELDS, f'roster_{_timestamp()}.csv')
 
 @export_bp.route('/roster/excel', methods=['GET'])
 @jwt_required()
@@ -318,67 +459,7 @@ def export_roster_csv():
 def export_roster_excel():
     """Export roster data to Excel format"""
     try:
-        start_date = request.args.get('start_date')
-        end_date = request.args.get('end_date')
-
-        query = Roster.query
-        if start_date:
-            query = query.filter(Roster.date >= start_date)
-        if end_date:
-            query = query.filter(Roster.date <= end_date)
-            
-        roster_entries = query.all()
-        
-        # Prepare data for Excel
-        data = []
-        for entry in roster_entries:
-            employee = entry.employee
-            shift = entry.shift
-            
-            data.append({
-                'Date': entry.date.strftime('%Y-%m-%d'),
-                'Employee ID': employee.employee_id,
-                'Employee Name': f"{employee.name} {employee.surname}",
-                'Role': employee.role_ref.name if employee.role_ref else '',
-                'Area': employee.area_ref.name if employee.area_ref else '',
-                'Shift': shift.name,
-                'Start Time': shift.start_time.strftime('%H:%M') if shift.start_time else '',
-                'End Time': shift.end_time.strftime('%H:%M') if shift.end_time else '',
-                'Duration (Hours)': shift.hours,
-                'Status': entry.status.title(),
-                'Approved By': entry.approver.name if entry.approver else '',
-                'Approved At': entry.approved_at.strftime('%Y-%m-%d %H:%M') if entry.approved_at else ''
-            })
-        
-        # Create Excel file in memory
-        df = pd.DataFrame(data)
-        output = io.BytesIO()
-        
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name='Roster', index=False)
-            
-            # Auto-adjust column widths
-            worksheet = writer.sheets['Roster']
-            for column in worksheet.columns:
-                max_length = 0
-                column_letter = column[0].column_letter
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-                adjusted_width = min(max_length + 2, 50)
-                worksheet.column_dimensions[column_letter].width = adjusted_width
-        
-        output.seek(0)
-        
-        return send_file(
-            output,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            as_attachment=True,
-            download_name=f'roster_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-        )
+        return _render_xlsx_response(_render_roster_excel, request.args, f'roster_{_timestamp()}.xlsx')
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -389,64 +470,7 @@ def export_roster_excel():
 def export_roster_pdf():
     """Export roster to PDF with basic table."""
     try:
-        start_date = request.args.get('start_date')
-        end_date = request.args.get('end_date')
-
-        query = Roster.query
-        if start_date:
-            query = query.filter(Roster.date >= start_date)
-        if end_date:
-            query = query.filter(Roster.date <= end_date)
-        roster_entries = query.all()
-
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4)
-        styles = getSampleStyleSheet()
-        story = []
-        title = Paragraph("Shift Roster", styles['Heading1'])
-        story.append(title)
-        story.append(Spacer(1, 12))
-        if start_date and end_date:
-            story.append(Paragraph(f"Period: {start_date} to {end_date}", styles['Normal']))
-            story.append(Spacer(1, 12))
-
-        data = [['Date', 'Employee', 'Shift', 'Time', 'Hours', 'Status', 'Approved By']]
-        for entry in roster_entries:
-            emp = entry.employee
-            shift = entry.shift
-            approver = entry.approver.name if entry.approver else ''
-            data.append([
-                entry.date.strftime('%Y-%m-%d'),
-                f"{emp.name} {emp.surname}",
-                shift.name if shift else '',
-                f"{shift.start_time.strftime('%H:%M') if shift and shift.start_time else ''} - {shift.end_time.strftime('%H:%M') if shift and shift.end_time else ''}",
-                str(entry.hours),
-                entry.status.title(),
-                approver
-            ])
-
-        table = Table(data)
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -1), 8),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        story.append(table)
-        doc.build(story)
-        buffer.seek(0)
-        return send_file(
-            buffer,
-            mimetype='application/pdf',
-            as_attachment=True,
-            download_name=f'roster_{datetime.now().strftime("%Y%m%d_%H%M%S")}.pdf'
-        )
+        return _render_pdf_response(_render_roster_pdf, request.args, f'roster_{_timestamp()}.pdf')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -456,93 +480,96 @@ def export_roster_pdf():
 def export_timesheets_pdf():
     """Export timesheets to PDF format"""
     try:
-        start_date = request.args.get('start_date')
-        end_date = request.args.get('end_date')
-        employee_id = request.args.get('employee_id')
-
-        query = Timesheet.query
-        if start_date:
-            query = query.filter(Timesheet.date >= start_date)
-        if end_date:
-            query = query.filter(Timesheet.date <= end_date)
-        if employee_id:
-            query = query.filter(Timesheet.employee_id == employee_id)
-            
-        timesheets = query.all()
-        
-        # Create PDF in memory
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4)
-        
-        # Styles
-        styles = getSampleStyleSheet()
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=16,
-            spaceAfter=30,
-            alignment=1  # Center alignment
-        )
-        
-        # Content
-        story = []
-        
-        # Title
-        title = Paragraph("Timesheet Report", title_style)
-        story.append(title)
-        story.append(Spacer(1, 12))
-        
-        # Date range info
-        if start_date and end_date:
-            date_info = Paragraph(f"Period: {start_date} to {end_date}", styles['Normal'])
-            story.append(date_info)
-            story.append(Spacer(1, 12))
-        
-        # Table data
-        data = [['Date', 'Employee', 'Shift', 'Hours', 'Status', 'Approved By']]
-        
-        for timesheet in timesheets:
-            employee = timesheet.employee
-            shift = timesheet.roster.shift if timesheet.roster else None
-            approved_by = timesheet.timesheet_approver.name if timesheet.timesheet_approver else 'Pending'
-            
-            data.append([
-                timesheet.date.strftime('%Y-%m-%d'),
-                f"{employee.name} {employee.surname}",
-                shift.name if shift else 'N/A',
-                str(timesheet.hours_worked),
-                timesheet.status.title(),
-                approved_by
-            ])
-        
-        # Create table
-        table = Table(data)
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -1), 8),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
+        return _render_pdf_response(_render_timesheets_pdf, request.args, f'timesheets_{_timestamp()}.pdf')
         
-        story.append(table)
-        
-        # Build PDF
-        doc.build(story)
-        buffer.seek(0)
-        
-        return send_file(
-            buffer,
-            mimetype='application/pdf',
-            as_attachment=True,
-            download_name=f'timesheets_{datetime.now().strftime("%Y%m%d_%H%M%S")}.pdf'
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# --- Background export jobs ---
+
+def _can_access_job(job):
+    principal = get_current_principal()
+    if not principal:
+        return False
+    return principal.role_name == 'Admin' or job.get('user_id') == principal.user.id
+
+@export_bp.route('/jobs', methods=['POST'])
+@jwt_required()
+@manager_required
+def create_export_job():
+    """Queue an export to be rendered in the background.
+    Request JSON: { export: 'roster'|'roster_grid'|'timesheets'|'employees', format: 'csv'|'excel'|'pdf',
+                    start_date?: 'YYYY-MM-DD', end_date?: 'YYYY-MM-DD', employee_id?: int }
+    """
+    try:
+        data = request.get_json() or {}
+        export = data.get('export')
+        fmt = data.get('format')
+
+        job_type = EXPORT_JOB_TYPES.get((export, fmt))
+        if not job_type:
+            supported = ', '.join(f'{e}/{f}' for e, f in sorted(EXPORT_JOB_TYPES))
+            return jsonify({'error': f'Unsupported export. Supported: {supported}'}), 400
+
+        args = {key: str(data[key]) for key in EXPORT_JOB_PARAMS if data.get(key) not in (None, '')}
+        date_error = _date_arg_error(args)
+        if date_error:
+            return jsonify({'error': date_error}), 400
+        if export == 'roster_grid' and not ('start_date' in args and 'end_date' in args):
+            return jsonify({'error': 'start_date and end_date are required'}), 400
+
+        renderer, extension, mimetype, prefix = job_type
+        job = export_jobs.submit_job(
+            current_app._get_current_object(),
+            renderer,
+            args,
+            export=export,
+            fmt=fmt,
+            extension=extension,
+            mimetype=mimetype,
+            download_name=f'{prefix}_{_timestamp()}.{extension}',
+            user_id=get_current_principal().user.id
         )
-        
+
+        return jsonify({'job': export_jobs.public_view(job)}), 202
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@export_bp.route('/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+@manager_required
+def get_export_job(job_id):
+    """Report the status and progress of an export job."""
+    try:
+        job = export_jobs.get_job(current_app, job_id)
+        if not job or not _can_access_job(job):
+            return jsonify({'error': 'Export job not found'}), 404
+
+        return jsonify({'job': export_jobs.public_view(job)}), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@export_bp.route('/jobs/<job_id>/download', methods=['GET'])
+@jwt_required()
+@manager_required
+def download_export_job(job_id):
+    """Download the finished artifact of an export job."""
+    try:
+        job = export_jobs.get_job(current_app, job_id)
+        if not job or not _can_access_job(job):
+            return jsonify({'error': 'Export job not found'}), 404
+
+        if job['status'] != 'finished':
+            return jsonify({'error': f"Export job is {job['status']}", 'job': export_jobs.public_view(job)}), 409
+
+        path = export_jobs.get_artifact_path(current_app, job)
+        if not os.path.exists(path):
+            return jsonify({'error': 'Export artifact has expired'}), 410
+
+        return send_file(path, mimetype=job['mimetype'], as_attachment=True, download_name=job['download_name'])
+
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -2,6 +2,7 @@ from flask import Blueprint, request, jsonify, send_file
 from flask_jwt_extended import jwt_required
 from src.models.models import db, User as Employee, Role, AreaOfResponsibility as Area, Skill, Shift
 from src.utils.decorators import admin_required
+from src.utils.employee_import import REQUIRED_COLUMNS, import_employees, validate_employees
 import pandas as pd
 import io
 import json
@@ -11,6 +12,9 @@ import_bp = Blueprint('import', __name__)
 
 ALLOWED_EXTENSIONS = {'csv', 'xlsx', 'xls'}
 
+# Row-level diagnostics returned by /employees/validate (row_error_count has the full total)
+MAX_ROW_ERRORS = 1000
+
 def allowed_file(filename: str) -> bool:
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
@@ -36,90 +40,11 @@ def import_employees_csv():
         else:
             df = pd.read_excel(file)
 
-        required = ['Employee ID', 'Name', 'Surname', 'Email']
-        missing = [c for c in required if c not in df.columns]
+        missing = [c for c in REQUIRED_COLUMNS if c not in df.columns]
         if missing:
             return jsonify({'error': f'Missing required columns: {", ".join(missing)}'}), 400
 
-        imported = 0
-        errors = []
-
-        # Detect skills column name variations
-        skills_col = None
-        for c in df.columns:
-            cl = str(c).strip().lower()
-            if cl in ('skills', 'skills (comma-separated)'):
-                skills_col = c
-                break
-
-        for idx, row in df.iterrows():
-            try:
-                emp_id_val = str(row['Employee ID']).strip() if pd.notna(row['Employee ID']) else None
-                email = str(row['Email']).strip() if pd.notna(row['Email']) else None
-                name = str(row['Name']).strip() if pd.notna(row['Name']) else ''
-                surname = str(row['Surname']).strip() if pd.notna(row['Surname']) else ''
-
-                if not email:
-                    errors.append(f"Row {idx+2}: Email is required")
-                    continue
-
-                # Duplicate check
-                if emp_id_val and Employee.query.filter_by(employee_id=emp_id_val).first():
-                    errors.append(f"Row {idx+2}: Employee ID {emp_id_val} already exists")
-                    continue
-                if Employee.query.filter_by(email=email).first():
-                    errors.append(f"Row {idx+2}: Email {email} already exists")
-                    continue
-
-                # Role
-                role_name = str(row.get('Role')).strip() if pd.notna(row.get('Role')) else 'Employee'
-                role = Role.query.filter_by(name=role_name).first()
-                if not role:
-                    role = Role(name=role_name, permissions='{}')
-                    db.session.add(role)
-                    db.session.flush()
-
-                # Area
-                area = None
-                if pd.notna(row.get('Area of Responsibility')):
-                    area_name = str(row['Area of Responsibility']).strip()
-                    area = Area.query.filter_by(name=area_name).first()
-                    if not area:
-                        area = Area(name=area_name, description=f"Auto-created area: {area_name}")
-                        db.session.add(area)
-                        db.session.flush()
-
-                # Create user (User table is the employees table)
-                google_id = f"import_{emp_id_val or email}"
-                employee = Employee(
-                    google_id=google_id,
-                    email=email,
-                    name=name,
-                    surname=surname,
-                    employee_id=emp_id_val,
-                    contact_no=str(row.get('Contact Number', '')).strip() if pd.notna(row.get('Contact Number')) else '',
-                    role_id=role.id,
-                    area_of_responsibility_id=area.id if area else None,
-                )
-                db.session.add(employee)
-                db.session.flush()
-
-                # Skills
-                if skills_col and pd.notna(row.get(skills_col)):
-                    for s in str(row[skills_col]).split(','):
-                        skill_name = s.strip()
-                        if not skill_name:
-                            continue
-                        skill = Skill.query.filter_by(name=skill_name).first()
-                        if not skill:
-                            skill = Skill(name=skill_name, description=f"Auto-created skill: {skill_name}")
-                            db.session.add(skill)
-                            db.session.flush()
-                        employee.skills.append(skill)
-
-                imported += 1
-            except Exception as e:
-                errors.append(f"Row {idx+2}: {str(e)}")
+        imported, errors = import_employees(df)
 
         db.session.commit()
         return jsonify({'message': f'Successfully imported {imported} employees', 'imported_count': imported, 'errors': errors}), 200
@@ -149,8 +74,7 @@ def validate_employee_import():
         else:
             df = pd.read_excel(file)
 
-        required = ['Employee ID', 'Name', 'Surname', 'Email']
-        missing = [c for c in required if c not in df.columns]
+        missing = [c for c in REQUIRED_COLUMNS if c not in df.columns]
 
         result = {
             'valid': len(missing) == 0,
@@ -158,32 +82,16 @@ def validate_employee_import():
             'missing_columns': missing,
             'available_columns': list(df.columns),
             'sample_data': df.head(3).to_dict('records') if len(df) > 0 else [],
-            'warnings': []
+            'warnings': [],
+            'row_errors': [],
+            'row_error_count': 0
         }
 
         if result['valid']:
-            # Duplicates in file
-            dup_ids = df[df.duplicated(['Employee ID'], keep=False)]['Employee ID'].dropna().astype(str).tolist()
-            if dup_ids:
-                result['warnings'].append(f"Duplicate Employee IDs in file: {', '.join(sorted(set(dup_ids)))}")
-
-            # Existing in DB
-            existing_ids = []
-            for emp_id in df['Employee ID']:
-                emp_id_val = str(emp_id).strip() if pd.notna(emp_id) else None
-                if emp_id_val and Employee.query.filter_by(employee_id=emp_id_val).first():
-                    existing_ids.append(emp_id_val)
-            if existing_ids:
-                result['warnings'].append(f"Employee IDs already exist in database: {', '.join(sorted(set(existing_ids)))}")
-
-            # Email format
-            bad_emails = []
-            for i, row in df.iterrows():
-                email = str(row.get('Email', '')).strip()
-                if email and '@' not in email:
-                    bad_emails.append(f"Row {i+2}: {email}")
-            if bad_emails:
-                result['warnings'].append(f"Invalid email formats: {', '.join(bad_emails[:5])}")
+            warnings, row_errors = validate_employees(df)
+            result['warnings'] = warnings
+            result['row_error_count'] = len(row_errors)
+            result['row_errors'] = row_errors[:MAX_ROW_ERRORS]
 
         return jsonify(result), 200
 
@@ -1,13 +1,19 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required
-from src.models.models import db, LeaveRequest, User, Shift, ShiftRoster
+from src.models.models import db, LeaveRequest, LeaveBalance, User, ShiftRoster
 from src.utils.decorators import get_current_user, manager_required
-from datetime import datetime, timedelta
+from src.utils.pagination import get_page_args, paginate, CursorError
+from src.utils.http_cache import conditional_get
+from src.utils.roster_writes import materialize_leave
+from src.utils.leave_ledger import get_balance, projected_balance, record_leaves, leave_year_for, current_leave_year
+from sqlalchemy.orm import lazyload
+from datetime import datetime
 
 leave_bp = Blueprint('leave', __name__)
 
 @leave_bp.route('', methods=['GET'])
 @jwt_required()
+@conditional_get('leave_requests')
 def get_leave_requests():
     """
     Get leave requests.
@@ -31,8 +37,67 @@ def get_leave_requests():
         if employee_id and current_user.role_ref.name in ['Admin', 'Manager']:
              query = query.filter(LeaveRequest.employee_id == int(employee_id))
 
+        # Opt-in keyset pagination on (start_date desc, id desc)
+        limit, cursor = get_page_args()
+        if limit is not None:
+            requests, next_cursor = paginate(
+                query,
+                [(LeaveRequest.start_date, True), (LeaveRequest.id, True)],
+                lambda r: (r.start_date, r.id),
+                limit,
+                cursor
+            )
+            return jsonify({
+                'leave_requests': [r.to_dict() for r in requests],
+                'next_cursor': next_cursor
+            }), 200
+
         requests = query.order_by(LeaveRequest.start_date.desc()).all()
         return jsonify([r.to_dict() for r in requests]), 200
+    except CursorError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@leave_bp.route('/balance', methods=['GET'])
+@jwt_required()
+def get_leave_balance():
+    """
+    Remaining leave days for a leave year, from the leave ledger.
+    - employee_id: Admins/Managers only (default: the current user).
+    - year: leave year (default: current).
+    - days: also return the balance after taking this many more days.
+    """
+    try:
+        current_user = get_current_user()
+        if not current_user:
+            return jsonify({'error': 'User not found. Please login again.'}), 401
+        employee = current_user
+        employee_id = request.args.get('employee_id', type=int)
+        if employee_id and employee_id != current_user.id:
+            # A user without a role has no access to other employees' balances
+            if not (current_user.role_ref and current_user.role_ref.name in ['Admin', 'Manager']):
+                return jsonify({'error': 'Insufficient permissions'}), 403
+            employee = User.query.get(employee_id)
+            if not employee:
+                return jsonify({'error': 'Employee not found'}), 404
+
+        year = request.args.get('year', type=int) or current_leave_year()
+        result = {
+            'employee_id': employee.id,
+            'leave_year': year,
+            'allocated': float(employee.total_no_leave_days_annual or 0),
+            'used': 0.0,
+            'balance': get_balance(employee, year)
+        }
+        row = LeaveBalance.query.get((employee.id, year))
+        if row:
+            result.update(allocated=row.allocated, used=row.used)
+
+        days = request.args.get('days', type=float)
+        if days is not None:
+            result['projected_balance'] = projected_balance(employee, days, year)
+        return jsonify(result), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -56,18 +121,8 @@ def create_leave_request():
 
         days = (end_date - start_date).days + 1
         
-        # Calculate remaining days when leave is created
-        # Get all authorised leave for this employee
-        authorised_leaves = LeaveRequest.query.filter_by(
-            employee_id=current_user.id, 
-            status='authorised'
-        ).all()
-        
-        total_used_days = sum(float(leave.days) for leave in authorised_leaves)
-        annual_leave_allocation = float(current_user.total_no_leave_days_annual or 0)
-        
         # Calculate what would remain if this leave is approved
-        remaining_days = annual_leave_allocation - total_used_days - days
+        remaining_days = projected_balance(current_user, days, leave_year_for(start_date))
 
         new_request = LeaveRequest(
             employee_id=current_user.id,
@@ -117,10 +172,7 @@ def approve_leave_request(request_id):
 
         # If rejected at approval stage, calculate current remaining days (no deduction)
         if action == 'reject':
-            current_remaining = (float(employee.total_no_leave_days_annual or 0) - 
-                               sum(float(leave.days) for leave in 
-                                   LeaveRequest.query.filter_by(employee_id=employee.id, status='authorised').all()))
-            leave_request.no_of_leave_days_remaining = current_remaining
+            leave_request.no_of_leave_days_remaining = get_balance(employee, leave_year_for(leave_request.start_date))
 
         # Don't calculate leave days for approvals yet - that happens at authorization stage
         
@@ -131,6 +183,38 @@ def approve_leave_request(request_id):
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+def _add_auth_comment(leave_request, auth_comment):
+    if auth_comment:
+        existing_comment = leave_request.action_comment or ''
+        leave_request.action_comment = f"{existing_comment}\nAuth: {auth_comment}" if existing_comment else f"Auth: {auth_comment}"
+
+def _authorise(leave_requests, employees, current_user):
+    """Authorise approved leave requests: deduct them and put the days on the roster.
+
+    employees maps employee_id -> User. Round-trips do not depend on the
+    number of requests or days. The caller commits.
+    """
+    now = datetime.utcnow()
+    for leave_request in leave_requests:
+        leave_request.status = 'authorised'
+        leave_request.authorised_by = current_user.id
+        leave_request.authorised_at = now
+
+    # NOW deduct the leave from the balance (only on authorization)
+    remaining = record_leaves(leave_requests, employees, created_by=current_user.id)
+
+    # Update both the leave request and user records (requests are deducted in
+    # start-date order, so the employee keeps the balance after their last one).
+    # The user column holds the current year's balance only.
+    this_year = current_leave_year()
+    for leave_request in sorted(leave_requests, key=lambda lr: (lr.start_date, lr.id)):
+        leave_request.no_of_leave_days_remaining = remaining[leave_request.id]
+        if leave_year_for(leave_request.start_date) == this_year:
+            employees[leave_request.employee_id].total_no_leave_days_annual_float = remaining[leave_request.id]
+
+    # "On Leave" roster entries; days that already have a shift keep it
+    materialize_leave(leave_requests)
+
 @leave_bp.route('/<int:request_id>/authorise', methods=['POST'])
 @jwt_required()
 @manager_required
@@ -153,49 +237,12 @@ def authorise_leave_request(request_id):
 
         # Get the employee who made the leave request
         employee = User.query.get(leave_request.employee_id)
+        if not employee:
+            return jsonify({'error': 'Employee not found'}), 404
         
         # Update authorization fields (second stage)
         if action == 'authorise':
-            leave_request.status = 'authorised'
-            leave_request.authorised_by = current_user.id
-            leave_request.authorised_at = datetime.utcnow()
-            
-            # NOW calculate and update remaining leave days (only on authorization)
-            authorised_leaves = LeaveRequest.query.filter_by(
-                employee_id=employee.id, 
-                status='authorised'
-            ).all()
-            
-            total_used_days = sum(float(leave.days) for leave in authorised_leaves) + float(leave_request.days)
-            annual_allocation = float(employee.total_no_leave_days_annual or 0)
-            remaining_days = annual_allocation - total_used_days
-            
-            # Update both the leave request and user records
-            leave_request.no_of_leave_days_remaining = remaining_days
-            employee.total_no_leave_days_annual_float = remaining_days
-            
-            # Find the "On Leave" shift and create roster entries
-            leave_shift = Shift.query.filter_by(name='On Leave').first()
-            if leave_shift:
-                current_date = leave_request.start_date
-                while current_date <= leave_request.end_date:
-                    # Check if a shift already exists for this employee on this day
-                    existing_roster = ShiftRoster.query.filter_by(
-                        employee_id=leave_request.employee_id,
-                        date=current_date
-                    ).first()
-
-                    if not existing_roster:
-                        new_roster_entry = ShiftRoster(
-                            employee_id=leave_request.employee_id,
-                            shift_id=leave_shift.id,
-                            date=current_date,
-                            hours=0,
-                            status='approved'
-                        )
-                        db.session.add(new_roster_entry)
-
-                    current_date += timedelta(days=1)
+            _authorise([leave_request], {employee.id: employee}, current_user)
         else:
             # Rejected at authorization stage - revert to pending or rejected
             leave_request.status = 'rejected'
@@ -203,16 +250,10 @@ def authorise_leave_request(request_id):
             leave_request.authorised_at = datetime.utcnow()
             
             # No change to remaining days since it was never deducted
-            current_remaining = (float(employee.total_no_leave_days_annual or 0) - 
-                               sum(float(leave.days) for leave in 
-                                   LeaveRequest.query.filter_by(employee_id=employee.id, status='authorised').all()))
-            leave_request.no_of_leave_days_remaining = current_remaining
+            leave_request.no_of_leave_days_remaining = get_balance(employee, leave_year_for(leave_request.start_date))
 
         # Add authorization comment if provided
-        auth_comment = data.get('action_comment', '')
-        if auth_comment:
-            existing_comment = leave_request.action_comment or ''
-            leave_request.action_comment = f"{existing_comment}\nAuth: {auth_comment}" if existing_comment else f"Auth: {auth_comment}"
+        _add_auth_comment(leave_request, data.get('action_comment', ''))
 
         db.session.commit()
         return jsonify(leave_request.to_dict()), 200
@@ -221,6 +262,53 @@ def authorise_leave_request(request_id):
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@leave_bp.route('/authorise/bulk', methods=['POST'])
+@jwt_required()
+@manager_required
+def authorise_leave_requests_bulk():
+    """Authorise a batch of approved leave requests (e.g. at year end).
+
+    All-or-nothing: if any id is unknown, not in approved status or belongs
+    to an employee who no longer exists, nothing is authorised and errors
+    lists each problem.
+    """
+    try:
+        current_user = get_current_user()
+        data = request.get_json() or {}
+        ids = data.get('ids') or []
+        # bool is an int subclass; true/false are not ids
+        if not isinstance(ids, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+            return jsonify({'error': 'ids must be a list of leave request ids'}), 400
+        if not ids:
+            return jsonify({'error': 'No leave requests provided'}), 400
+
+        leave_requests = LeaveRequest.query.filter(LeaveRequest.id.in_(set(ids))).all()
+        found = {lr.id: lr for lr in leave_requests}
+        employees = {
+            u.id: u for u in User.query.options(lazyload(User.skills))
+            .filter(User.id.in_({lr.employee_id for lr in leave_requests}))
+        }
+        errors = [f'Leave request {i}: not found' for i in dict.fromkeys(ids) if i not in found]
+        errors += [f'Leave request {lr.id}: must be approved first' for lr in leave_requests if lr.status != 'approved']
+        errors += [f'Leave request {lr.id}: employee not found' for lr in leave_requests if lr.employee_id not in employees]
+        if errors:
+            return jsonify({'error': 'Some leave requests could not be authorised', 'errors': errors}), 400
+
+        _authorise(leave_requests, employees, current_user)
+        for leave_request in leave_requests:
+            _add_auth_comment(leave_request, data.get('action_comment', ''))
+
+        db.session.commit()
+        return jsonify({
+            'message': f'{len(leave_requests)} leave requests authorised',
+            'authorised_count': len(leave_requests),
+            'ids': sorted(found)
+        }), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 # Keep the old endpoint for backward compatibility (deprecated)
 @leave_bp.route('/<int:request_id>/action', methods=['POST'])
 @jwt_required()
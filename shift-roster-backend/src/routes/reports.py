@@ -1,9 +1,12 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required
-from src.models.models import db, User, Skill, License, Role, AreaOfResponsibility, Designation, ShiftRoster, LeaveRequest
+from src.models.models import db, User, Skill, License, EmployeeLicense, Role, AreaOfResponsibility, Designation, Shift, ShiftRoster, LeaveRequest
+from src.models.loaders import roster_options
+from src.models.serializers import get_view_arg, serialize_users, UnknownViewError
+from src.utils.availability import availability_snapshot, ON_SHIFT, ON_LEAVE
 from src.utils.decorators import manager_required
-from sqlalchemy import and_
-from datetime import date
+from sqlalchemy import and_, func
+from datetime import date, datetime
 
 reports_bp = Blueprint('reports', __name__)
 
@@ -30,7 +33,7 @@ def employee_search_report():
             query = query.join(User.skills).filter(Skill.id.in_(skill_ids))
 
         if license_ids:
-            query = query.join(User.licenses_assoc).filter(License.id.in_(license_ids))
+            query = query.join(User.licenses_assoc).filter(EmployeeLicense.license_id.in_(license_ids))
 
         if role_ids:
             query = query.filter(User.role_id.in_(role_ids))
@@ -42,44 +45,27 @@ def employee_search_report():
             query = query.filter(User.designation_id.in_(designation_ids))
 
         # Use distinct to avoid duplicate users if they have multiple matching skills/licenses
-        employees = query.distinct().all()
+        employees = serialize_users(query.distinct().order_by(User.id), get_view_arg())
 
-        today = date.today()
+        snapshot = availability_snapshot([employee['id'] for employee in employees])
         results = []
 
-        for employee in employees:
-            # Determine current status
+        for emp_dict in employees:
+            # Leave overrides shift status if both exist
+            availability = snapshot[emp_dict['id']]
             status = 'Available'
-
-            # Check for shift
-            on_shift = ShiftRoster.query.filter(
-                and_(
-                    ShiftRoster.employee_id == employee.id,
-                    ShiftRoster.date == today,
-                    ShiftRoster.status == 'approved'    
-                )
-            ).first()
-            if on_shift:
+            if availability.status == ON_LEAVE:
+                status = f"On Leave ({availability.leave_type})"
+            elif availability.status == ON_SHIFT:
                 status = 'On Shift'
 
-            # Check for leave (overrides shift status if both exist)
-            on_leave = LeaveRequest.query.filter(
-                and_(
-                    LeaveRequest.employee_id == employee.id,
-                    LeaveRequest.start_date <= today,
-                    LeaveRequest.end_date >= today,
-                    LeaveRequest.status == 'approved'
-                )
-            ).first()
-            if on_leave:
-                status = f"On Leave ({on_leave.leave_type})"
-
-            emp_dict = employee.to_dict()
             emp_dict['current_status'] = status
             results.append(emp_dict)
 
         return jsonify(results), 200
 
+    except UnknownViewError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -105,7 +91,7 @@ def shift_acceptance_report():
             end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
             query = query.filter(ShiftRoster.date <= end_date)
 
-        roster_entries = query.order_by(ShiftRoster.date, ShiftRoster.employee_id).all()
+        roster_entries = query.options(*roster_options()).order_by(ShiftRoster.date, ShiftRoster.employee_id).all()
 
         return jsonify([entry.to_dict() for entry in roster_entries]), 200
 
@@ -125,7 +111,7 @@ def employee_history_report(employee_id):
             return jsonify({'error': 'Employee not found'}), 404
 
         # Get all shift roster entries for this employee, ordered by date
-        history = ShiftRoster.query.filter_by(employee_id=employee_id).order_by(ShiftRoster.date.desc()).all()
+        history = ShiftRoster.query.filter_by(employee_id=employee_id).options(*roster_options()).order_by(ShiftRoster.date.desc()).all()
 
         # Get a summary of shift types, roles, etc.
         shift_type_counts = db.session.query(Shift.name, func.count(ShiftRoster.id)).join(ShiftRoster).filter(ShiftRoster.employee_id == employee_id).group_by(Shift.name).all()
@@ -1,15 +1,25 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required
 from src.models.models import db, ShiftRoster, User, Shift, Timesheet
+from src.models.loaders import roster_options
 from src.utils.decorators import permission_required, get_current_user
 from src.utils.logging import log_activity
+from src.utils.leave_calendar import get_leave_calendar, CALENDAR_STATUSES
+from src.utils.pagination import get_page_args, paginate, CursorError
+from src.utils.http_cache import conditional_get
+from src.utils.roster_writes import (
+    create_roster_entries, write_roster_rows, resolve_conflict_policy, RosterConflictError, ROSTER_BATCH_SIZE
+)
+from src.models.rollups import mark_dates_dirty
 from datetime import datetime, date
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, delete, or_
+from sqlalchemy.exc import IntegrityError
 
 roster_bp = Blueprint('roster', __name__)
 
 @roster_bp.route('', methods=['GET'])
 @jwt_required()
+@conditional_get('shift_roster', 'shifts', 'areas_of_responsibility', 'timesheets')
 def get_roster():
     """Get shift roster with optional filtering"""
     try:
@@ -63,14 +73,34 @@ def get_roster():
         if status:
             query = query.filter(ShiftRoster.status == status)
         
+        query = query.join(Shift).options(*roster_options())
+
+        # Opt-in keyset pagination on (date, shift start time, id)
+        limit, cursor = get_page_args()
+        if limit is not None:
+            roster_entries, next_cursor = paginate(
+                query,
+                [(ShiftRoster.date, False), (Shift.start_time, False), (ShiftRoster.id, False)],
+                lambda entry: (entry.date, entry.shift.start_time, entry.id),
+                limit,
+                cursor
+            )
+            return jsonify({
+                'roster': [entry.to_dict() for entry in roster_entries],
+                'total': len(roster_entries),
+                'next_cursor': next_cursor
+            }), 200
+
         # Order by date and shift start time
-        roster_entries = query.join(Shift).order_by(ShiftRoster.date, Shift.start_time).all()
+        roster_entries = query.order_by(ShiftRoster.date, Shift.start_time).all()
         
         return jsonify({
             'roster': [entry.to_dict() for entry in roster_entries],
             'total': len(roster_entries)
         }), 200
         
+    except CursorError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -111,29 +141,38 @@ def create_roster_entry():
         except ValueError:
             return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
         
-        # Check for existing roster entry
-        existing_entry = ShiftRoster.query.filter(
-            and_(
-                ShiftRoster.employee_id == data['employee_id'],
-                ShiftRoster.date == roster_date
-            )
-        ).first()
+        try:
+            policy = resolve_conflict_policy(data.get('on_conflict'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        if existing_entry:
-            return jsonify({'error': 'Employee already has a shift scheduled for this date'}), 400
+        # Create roster entry; the unique (employee_id, date) index decides conflicts
+        try:
+            written = write_roster_rows([{
+                'employee_id': employee.id,
+                'shift_id': shift.id,
+                'date': roster_date,
+                'hours': data['hours'],
+                'notes': data.get('notes', ''),
+                'area_of_responsibility_id': data.get('area_of_responsibility_id')
+            }], policy)
+        except RosterConflictError as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 400
         
-        # Create roster entry
-        roster_entry = ShiftRoster(
-            employee_id=data['employee_id'],
-            shift_id=data['shift_id'],
-            date=roster_date,
-            hours=data['hours'],
-            notes=data.get('notes', ''),
-            area_of_responsibility_id=data.get('area_of_responsibility_id')
-        )
+        if not written:
+            # 'skip' policy: keep the existing entry
+            db.session.rollback()
+            existing_entry = ShiftRoster.query.options(*roster_options()).filter_by(
+                employee_id=employee.id, date=roster_date
+            ).first()
+            return jsonify({
+                'message': 'Employee already has a shift scheduled for this date; existing entry kept',
+                'roster_entry': existing_entry.to_dict()
+            }), 200
         
-        db.session.add(roster_entry)
         db.session.commit()
+        roster_entry = ShiftRoster.query.options(*roster_options()).get(written[(employee.id, roster_date)])
 
         # Log activity
         log_activity(
@@ -142,10 +181,13 @@ def create_roster_entry():
             f"Scheduled {employee.name} {employee.surname} for {shift.name} on {roster_date.strftime('%Y-%m-%d')}"
         )
         
-        return jsonify({
+        response = {
             'message': 'Roster entry created successfully',
             'roster_entry': roster_entry.to_dict()
-        }), 201
+        }
+        if get_leave_calendar().is_on_leave(employee.id, roster_date, statuses=CALENDAR_STATUSES):
+            response['warning'] = 'Employee is on leave on this date'
+        return jsonify(response), 201
         
     except Exception as e:
         db.session.rollback()
@@ -198,7 +240,43 @@ def update_roster_entry(roster_id):
         if 'area_of_responsibility_id' in data:
             roster_entry.area_of_responsibility_id = data['area_of_responsibility_id']
 
-        db.session.commit()
+        # Moving the entry onto a day the employee already works is decided by
+        # the same conflict policy as creation
+        if 'employee_id' in data or 'date' in data:
+            try:
+                policy = resolve_conflict_policy(data.get('on_conflict'))
+            except ValueError as e:
+                db.session.rollback()
+                return jsonify({'error': str(e)}), 400
+            with db.session.no_autoflush:
+                clash = ShiftRoster.query.filter(
+                    ShiftRoster.employee_id == roster_entry.employee_id,
+                    ShiftRoster.date == roster_entry.date,
+                    ShiftRoster.id != roster_entry.id
+                ).first()
+                if clash is not None:
+                    if policy == 'error':
+                        db.session.rollback()
+                        return jsonify({'error': 'Employee already has a shift scheduled for this date'}), 400
+                    if policy == 'skip':
+                        db.session.rollback()
+                        return jsonify({
+                            'message': 'Employee already has a shift scheduled for this date; entry left unchanged',
+                            'roster_entry': ShiftRoster.query.options(*roster_options()).get(roster_id).to_dict()
+                        }), 200
+                    if clash.timesheets:
+                        db.session.rollback()
+                        return jsonify({'error': 'Cannot replace a roster entry with associated timesheets'}), 400
+                    # Deleted ahead of the flush, which would write the move first
+                    mark_dates_dirty(db.session, [clash.date])
+                    db.session.execute(delete(ShiftRoster).where(ShiftRoster.id == clash.id))
+
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # A concurrent write took the day after the check
+            db.session.rollback()
+            return jsonify({'error': 'Employee already has a shift scheduled for this date'}), 400
         
         return jsonify({
             'message': 'Roster entry updated successfully',
@@ -318,62 +396,17 @@ def create_bulk_roster():
         if not entries:
             return jsonify({'error': 'No entries provided'}), 400
         
-        created_entries = []
-        errors = []
+        try:
+            policy = resolve_conflict_policy(data.get('on_conflict'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        for i, entry_data in enumerate(entries):
-            try:
-                # Validate required fields
-                required_fields = ['employee_id', 'shift_id', 'date', 'hours']
-                for field in required_fields:
-                    if field not in entry_data:
-                        errors.append(f'Entry {i+1}: {field} is required')
-                        continue
-                
-                # Validate employee and shift
-                employee = User.query.get(entry_data['employee_id'])
-                if not employee:
-                    errors.append(f'Entry {i+1}: Employee not found')
-                    continue
-                
-                shift = Shift.query.get(entry_data['shift_id'])
-                if not shift:
-                    errors.append(f'Entry {i+1}: Shift not found')
-                    continue
-                
-                # Parse date
-                try:
-                    roster_date = datetime.strptime(entry_data['date'], '%Y-%m-%d').date()
-                except ValueError:
-                    errors.append(f'Entry {i+1}: Invalid date format')
-                    continue
-                
-                # Check for existing entry
-                existing_entry = ShiftRoster.query.filter(
-                    and_(
-                        ShiftRoster.employee_id == entry_data['employee_id'],
-                        ShiftRoster.date == roster_date
-                    )
-                ).first()
-                
-                if existing_entry:
-                    errors.append(f'Entry {i+1}: Employee already scheduled for this date')
-                    continue
-                
-                # Create roster entry
-                roster_entry = ShiftRoster(
-                    employee_id=entry_data['employee_id'],
-                    shift_id=entry_data['shift_id'],
-                    date=roster_date,
-                    hours=entry_data['hours'],
-                    notes=entry_data.get('notes', '')
-                )
-                
-                db.session.add(roster_entry)
-                created_entries.append(roster_entry)
-                
-            except Exception as e:
-                errors.append(f'Entry {i+1}: {str(e)}')
+        try:
+            created_ids, errors, warnings = create_roster_entries(entries, policy)
+        except RosterConflictError as e:
+            # Another request scheduled one of these employees after our check
+            db.session.rollback()
+            return jsonify({'error': 'Some entries could not be created', 'errors': [str(e)]}), 400
         
         if errors:
             db.session.rollback()
@@ -384,9 +417,29 @@ def create_bulk_roster():
         
         db.session.commit()
         
+        # 'return': 'ids' skips serializing the created entries (useful for large template runs)
+        if data.get('return') == 'ids':
+            return jsonify({
+                'message': f'{len(created_ids)} roster entries created successfully',
+                'created_count': len(created_ids),
+                'skipped_count': len(entries) - len(created_ids),
+                'warnings': warnings,
+                'ids': created_ids
+            }), 201
+        
+        # Reload with relationships eager-loaded so to_dict() does not lazy-load per entry
+        entries_by_id = {}
+        for start in range(0, len(created_ids), ROSTER_BATCH_SIZE):
+            chunk = created_ids[start:start + ROSTER_BATCH_SIZE]
+            for entry in ShiftRoster.query.options(*roster_options()).filter(ShiftRoster.id.in_(chunk)):
+                entries_by_id[entry.id] = entry
+        
         return jsonify({
-            'message': f'{len(created_entries)} roster entries created successfully',
-            'entries': [entry.to_dict() for entry in created_entries]
+            'message': f'{len(created_ids)} roster entries created successfully',
+            'created_count': len(created_ids),
+            'skipped_count': len(entries) - len(created_ids),
+            'warnings': warnings,
+            'entries': [entries_by_id[entry_id].to_dict() for entry_id in created_ids]
         }), 201
         
     except Exception as e:
@@ -1,8 +1,12 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required
 from datetime import datetime
+from sqlalchemy import insert, select, literal
+from sqlalchemy.exc import IntegrityError
 from src.models.models import db, Timesheet, ShiftRoster, User
+from src.models.rollups import mark_range_dirty
 from src.utils.decorators import get_current_user
+from src.utils.pagination import get_page_args, paginate, CursorError
 
 timesheets_bp = Blueprint('timesheets', __name__)
 
@@ -37,15 +41,67 @@ def get_timesheets():
         except ValueError:
             return jsonify({'error': 'Invalid end_date format. Use YYYY-MM-DD'}), 400
 
-    results = query.order_by(Timesheet.date.desc()).all()
+    # Opt-in keyset pagination on (date desc, id desc)
+    try:
+        limit, cursor = get_page_args()
+        if limit is not None:
+            results, next_cursor = paginate(
+                query,
+                [(Timesheet.date, True), (Timesheet.id, True)],
+                lambda row: (row[0].date, row[0].id),
+                limit,
+                cursor
+            )
+        else:
+            results = query.order_by(Timesheet.date.desc()).all()
+    except CursorError as e:
+        return jsonify({'error': str(e)}), 400
+
     timesheets = []
     for ts, user in results:
         ts_dict = ts.to_dict()
         ts_dict['employee_name'] = user.name
         ts_dict['employee_surname'] = user.surname
         timesheets.append(ts_dict)
+
+    if limit is not None:
+        return jsonify({'timesheets': timesheets, 'next_cursor': next_cursor}), 200
     return jsonify(timesheets), 200
 
+def _insert_missing_timesheets(start_dt, end_dt, employee_id=None):
+    """Create pending timesheets for approved rosters in the range that have none.
+
+    Runs as a single INSERT ... SELECT anti-join against timesheets, so the
+    cost does not depend on the number of rosters. Returns the rows inserted.
+    """
+    roster_query = (
+        select(
+            ShiftRoster.employee_id,
+            ShiftRoster.id,
+            ShiftRoster.date,
+            ShiftRoster.hours,
+            literal('pending'),
+            literal(datetime.utcnow()),
+        )
+        .outerjoin(Timesheet, Timesheet.roster_id == ShiftRoster.id)
+        .where(
+            ShiftRoster.status == 'approved',
+            ShiftRoster.date >= start_dt,
+            ShiftRoster.date <= end_dt,
+            Timesheet.id.is_(None),
+        )
+    )
+    if employee_id:
+        roster_query = roster_query.where(ShiftRoster.employee_id == int(employee_id))
+
+    # INSERT ... SELECT bypasses the ORM flush hooks that keep dashboard rollups current
+    mark_range_dirty(db.session, start_dt, end_dt)
+    stmt = insert(Timesheet).from_select(
+        ['employee_id', 'roster_id', 'date', 'hours_worked', 'status', 'created_at'],
+        roster_query,
+    )
+    return db.session.execute(stmt).rowcount
+
 @timesheets_bp.route('/generate', methods=['POST'])
 def generate_timesheets():
     """Generate timesheets from roster entries within a date range.
@@ -69,30 +125,16 @@ def generate_timesheets():
             return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
 
         # Generate timesheets only from approved shifts
-        query = ShiftRoster.query.filter_by(status='approved')
-
-        if employee_id:
-            query = query.filter(ShiftRoster.employee_id == int(employee_id))
-
-        query = query.filter(ShiftRoster.date >= start_dt, ShiftRoster.date <= end_dt)
-
-        rosters = query.all()
-        created = 0
-        for r in rosters:
-            existing = Timesheet.query.filter_by(roster_id=r.id).first()
-            if existing:
-                continue
-            ts = Timesheet(
-                employee_id=r.employee_id,
-                roster_id=r.id,
-                date=r.date,
-                hours_worked=r.hours,
-                status='pending'
-            )
-            db.session.add(ts)
-            created += 1
+        try:
+            created = _insert_missing_timesheets(start_dt, end_dt, employee_id)
+            db.session.commit()
+        except IntegrityError:
+            # A concurrent run inserted some of the same rosters first; the
+            # unique index rejected ours, so retry against the committed rows.
+            db.session.rollback()
+            created = _insert_missing_timesheets(start_dt, end_dt, employee_id)
+            db.session.commit()
 
-        db.session.commit()
         return jsonify({'message': f'Generated {created} timesheets', 'created': created}), 201
 
     except Exception as e:
@@ -0,0 +1,197 @@
+import threading
+import time
+from datetime import date
+from functools import wraps
+from urllib.parse import urlparse
+from cachetools import TTLCache
+from flask import current_app, request, has_app_context
+from src.utils.table_tracking import on_after_commit
+
+# Response cache for the read-heavy analytics aggregates.
+#
+# Responses are cached per endpoint and normalized query parameters. Each
+# cached endpoint declares the tables it reads; when a transaction that wrote
+# to one of those tables commits, the endpoint's generation is bumped, which
+# retires every cached variant of that endpoint (and only that endpoint).
+# Entries also expire after ANALYTICS_CACHE_TTL seconds.
+#
+# Backends (ANALYTICS_CACHE_BACKEND):
+#   local  -- per-process LRU + TTL cache (cachetools). Other worker processes
+#             only see this process's invalidations once their entries expire.
+#   shared -- a Redis-compatible store at ANALYTICS_CACHE_URL shared by all
+#             workers. 'memory://' selects an in-process stand-in with the
+#             same interface, for development and tests.
+#   none   -- caching disabled.
+
+# endpoint -> tables its response is computed from
+CACHE_DEPENDENCIES = {
+    'skill-distribution': {'skills', 'employee_skills', 'users'},
+    'employees-by-role': {'roles', 'users'},
+    'employees-by-area': {'areas_of_responsibility', 'users', 'shift_roster'},
+    'employees-by-shift': {'shifts', 'shift_roster'},
+    'weekly-approval-trends': {'shift_roster'},
+    'leave-summary': {'leave_requests'},
+}
+
+def _endpoints_for(tables):
+    return {name for name, deps in CACHE_DEPENDENCIES.items() if deps & tables}
+
+class LocalCacheBackend:
+    """In-process LRU cache with a per-entry TTL."""
+
+    def __init__(self, maxsize=512, ttl=300):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            return self._cache.get(key)
+
+    def set(self, key, value):
+        with self._lock:
+            self._cache[key] = value
+
+    def generation(self, name):
+        return self._generations.get(name, 0)
+
+    def invalidate(self, name):
+        with self._lock:
+            self._generations[name] = self._generations.get(name, 0) + 1
+            prefix = f'{name}:'
+            for key in [k for k in self._cache.keys() if k.startswith(prefix)]:
+                del self._cache[key]
+
+class InMemorySharedClient:
+    """Minimal stand-in for the Redis client calls used by SharedCacheBackend."""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def _live(self, key):
+        value, expires_at = self._data.get(key, (None, None))
+        if expires_at is not None and expires_at <= time.monotonic():
+            self._data.pop(key, None)
+            return None
+        return value
+
+    def get(self, key):
+        with self._lock:
+            return self._live(key)
+
+    def set(self, key, value, ex=None):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ex if ex else None)
+
+    def incr(self, key):
+        with self._lock:
+            value = int(self._live(key) or 0) + 1
+            self._data[key] = (value, None)
+            return value
+
+class SharedCacheBackend:
+    """Cache kept in a Redis-compatible store so every worker sees invalidations."""
+
+    def __init__(self, client, ttl=300, prefix='analytics:'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url, ttl=300):
+        if urlparse(url).scheme == 'memory':
+            return cls(InMemorySharedClient(), ttl=ttl)
+        import redis  # optional dependency, only needed for the shared backend
+        return cls(redis.Redis.from_url(url), ttl=ttl)
+
+    def get(self, key):
+        return self.client.get(self.prefix + key)
+
+    def set(self, key, value):
+        self.client.set(self.prefix + key, value, ex=self.ttl)
+
+    def generation(self, name):
+        return int(self.client.get(f'{self.prefix}gen:{name}') or 0)
+
+    def invalidate(self, name):
+        # Keys embed the generation, so bumping it retires them; they expire by TTL
+        self.client.incr(f'{self.prefix}gen:{name}')
+
+def _create_backend(config):
+    kind = config.get('ANALYTICS_CACHE_BACKEND', 'local')
+    ttl = config.get('ANALYTICS_CACHE_TTL', 300)
+    if kind == 'none':
+        return None
+    if kind == 'shared':
+        return SharedCacheBackend.from_url(config.get('ANALYTICS_CACHE_URL') or 'memory://', ttl=ttl)
+    if kind == 'local':
+        return LocalCacheBackend(maxsize=config.get('ANALYTICS_CACHE_MAXSIZE', 512), ttl=ttl)
+    raise ValueError(f"Unknown ANALYTICS_CACHE_BACKEND '{kind}'. Use local, shared or none")
+
+def get_cache_backend():
+    """The current app's cache backend (None when caching is disabled)."""
+    extensions = current_app.extensions
+    if 'analytics_cache' not in extensions:
+        extensions['analytics_cache'] = _create_backend(current_app.config)
+    return extensions['analytics_cache']
+
+def invalidate_endpoints(names):
+    backend = get_cache_backend()
+    if backend is None:
+        return
+    for name in names:
+        try:
+            backend.invalidate(name)
+        except Exception as e:
+            current_app.logger.warning(f'Analytics cache invalidation failed for {name}: {e}')
+
+def cache_key(name, generation, params, daily=False):
+    """'<endpoint>:<generation>:<sorted non-empty params>' (plus today's date for daily endpoints)."""
+    parts = [f'{k}={v}' for k, v in sorted(params.items()) if v not in (None, '')]
+    if daily:
+        # Default date ranges are relative to today
+        parts.append(f'today={date.today().isoformat()}')
+    return f"{name}:{generation}:{'&'.join(parts)}"
+
+def cached_analytics(name, params=(), daily=False):
+    """Serve a 200 JSON response from the analytics cache.
+
+    Only the listed query parameters are part of the key; anything else
+    (e.g. cache-busting timestamps) is ignored. Place below the auth decorators.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            backend = get_cache_backend()
+            if backend is None:
+                return f(*args, **kwargs)
+            try:
+                values = {p: request.args.get(p, '').strip() for p in params}
+                key = cache_key(name, backend.generation(name), values, daily)
+                body = backend.get(key)
+            except Exception as e:
+                current_app.logger.warning(f'Analytics cache unavailable: {e}')
+                return f(*args, **kwargs)
+            if body is not None:
+                response = current_app.response_class(body, status=200, mimetype='application/json')
+                response.headers['X-Cache'] = 'HIT'
+                return response
+
+            response = current_app.make_response(f(*args, **kwargs))
+            if response.status_code == 200:
+                try:
+                    backend.set(key, response.get_data())
+                except Exception as e:
+                    current_app.logger.warning(f'Analytics cache unavailable: {e}')
+                response.headers['X-Cache'] = 'MISS'
+            return response
+        return decorated_function
+    return decorator
+
+# Invalidate the endpoints reading the tables a transaction wrote, once it commits
+
+@on_after_commit
+def _invalidate_committed_tables(session, tables):
+    if has_app_context():
+        invalidate_endpoints(_endpoints_for(tables))
@@ -0,0 +1,66 @@
+from collections import namedtuple
+from datetime import date
+from src.models.models import db, ShiftRoster
+from src.models.loaders import roster_options
+from src.utils.leave_calendar import get_leave_calendar
+
+# Availability snapshot: who is on shift, on leave or available on a given day.
+#
+# Resolved for a whole set of employees with one roster query, regardless of
+# how many employees are asked about, plus a lookup in the in-process leave
+# calendar. Small sets are filtered with an IN list; larger ones read the
+# day's approved rows (indexed by date) and are matched in memory.
+
+AVAILABLE = 'available'
+ON_SHIFT = 'on_shift'
+ON_LEAVE = 'on_leave'
+
+# Above this many employees, filter by date only instead of an IN list
+MAX_IN_LIST = 500
+
+# roster: the approved ShiftRoster entry for the day (loaded only when requested)
+# leave_type: type of the approved leave covering the day
+Availability = namedtuple('Availability', ['status', 'roster', 'leave_type'])
+
+_AVAILABLE = Availability(AVAILABLE, None, None)
+
+def availability_snapshot(employee_ids, on_date=None, with_rosters=False):
+    """{employee_id: Availability} for each of employee_ids on on_date (default today).
+
+    Leave takes precedence over a rostered shift. with_rosters loads the
+    approved roster entries with the options ShiftRoster.to_dict() needs.
+    """
+    employee_ids = set(employee_ids)
+    on_date = on_date or date.today()
+    if not employee_ids:
+        return {}
+    use_in_list = len(employee_ids) <= MAX_IN_LIST
+
+    if with_rosters:
+        roster_query = ShiftRoster.query.options(*roster_options())
+    else:
+        roster_query = db.session.query(ShiftRoster.employee_id)
+    roster_query = roster_query.filter(ShiftRoster.date == on_date, ShiftRoster.status == 'approved')
+    if use_in_list:
+        roster_query = roster_query.filter(ShiftRoster.employee_id.in_(employee_ids))
+    rosters = {}
+    for row in roster_query:
+        if row.employee_id in employee_ids:
+            rosters[row.employee_id] = row if with_rosters else None
+
+    leave_types = {
+        employee_id: leave.leave_type
+        for employee_id, leave in get_leave_calendar().on_leave(on_date).items()
+        if employee_id in employee_ids
+    }
+
+    snapshot = {}
+    for employee_id in employee_ids:
+        roster = rosters.get(employee_id)
+        if employee_id in leave_types:
+            snapshot[employee_id] = Availability(ON_LEAVE, roster, leave_types[employee_id])
+        elif employee_id in rosters:
+            snapshot[employee_id] = Availability(ON_SHIFT, roster, None)
+        else:
+            snapshot[employee_id] = _AVAILABLE
+    return snapshot
@@ -0,0 +1,79 @@
+import threading
+import time
+from flask import current_app
+from src.models.models import db, Role
+
+# Role/permission claims embedded in access tokens (JWT_ROLE_CLAIMS mode).
+#
+# Permissions are packed into an integer bitmask. Bit positions are part of
+# the token format: append new permission names at the end, never reorder.
+PERMISSION_BITS = [
+    'manage_employees',
+    'manage_roles',
+    'manage_shifts',
+    'manage_areas',
+    'manage_skills',
+    'view_all_rosters',
+    'approve_rosters',
+    'approve_timesheets',
+    'view_analytics',
+    'export_data',
+    'view_team_rosters',
+    'view_own_roster',
+    'view_own_timesheet',
+    'view_public_info',
+]
+_BIT_INDEX = {name: i for i, name in enumerate(PERMISSION_BITS)}
+
+# role_id -> version, refreshed from the roles table at most every ROLE_VERSION_TTL seconds
+_role_versions = {}
+_role_versions_loaded_at = 0.0
+_role_versions_lock = threading.Lock()
+
+def claims_enabled():
+    return bool(current_app.config.get('JWT_ROLE_CLAIMS'))
+
+def is_encodable(permission):
+    """True if the permission has a bit in the claims bitmask."""
+    return permission in _BIT_INDEX
+
+def permissions_to_mask(permissions):
+    mask = 0
+    for name in permissions:
+        index = _BIT_INDEX.get(name)
+        if index is not None:
+            mask |= 1 << index
+    return mask
+
+def mask_to_permissions(mask):
+    return frozenset(name for i, name in enumerate(PERMISSION_BITS) if mask & (1 << i))
+
+def build_role_claims(user, permissions):
+    """Additional JWT claims for a user's role (empty unless claims mode is on)."""
+    if not claims_enabled() or not user or not user.role_ref:
+        return {}
+    role = user.role_ref
+    return {
+        'role_id': role.id,
+        'role': role.name,
+        'perms': permissions_to_mask(permissions),
+        'rv': role.version or 1,
+    }
+
+def get_role_version(role_id):
+    """Current version of a role, from a per-process cache with a short TTL."""
+    global _role_versions_loaded_at
+    ttl = current_app.config.get('ROLE_VERSION_TTL', 30)
+    if time.monotonic() - _role_versions_loaded_at > ttl:
+        rows = db.session.query(Role.id, Role.version).all()
+        with _role_versions_lock:
+            _role_versions.clear()
+            _role_versions.update({rid: version or 1 for rid, version in rows})
+            _role_versions_loaded_at = time.monotonic()
+    return _role_versions.get(role_id)
+
+def bump_role_version(role):
+    """Invalidate role claims issued for this role. Call before committing."""
+    role.version = (role.version or 1) + 1
+    with _role_versions_lock:
+        _role_versions[role.id] = role.version
@@ -1,31 +1,117 @@
 from functools import wraps
-from flask import jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from collections import namedtuple
+import threading
+from flask import jsonify, g
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from sqlalchemy.orm import joinedload, lazyload
 from src.models.models import User, Role
+from src.utils.claims import claims_enabled, is_encodable, mask_to_permissions, get_role_version
 import json
 
+# The authenticated user for the current request, resolved once and shared by
+# the decorators below and by routes calling get_current_user().
+Principal = namedtuple('Principal', ['user', 'role_name', 'permissions'])
+
+# Process-wide cache of parsed role permissions: role_id -> (raw json, frozenset).
+# Entries are re-parsed if the stored JSON changes, and dropped explicitly by
+# invalidate_role_permissions() when a role is edited.
+_role_permissions = {}
+_role_permissions_lock = threading.Lock()
+
+def _parse_permissions(raw):
+    try:
+        permissions = json.loads(raw) if isinstance(raw, str) else (raw or {})
+    except Exception:
+        permissions = {}
+    if not isinstance(permissions, dict):
+        return frozenset()
+    return frozenset(name for name, granted in permissions.items() if granted)
+
+def get_role_permissions(role):
+    """Return the set of granted permission names for a role (cached)."""
+    if role is None:
+        return frozenset()
+    raw = role.permissions
+    cached = _role_permissions.get(role.id)
+    if cached is not None and cached[0] == raw:
+        return cached[1]
+    permissions = _parse_permissions(raw)
+    with _role_permissions_lock:
+        _role_permissions[role.id] = (raw, permissions)
+    return permissions
+
+def invalidate_role_permissions(role_id=None):
+    """Drop cached permissions for one role, or for all roles if role_id is None."""
+    with _role_permissions_lock:
+        if role_id is None:
+            _role_permissions.clear()
+        else:
+            _role_permissions.pop(role_id, None)
+
+def get_current_principal():
+    """Resolve the JWT identity to a Principal, memoized on flask.g for the request.
+
+    Returns None when the token's user no longer exists.
+    """
+    current_user_id = get_jwt_identity()
+    cached = g.get('_principal')
+    if cached is not None and cached[0] == current_user_id:
+        return cached[1]
+
+    try:
+        user_id_int = int(current_user_id)
+    except Exception:
+        user_id_int = current_user_id
+    # Role is needed by every caller; skills (mapped lazy='subquery') are not.
+    user = User.query.options(joinedload(User.role_ref), lazyload(User.skills)).get(user_id_int)
+
+    principal = None
+    if user:
+        role = user.role_ref
+        principal = Principal(
+            user=user,
+            role_name=role.name if role else None,
+            permissions=get_role_permissions(role)
+        )
+    g._principal = (current_user_id, principal)
+    return principal
+
+def _claims_principal(permission=None):
+    """Principal built from JWT role claims, without touching the users table.
+
+    Returns None (caller falls back to get_current_principal) when claims mode
+    is off, the token carries no role claims, the role has changed since the
+    token was issued, or the permission cannot be expressed in the bitmask.
+    """
+    if not claims_enabled():
+        return None
+    if permission is not None and not is_encodable(permission):
+        return None
+    claims = get_jwt()
+    role_id = claims.get('role_id')
+    if role_id is None or 'rv' not in claims or 'perms' not in claims:
+        return None
+    if get_role_version(role_id) != claims['rv']:
+        return None
+    return Principal(user=None, role_name=claims.get('role'), permissions=mask_to_permissions(claims['perms']))
+
 def role_required(*allowed_roles):
     """Decorator to check if user has required role"""
     def decorator(f):
         @wraps(f)
         @jwt_required()
         def decorated_function(*args, **kwargs):
-            current_user_id = get_jwt_identity()
-            try:
-                user_id_int = int(current_user_id)
-            except Exception:
-                user_id_int = current_user_id
-            user = User.query.get(user_id_int)
-            
-            if not user:
+            principal = _claims_principal() or get_current_principal()
+
+            if not principal:
                 return jsonify({'error': 'User not found'}), 404
-            
-            if not user.role_ref:
+
+            if not principal.role_name:
                 return jsonify({'error': 'User has no role assigned'}), 403
-            
-            if user.role_ref.name not in allowed_roles:
+
+            if principal.role_name not in allowed_roles:
                 return jsonify({'error': 'Insufficient permissions'}), 403
-            
+
             return f(*args, **kwargs)
         return decorated_function
     return decorator
@@ -36,44 +122,29 @@ def permission_required(permission):
         @wraps(f)
         @jwt_required()
         def decorated_function(*args, **kwargs):
-            current_user_id = get_jwt_identity()
-            try:
-                user_id_int = int(current_user_id)
-            except Exception:
-                user_id_int = current_user_id
-            user = User.query.get(user_id_int)
-            
-            if not user:
+            principal = _claims_principal(permission) or get_current_principal()
+
+            if not principal:
                 return jsonify({'error': 'User not found'}), 404
-            
-            if not user.role_ref:
+
+            if not principal.role_name:
                 return jsonify({'error': 'User has no role assigned'}), 403
 
             # Admins have access to all permissions
-            if user.role_ref.name == 'Admin':
+            if principal.role_name == 'Admin':
                 return f(*args, **kwargs)
-            
-            raw = user.role_ref.permissions
-            try:
-                permissions = json.loads(raw) if isinstance(raw, str) else (raw or {})
-            except Exception:
-                permissions = {}
-            
-            if not permissions.get(permission, False):
+
+            if permission not in principal.permissions:
                 return jsonify({'error': f'Permission {permission} required'}), 403
-            
+
             return f(*args, **kwargs)
         return decorated_function
     return decorator
 
 def get_current_user():
     """Helper function to get current user"""
-    current_user_id = get_jwt_identity()
-    try:
-        user_id_int = int(current_user_id)
-    except Exception:
-        user_id_int = current_user_id
-    return User.query.get(user_id_int)
+    principal = get_current_principal()
+    return principal.user if principal else None
 
 # Convenience decorators used by some routes
 def admin_required(f):
@@ -81,4 +152,3 @@ def admin_required(f):
 
 def manager_required(f):
     return role_required('Admin', 'Manager')(f)
-
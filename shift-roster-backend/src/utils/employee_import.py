@@ -0,0 +1,288 @@
+import pandas as pd
+from sqlalchemy import insert
+from sqlalchemy.exc import DBAPIError
+from src.models.models import db, User as Employee, Role, AreaOfResponsibility as Area, Skill, employee_skills
+
+# Bulk employee import and validation used by /api/import/employees/*.
+#
+# Existing identifiers and lookup tables are read up front into memory, rows
+# are checked against those sets, and accepted rows are written with chunked
+# executemany inserts. The number of queries depends on the number of chunks,
+# not on the number of rows. Each chunk is written under a savepoint; if the
+# database still rejects it (e.g. a concurrent import took an email), the
+# chunk is retried row by row and only the failing rows are reported.
+
+IMPORT_BATCH_SIZE = 500
+
+REQUIRED_COLUMNS = ['Employee ID', 'Name', 'Surname', 'Email']
+
+def _max_length(column):
+    return getattr(column.type, 'length', None)
+
+# Import field -> column whose length limit applies to it
+_LENGTH_LIMITS = {
+    'Employee ID': _max_length(Employee.__table__.c.employee_id),
+    'Email': _max_length(Employee.__table__.c.email),
+    'Name': _max_length(Employee.__table__.c.name),
+    'Surname': _max_length(Employee.__table__.c.surname),
+    'Contact Number': _max_length(Employee.__table__.c.contact_no),
+    'Role': _max_length(Role.__table__.c.name),
+    'Area of Responsibility': _max_length(Area.__table__.c.name),
+    'Skill': _max_length(Skill.__table__.c.name),
+}
+
+def _chunks(items, size=IMPORT_BATCH_SIZE):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+def _clean(value):
+    """Stripped string for a cell, or None for blank/NaN cells."""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    return str(value).strip()
+
+def find_skills_column(df):
+    """Detect the skills column name variations used by import templates."""
+    for c in df.columns:
+        cl = str(c).strip().lower()
+        if cl in ('skills', 'skills (comma-separated)'):
+            return c
+    return None
+
+def _resolve_names(model, names, make_row):
+    """Map names -> ids for a lookup table, inserting missing names in one batch."""
+    ids = dict(db.session.query(model.name, model.id).all())
+    missing = sorted(set(names) - ids.keys())
+    if missing:
+        db.session.execute(insert(model), [make_row(name) for name in missing])
+        for chunk in _chunks(missing):
+            ids.update(db.session.query(model.name, model.id).filter(model.name.in_(chunk)).all())
+    return ids
+
+def _existing_identifiers():
+    """(employee_ids, emails, google_ids) of all users, read in one query."""
+    existing_ids, existing_emails, existing_google_ids = set(), set(), set()
+    for emp_id, email, google_id in db.session.query(Employee.employee_id, Employee.email, Employee.google_id):
+        if emp_id:
+            existing_ids.add(emp_id)
+        existing_emails.add(email)
+        existing_google_ids.add(google_id)
+    return existing_ids, existing_emails, existing_google_ids
+
+def _text_column(df, column):
+    """Column as stripped strings with blank/NaN cells as None."""
+    if column not in df.columns:
+        return pd.Series(None, index=df.index, dtype=object)
+    values = df[column].astype(str).str.strip()
+    return values.where(df[column].notna() & values.ne(''), None)
+
+def validate_employees(df):
+    """Check an import file without writing anything.
+
+    All checks are column-wise pandas operations plus a single query for the
+    identifiers already in the database, so the cost does not grow with a
+    query per row. Returns (warnings, row_errors) where row_errors is a list
+    of {'row', 'column', 'value', 'issue'} sorted by file row number.
+    """
+    warnings = []
+    diagnostics = []
+
+    def flag(mask, column, values, issue):
+        for idx, value in zip(df.index[mask], values[mask]):
+            diagnostics.append({'row': int(idx) + 2, 'column': column, 'value': value, 'issue': issue})
+
+    ids = _text_column(df, 'Employee ID')
+    emails = _text_column(df, 'Email')
+    existing_ids, existing_emails, _ = _existing_identifiers()
+
+    # Duplicates in file
+    dup_id_mask = ids.notna() & ids.duplicated(keep=False)
+    if dup_id_mask.any():
+        warnings.append(f"Duplicate Employee IDs in file: {', '.join(sorted(ids[dup_id_mask].unique()))}")
+    flag(dup_id_mask, 'Employee ID', ids, 'Duplicate Employee ID in file')
+
+    dup_email_mask = emails.notna() & emails.duplicated(keep=False)
+    if dup_email_mask.any():
+        warnings.append(f"Duplicate emails in file: {', '.join(sorted(emails[dup_email_mask].unique()))}")
+    flag(dup_email_mask, 'Email', emails, 'Duplicate email in file')
+
+    # Existing in DB
+    db_id_mask = ids.isin(existing_ids)
+    if db_id_mask.any():
+        warnings.append(f"Employee IDs already exist in database: {', '.join(sorted(ids[db_id_mask].unique()))}")
+    flag(db_id_mask, 'Employee ID', ids, 'Employee ID already exists in database')
+
+    db_email_mask = emails.isin(existing_emails)
+    if db_email_mask.any():
+        warnings.append(f"Emails already exist in database: {', '.join(sorted(emails[db_email_mask].unique()))}")
+    flag(db_email_mask, 'Email', emails, 'Email already exists in database')
+
+    # Email presence and format
+    missing_email_mask = emails.isna()
+    if missing_email_mask.any():
+        warnings.append(f"Rows without an email will be skipped: {int(missing_email_mask.sum())}")
+    flag(missing_email_mask, 'Email', emails, 'Email is required')
+
+    bad_email_mask = emails.notna() & ~emails.fillna('').str.contains('@', regex=False)
+    if bad_email_mask.any():
+        bad_emails = [f"Row {idx+2}: {email}" for idx, email in zip(df.index[bad_email_mask][:5], emails[bad_email_mask][:5])]
+        warnings.append(f"Invalid email formats: {', '.join(bad_emails)}")
+    flag(bad_email_mask, 'Email', emails, 'Invalid email format')
+
+    diagnostics.sort(key=lambda d: d['row'])
+    return warnings, diagnostics
+
+def import_employees(df):
+    """Insert employees from a DataFrame in bulk.
+
+    Rows are validated in file order against the users already in the
+    database and the rows accepted before them, so errors are reported per row
+    exactly as a row-by-row import would. Rows the database rejects are
+    reported the same way and the rest of the file is still imported. The
+    caller commits.
+
+    Returns (imported_count, errors).
+    """
+    errors = []
+    skills_col = find_skills_column(df)
+
+    existing_ids, existing_emails, existing_google_ids = _existing_identifiers()
+
+    accepted = []
+    for idx, row in zip(df.index, df.to_dict('records')):
+        try:
+            emp_id_val = _clean(row['Employee ID']) or None
+            email = _clean(row['Email'])
+            name = _clean(row['Name']) or ''
+            surname = _clean(row['Surname']) or ''
+
+            if not email:
+                errors.append(f"Row {idx+2}: Email is required")
+                continue
+            if '@' not in email:
+                errors.append(f"Row {idx+2}: Invalid email format")
+                continue
+
+            # Duplicate check
+            if emp_id_val and emp_id_val in existing_ids:
+                errors.append(f"Row {idx+2}: Employee ID {emp_id_val} already exists")
+                continue
+            if email in existing_emails:
+                errors.append(f"Row {idx+2}: Email {email} already exists")
+                continue
+            google_id = f"import_{emp_id_val or email}"
+            if google_id in existing_google_ids:
+                errors.append(f"Row {idx+2}: Employee {emp_id_val or email} was already imported")
+                continue
+
+            skills = []
+            if skills_col:
+                for s in (_clean(row.get(skills_col)) or '').split(','):
+                    skill_name = s.strip()
+                    if skill_name and skill_name not in skills:
+                        skills.append(skill_name)
+
+            record = {
+                'row': idx + 2,
+                'google_id': google_id,
+                'email': email,
+                'name': name,
+                'surname': surname,
+                'employee_id': emp_id_val,
+                'contact_no': _clean(row.get('Contact Number')) or '',
+                'role': _clean(row.get('Role')) or 'Employee',
+                'area': _clean(row.get('Area of Responsibility')) or None,
+                'skills': skills,
+            }
+            too_long = _too_long(record)
+            if too_long:
+                errors.append(f"Row {idx+2}: {too_long}")
+                continue
+            accepted.append(record)
+            if emp_id_val:
+                existing_ids.add(emp_id_val)
+            existing_emails.add(email)
+            existing_google_ids.add(google_id)
+        except Exception as e:
+            errors.append(f"Row {idx+2}: {str(e)}")
+
+    if not accepted:
+        return 0, errors
+
+    role_ids = _resolve_names(
+        Role, {r['role'] for r in accepted},
+        lambda name: {'name': name, 'permissions': '{}'}
+    )
+    area_ids = _resolve_names(
+        Area, {r['area'] for r in accepted if r['area']},
+        lambda name: {'name': name, 'description': f"Auto-created area: {name}"}
+    )
+    skill_ids = _resolve_names(
+        Skill, {s for r in accepted for s in r['skills']},
+        lambda name: {'name': name, 'description': f"Auto-created skill: {name}"}
+    )
+
+    _begin_outer_transaction()
+    imported = 0
+    for chunk in _chunks(accepted):
+        try:
+            with db.session.begin_nested():
+                _insert_rows(chunk, role_ids, area_ids, skill_ids)
+            imported += len(chunk)
+        except DBAPIError:
+            for record in chunk:
+                try:
+                    with db.session.begin_nested():
+                        _insert_rows([record], role_ids, area_ids, skill_ids)
+                    imported += 1
+                except DBAPIError as e:
+                    errors.append(f"Row {record['row']}: could not be imported ({e.orig})")
+
+    return imported, errors
+
+def _too_long(record):
+    """Message for the first value longer than its column allows, else None."""
+    values = [
+        ('Employee ID', record['employee_id']), ('Email', record['email']), ('Name', record['name']),
+        ('Surname', record['surname']), ('Contact Number', record['contact_no']), ('Role', record['role']),
+        ('Area of Responsibility', record['area']),
+    ] + [('Skill', skill) for skill in record['skills']]
+    for field, value in values:
+        limit = _LENGTH_LIMITS[field]
+        if value and limit and len(value) > limit:
+            return f"{field} is longer than {limit} characters"
+    return None
+
+def _begin_outer_transaction():
+    # pysqlite only opens a transaction before DML; a SAVEPOINT issued first
+    # would become the outermost transaction and its RELEASE would commit
+    connection = db.session.connection()
+    if connection.dialect.name == 'sqlite' and not connection.connection.dbapi_connection.in_transaction:
+        connection.exec_driver_sql('BEGIN')
+
+def _insert_rows(records, role_ids, area_ids, skill_ids):
+    db.session.execute(insert(Employee), [
+        {
+            'google_id': r['google_id'],
+            'email': r['email'],
+            'name': r['name'],
+            'surname': r['surname'],
+            'employee_id': r['employee_id'],
+            'contact_no': r['contact_no'],
+            'role_id': role_ids[r['role']],
+            'area_of_responsibility_id': area_ids[r['area']] if r['area'] else None,
+        }
+        for r in records
+    ])
+
+    with_skills = [r for r in records if r['skills']]
+    if with_skills:
+        user_ids = dict(
+            db.session.query(Employee.email, Employee.id)
+            .filter(Employee.email.in_([r['email'] for r in with_skills]))
+            .all()
+        )
+        db.session.execute(employee_skills.insert(), [
+            {'employee_id': user_ids[r['email']], 'skill_id': skill_ids[s]}
+            for r in with_skills for s in r['skills']
+        ])
@@ -0,0 +1,61 @@
+import pickle
+import tempfile
+from openpyxl import Workbook
+from openpyxl.utils import get_column_letter
+
+# Constant-memory XLSX writer shared by the Excel export routes.
+#
+# openpyxl's write-only mode streams rows to disk, but it emits column widths
+# before the first row, so rows are first spooled to a temp file while the
+# widths are measured, then replayed into the write-only worksheet.
+
+SPOOL_MAX_MEMORY = 1024 * 1024  # rows beyond ~1MB of pickled data go to disk
+
+def write_xlsx(sheet_title, headers, rows, max_width=None, output=None):
+    """Write rows to an .xlsx file.
+
+    rows      -- iterable of sequences (in header order) or dicts keyed by header
+    max_width -- optional cap on the computed column width
+    output    -- binary file object to write into; defaults to an anonymous
+                 temporary file that is removed when closed (e.g. by send_file
+                 once the response has been sent)
+
+    Returns the output file object, positioned at the start.
+    """
+    widths = [len(str(h)) for h in headers]
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY) as spool:
+        count = 0
+        for row in rows:
+            values = [row.get(h) for h in headers] if isinstance(row, dict) else list(row)
+            for i, value in enumerate(values):
+                if value is not None:
+                    length = len(str(value))
+                    if length > widths[i]:
+                        widths[i] = length
+            pickle.dump(values, spool, protocol=pickle.HIGHEST_PROTOCOL)
+            count += 1
+        spool.seek(0)
+
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet(title=sheet_title)
+        for i, width in enumerate(widths, 1):
+            width += 2
+            if max_width is not None:
+                width = min(width, max_width)
+            ws.column_dimensions[get_column_letter(i)].width = width
+
+        ws.append(list(headers))
+        for _ in range(count):
+            ws.append(pickle.load(spool))
+
+        owned = output is None
+        if owned:
+            output = tempfile.TemporaryFile(suffix='.xlsx')
+        try:
+            wb.save(output)
+        except Exception:
+            if owned:
+                output.close()
+            raise
+    output.seek(0)
+    return output
@@ -0,0 +1,185 @@
+import json
+import logging
+import os
+import re
+import stat
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+# Background export jobs.
+#
+# A job renders an export into EXPORT_JOB_DIR on a small thread pool, so
+# request workers are not tied up building large files. The directory is kept
+# private to the app's user (0700, files 0600). Job state lives in a
+# JSON sidecar next to the artifact (<id>.json), which lets any worker process
+# on the same host answer status polls and serve downloads. Finished jobs and
+# their files are removed once they are older than EXPORT_JOB_TTL seconds;
+# jobs still queued or running EXPORT_JOB_STALE_AFTER seconds after they were
+# created are taken to be abandoned (e.g. the worker process died) and removed
+# too. Expiry is checked whenever a job is read, not only by the next submit.
+
+logger = logging.getLogger(__name__)
+
+_JOB_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+
+_executor = None
+_executor_lock = threading.Lock()
+_meta_lock = threading.Lock()
+
+def _get_executor(app):
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=app.config.get('EXPORT_JOB_WORKERS', 2),
+                thread_name_prefix='export-job'
+            )
+        return _executor
+
+def _job_dir(app):
+    path = app.config['EXPORT_JOB_DIR']
+    if app.extensions.get('export_job_dir') != path:
+        _ensure_private_dir(path)
+        app.extensions['export_job_dir'] = path
+    return path
+
+def _ensure_private_dir(path):
+    # Artifacts hold employee PII: the directory must belong to this user and
+    # be closed to everyone else (a predictable name in a shared temp dir
+    # could have been created by another user first)
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    st = os.stat(path)
+    if hasattr(os, 'getuid') and st.st_uid != os.getuid():
+        raise RuntimeError(f'EXPORT_JOB_DIR {path} is owned by another user')
+    if stat.S_IMODE(st.st_mode) & 0o077:
+        os.chmod(path, 0o700)
+
+def _open_private(path, mode, **kwargs):
+    """open() for a new file readable and writable by this user only."""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    return os.fdopen(fd, mode, **kwargs)
+
+def _meta_path(app, job_id):
+    return os.path.join(_job_dir(app), f'{job_id}.json')
+
+def _write_meta(app, job):
+    path = _meta_path(app, job['id'])
+    tmp_path = f'{path}.{threading.get_ident()}.tmp'
+    with _meta_lock:
+        with _open_private(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(job, f)
+        os.replace(tmp_path, path)
+
+def _update(app, job, **fields):
+    job.update(fields)
+    _write_meta(app, job)
+
+def _created_ts(job):
+    if job.get('created_ts') is not None:
+        return job['created_ts']
+    # Jobs written before created_ts was recorded
+    return datetime.fromisoformat(job['created_at']).replace(tzinfo=timezone.utc).timestamp()
+
+def _expired(app, job, now):
+    if job['status'] in ('finished', 'failed'):
+        return (job.get('finished_ts') or 0) <= now - app.config.get('EXPORT_JOB_TTL', 3600)
+    return _created_ts(job) <= now - app.config.get('EXPORT_JOB_STALE_AFTER', 6 * 3600)
+
+def _remove(app, job):
+    for path in (get_artifact_path(app, job), _meta_path(app, job['id'])):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def get_job(app, job_id):
+    """Load a job's state, or None if it does not exist (or has expired).
+
+    An expired job is deleted along with its artifact.
+    """
+    if not _JOB_ID_RE.match(job_id or ''):
+        return None
+    try:
+        with open(_meta_path(app, job_id), encoding='utf-8') as f:
+            job = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if _expired(app, job, time.time()):
+        _remove(app, job)
+        return None
+    return job
+
+def get_artifact_path(app, job):
+    return os.path.join(_job_dir(app), job['file'])
+
+def purge_expired(app):
+    """Delete expired jobs and their artifacts (get_job() removes them as it reads them)."""
+    for name in os.listdir(_job_dir(app)):
+        if name.endswith('.json'):
+            get_job(app, name[:-len('.json')])
+
+def submit_job(app, renderer, args, export, fmt, extension, mimetype, download_name, user_id):
+    """Queue renderer(args, output, report) and return the new job's state.
+
+    The renderer writes the export into the binary file ``output`` and may
+    call ``report(rows_done)`` to publish progress.
+    """
+    purge_expired(app)
+    job_id = uuid.uuid4().hex
+    job = {
+        'id': job_id,
+        'export': export,
+        'format': fmt,
+        'params': args,
+        'status': 'queued',
+        'rows_processed': 0,
+        'error': None,
+        'user_id': user_id,
+        'file': f'{job_id}.{extension}',
+        'mimetype': mimetype,
+        'download_name': download_name,
+        'created_at': datetime.utcnow().isoformat(),
+        'created_ts': time.time(),
+        'finished_at': None,
+        'finished_ts': None,
+    }
+    _write_meta(app, job)
+    _get_executor(app).submit(_run, app, job, renderer)
+    return job
+
+def _run(app, job, renderer):
+    _update(app, job, status='running')
+
+    def report(rows_done):
+        _update(app, job, rows_processed=rows_done)
+
+    path = get_artifact_path(app, job)
+    try:
+        with app.app_context():
+            with _open_private(path, 'wb') as output:
+                renderer(job['params'], output, report)
+        _update(app, job, status='finished', finished_at=datetime.utcnow().isoformat(), finished_ts=time.time())
+    except Exception as e:
+        logger.exception('Export job %s failed', job['id'])
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        _update(app, job, status='failed', error=str(e), finished_at=datetime.utcnow().isoformat(), finished_ts=time.time())
+
+def public_view(job):
+    """Job fields returned to API clients."""
+    return {
+        'id': job['id'],
+        'export': job['export'],
+        'format': job['format'],
+        'params': job['params'],
+        'status': job['status'],
+        'rows_processed': job['rows_processed'],
+        'error': job['error'],
+        'created_at': job['created_at'],
+        'finished_at': job['finished_at'],
+    }
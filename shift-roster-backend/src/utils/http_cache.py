@@ -0,0 +1,169 @@
+import gzip
+import hashlib
+from datetime import date
+from functools import wraps
+from flask import current_app, request
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import insert, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from src.models.models import db, TableVersion
+from src.utils.table_tracking import PUBLISH, on_before_commit, written_tables
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# HTTP-level caching for the large JSON endpoints.
+#
+# Conditional GET: table_versions holds a change counter per table, bumped in
+# the same transaction as every commit that writes the table (a table that was
+# never written has no row and counts as version 0). Endpoints
+# decorated with conditional_get(tables) get a strong ETag derived from those
+# counters, the request (path, query string, user) and today's date; a
+# request whose If-None-Match still matches is answered 304 after one
+# primary-key lookup, without running the endpoint.
+#
+# Compression: JSON responses of at least COMPRESS_MIN_SIZE bytes are brotli
+# (if installed) or gzip encoded when the client accepts it. The encoding is
+# appended to the ETag ("<tag>-gzip") so each representation has its own.
+
+COMPRESSIBLE_MIMETYPES = {'application/json', 'text/csv', 'text/plain', 'text/html'}
+
+_UPSERT_INSERTS = {'sqlite': sqlite_insert, 'postgresql': postgresql_insert}
+
+def table_versions(tables):
+    """{table: version} for the given tables (one query)."""
+    return dict(
+        db.session.query(TableVersion.table_name, TableVersion.version)
+        .filter(TableVersion.table_name.in_(tables))
+    )
+
+def _identity():
+    try:
+        return get_jwt_identity()
+    except RuntimeError:
+        # No JWT verified for this request
+        return None
+
+def compute_etag(tables):
+    versions = table_versions(tables)
+    parts = [
+        request.path,
+        '&'.join(f'{k}={v}' for k, v in sorted(request.args.items(multi=True))),
+        str(_identity()),
+        # Endpoints default their date ranges to today
+        date.today().isoformat(),
+        ','.join(f'{t}={versions.get(t, 0)}' for t in sorted(tables)),
+    ]
+    return hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()
+
+def _matches(etag):
+    if_none_match = request.if_none_match
+    if not if_none_match:
+        return False
+    if if_none_match.star_tag:
+        return True
+    # Compressed representations carry the encoding as a suffix
+    return any(tag == etag or tag.startswith(f'{etag}-') for tag in if_none_match.as_set())
+
+def conditional_get(*tables):
+    """ETag / If-None-Match support for a GET endpoint computed from the given tables.
+
+    List every table the response reads; 'users' and 'roles' are always
+    included since they decide what the caller may see. Place below the auth
+    decorators.
+    """
+    dependencies = frozenset(tables) | {'users', 'roles'}
+
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            try:
+                etag = compute_etag(dependencies)
+            except Exception as e:
+                current_app.logger.warning(f'Could not compute ETag: {e}')
+                return f(*args, **kwargs)
+            if _matches(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = current_app.make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.vary.add('Authorization')
+            return response
+        return decorated_function
+    return decorator
+
+def _encoding_for(response):
+    config = current_app.config
+    min_size = config.get('COMPRESS_MIN_SIZE', 1024)
+    if (
+        min_size is None
+        or response.status_code != 200
+        or response.direct_passthrough
+        or response.is_streamed
+        or 'Content-Encoding' in response.headers
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+        or response.content_length is None
+        or response.content_length < min_size
+    ):
+        return None
+    offered = ['br', 'gzip'] if brotli is not None else ['gzip']
+    return request.accept_encodings.best_match(offered)
+
+def compress_response(response):
+    """after_request hook: brotli/gzip-encode large text responses the client accepts."""
+    if request.method == 'HEAD':
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = _encoding_for(response)
+    if encoding is None:
+        return response
+    body = response.get_data()
+    if encoding == 'br':
+        body = brotli.compress(body, quality=current_app.config.get('COMPRESS_BR_LEVEL', 4))
+    else:
+        body = gzip.compress(body, compresslevel=current_app.config.get('COMPRESS_LEVEL', 6))
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f'{etag}-{encoding}', weak=weak)
+    return response
+
+def init_http_cache(app):
+    app.after_request(compress_response)
+
+# Bump the counters of the tables a transaction wrote, inside that transaction.
+# Runs after the rollup refresh (see table_tracking), so the dashboard rollup
+# it rewrote is counted, and as the last write before COMMIT, so the
+# table_versions row locks are held as briefly as possible.
+
+@on_before_commit(PUBLISH)
+def _bump_table_versions(session):
+    tables = written_tables(session) - {TableVersion.__tablename__}
+    if tables:
+        _bump(session, sorted(tables))
+
+def _bump(session, tables):
+    upsert = _UPSERT_INSERTS.get(session.get_bind().dialect.name)
+    if upsert is not None:
+        # One statement; tables written for the first time get their row here
+        stmt = upsert(TableVersion).values([{'table_name': t, 'version': 1} for t in tables])
+        session.execute(stmt.on_conflict_do_update(
+            index_elements=['table_name'], set_={'version': TableVersion.version + 1}
+        ))
+        return
+    session.execute(
+        update(TableVersion)
+        .where(TableVersion.table_name.in_(tables))
+        .values(version=TableVersion.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    existing = {name for (name,) in session.query(TableVersion.table_name).filter(TableVersion.table_name.in_(tables))}
+    missing = [{'table_name': t, 'version': 1} for t in tables if t not in existing]
+    if missing:
+        session.execute(insert(TableVersion), missing)
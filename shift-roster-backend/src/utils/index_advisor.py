@@ -0,0 +1,114 @@
+from datetime import date, datetime, timedelta
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import select, func, and_
+from src.models.models import db, ShiftRoster, LeaveRequest, Timesheet, ActivityLog
+
+# Index advisor: runs the database's query planner over the queries the routes
+# issue most and reports any that read a whole table.
+#
+#   flask --app src.main index-advisor [--verbose]
+#
+# Exits with status 1 when a full scan is found, so it can run in CI. Small
+# lookup tables (shifts, roles, ...) are read whole by design and are not
+# reported. On Postgres, run it against production-sized data: the planner
+# prefers sequential scans on tiny tables even when an index exists.
+
+# Lookup tables that are always small; scanning them is expected
+SMALL_TABLES = {'shifts', 'roles', 'areas_of_responsibility', 'skills', 'designations', 'licenses'}
+
+def _catalogue():
+    """(name, route, statement) for the hot query predicates used by the routes."""
+    today = date.today()
+    start, end = today - timedelta(days=30), today
+    employee_id, roster_id = 1, 1
+
+    return [
+        ('roster_range', 'GET /api/roster, exports',
+         select(ShiftRoster).where(ShiftRoster.date >= start, ShiftRoster.date <= end)
+         .order_by(ShiftRoster.date, ShiftRoster.id)),
+        ('roster_employee_day', 'roster writes, GET /api/analytics/skill-search',
+         select(ShiftRoster.id).where(ShiftRoster.employee_id == employee_id, ShiftRoster.date == today,
+                                      ShiftRoster.status == 'approved')),
+        ('employee_history', 'GET /api/reports/employee-history/<id>',
+         select(ShiftRoster).where(ShiftRoster.employee_id == employee_id).order_by(ShiftRoster.date.desc())),
+        ('dashboard_on_shift', 'GET /api/analytics/dashboard',
+         select(func.count(func.distinct(ShiftRoster.employee_id)))
+         .where(and_(ShiftRoster.date >= start, ShiftRoster.date <= end, ShiftRoster.status == 'approved'))),
+        ('dashboard_pending', 'GET /api/analytics/dashboard',
+         select(func.count(ShiftRoster.id))
+         .where(and_(ShiftRoster.date >= start, ShiftRoster.date <= end, ShiftRoster.status == 'pending'))),
+        ('shift_coverage', 'GET /api/analytics/shift-coverage',
+         select(ShiftRoster.shift_id, ShiftRoster.date, func.count(ShiftRoster.id))
+         .where(ShiftRoster.date >= start, ShiftRoster.date <= end, ShiftRoster.status.in_(['pending', 'approved']))
+         .group_by(ShiftRoster.shift_id, ShiftRoster.date)),
+        ('leave_overlap', 'GET /api/analytics/dashboard, skill-search',
+         select(LeaveRequest.employee_id)
+         .where(LeaveRequest.start_date <= end, LeaveRequest.end_date >= start, LeaveRequest.status == 'approved')),
+        ('leave_employee_status', 'POST /api/leave/<id>/authorise',
+         select(LeaveRequest).where(LeaveRequest.employee_id == employee_id, LeaveRequest.status == 'authorised')),
+        ('timesheets_range', 'GET /api/timesheets',
+         select(Timesheet).where(Timesheet.date >= start, Timesheet.date <= end)
+         .order_by(Timesheet.date.desc(), Timesheet.id.desc())),
+        ('timesheets_employee_range', 'GET /api/timesheets?employee_id=',
+         select(Timesheet).where(Timesheet.employee_id == employee_id, Timesheet.date >= start, Timesheet.date <= end)),
+        ('timesheet_by_roster', 'POST /api/roster/<id>/approve',
+         select(Timesheet.id).where(Timesheet.roster_id == roster_id)),
+        ('recent_activity', 'GET /api/analytics/dashboard',
+         select(ActivityLog).order_by(ActivityLog.timestamp.desc()).limit(30)),
+        ('activity_since', 'activity log by time',
+         select(ActivityLog).where(ActivityLog.timestamp >= datetime.combine(start, datetime.min.time()))),
+    ]
+
+def _explain(conn, statement):
+    """Plan lines for a statement on the current database."""
+    dialect = conn.dialect.name
+    sql = str(statement.compile(dialect=conn.dialect, compile_kwargs={'literal_binds': True}))
+    if dialect == 'sqlite':
+        # rows: (id, parent, notused, detail)
+        return [row[-1] for row in conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {sql}')]
+    return [row[0] for row in conn.exec_driver_sql(f'EXPLAIN {sql}')]
+
+def _full_scans(dialect, plan):
+    """Tables read in full according to the plan lines."""
+    tables = []
+    for line in plan:
+        words = line.strip().lstrip('->').split()
+        if dialect == 'sqlite':
+            # "SCAN t" is a full scan; "SCAN t USING [COVERING] INDEX ix" walks an index
+            if len(words) >= 2 and words[0] == 'SCAN' and 'USING' not in words:
+                tables.append(words[1])
+        elif 'Seq' in words and 'Scan' in words and 'on' in words:
+            tables.append(words[words.index('on') + 1])
+    return [t for t in tables if t not in SMALL_TABLES]
+
+def run_index_advisor(verbose=False, echo=print):
+    """Explain each catalogue query and return [(name, tables scanned)] for the offenders."""
+    offenders = []
+    with db.engine.connect() as conn:
+        dialect = conn.dialect.name
+        if dialect not in ('sqlite', 'postgresql'):
+            echo(f'Index advisor supports SQLite and PostgreSQL, not {dialect}')
+            return offenders
+        for name, route, statement in _catalogue():
+            plan = _explain(conn, statement)
+            scans = _full_scans(dialect, plan)
+            echo(f"{'SCAN' if scans else 'ok  '}  {name:<28} {route}")
+            if scans:
+                offenders.append((name, scans))
+                echo(f"        full scan of: {', '.join(scans)}")
+            if verbose or scans:
+                for line in plan:
+                    echo(f'        | {line}')
+    return offenders
+
+@click.command('index-advisor')
+@click.option('--verbose', '-v', is_flag=True, help='Print the plan of every query, not just offenders.')
+@with_appcontext
+def index_advisor_command(verbose):
+    """Flag hot route queries whose plan contains a full table scan."""
+    offenders = run_index_advisor(verbose=verbose, echo=click.echo)
+    if offenders:
+        click.echo(f'{len(offenders)} queries need an index')
+        raise SystemExit(1)
+    click.echo('All catalogued queries use an index')
@@ -0,0 +1,62 @@
+import decimal
+from datetime import date, datetime, time
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# JSON provider for API responses.
+#
+# Encodes with orjson when it is installed (JSON_BACKEND='auto' or 'orjson')
+# and with the standard library otherwise. Either way date, datetime and time
+# values are written in ISO 8601 (the format to_dict() methods produce) and
+# Decimals as numbers, so payload builders can hand them over as they are.
+
+JSON_BACKENDS = ('auto', 'orjson', 'stdlib')
+
+
+def _default(o):
+    if isinstance(o, (datetime, date, time)):
+        return o.isoformat()
+    if isinstance(o, decimal.Decimal):
+        return float(o)
+    if isinstance(o, tuple):
+        # orjson only takes plain tuples; namedtuples become lists as in the stdlib
+        return list(o)
+    return DefaultJSONProvider.default(o)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    default = staticmethod(_default)
+
+    def __init__(self, app, backend='auto'):
+        super().__init__(app)
+        if backend not in JSON_BACKENDS:
+            raise ValueError(f"JSON_BACKEND must be one of: {', '.join(JSON_BACKENDS)}")
+        if backend == 'orjson' and orjson is None:
+            raise RuntimeError("JSON_BACKEND is 'orjson' but orjson is not installed")
+        self.use_orjson = orjson is not None and backend != 'stdlib'
+
+    def _orjson_option(self, kwargs):
+        option = orjson.OPT_NON_STR_KEYS
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs):
+        if not self.use_orjson:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._orjson_option(kwargs)).decode('utf-8')
+
+    def response(self, *args, **kwargs):
+        if not self.use_orjson:
+            return super().response(*args, **kwargs)
+        # Same as DefaultJSONProvider.response(), minus the bytes -> str -> bytes round trip
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = orjson.dumps(obj, default=self.default, option=self._orjson_option({'indent': indent}))
+        return self._app.response_class(body + b'\n', mimetype=self.mimetype)
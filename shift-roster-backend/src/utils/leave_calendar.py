@@ -0,0 +1,265 @@
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from datetime import timedelta
+from flask import current_app, has_app_context
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, attributes
+from src.models.models import db, LeaveRequest
+from src.models.rollups import ON_LEAVE_STATUSES
+
+# In-process leave calendar.
+#
+# Approved and authorised leave is held in memory so overlap questions ("who
+# is on leave on day D", "is E on leave in [a, b]", "leave days per employee
+# in a range") are answered without a query:
+#   - per employee, the leave intervals merged into disjoint, sorted runs with
+#     prefix day counts (bisect: O(log m) per employee),
+#   - across employees, a centered interval tree (O(log n + matches)).
+#
+# Commits that touch leave_requests mark the affected employees stale; they
+# are reloaded (one query) the next time the calendar is read. Each process
+# also reloads everything every LEAVE_CALENDAR_TTL seconds, which bounds how
+# long another worker's writes go unseen. Queries default to the statuses the
+# dashboard counts as "on leave" (ON_LEAVE_STATUSES).
+
+CALENDAR_STATUSES = ('approved', 'authorised')
+
+LeaveInterval = namedtuple('LeaveInterval', ['id', 'employee_id', 'start', 'end', 'leave_type', 'status'])
+
+_DIRTY_KEY = 'leave_calendar_dirty_employees'
+
+# Marker for "reload every employee" (bulk statements on leave_requests)
+ALL = object()
+
+class _IntervalTree:
+    """Static centered interval tree over LeaveIntervals (inclusive date ranges)."""
+
+    __slots__ = ('center', 'by_start', 'by_end', 'left', 'right')
+
+    def __init__(self, intervals):
+        points = sorted(d for iv in intervals for d in (iv.start, iv.end))
+        self.center = points[len(points) // 2]
+        here, left, right = [], [], []
+        for iv in intervals:
+            if iv.end < self.center:
+                left.append(iv)
+            elif iv.start > self.center:
+                right.append(iv)
+            else:
+                here.append(iv)
+        self.by_start = sorted(here, key=lambda iv: iv.start)
+        self.by_end = sorted(here, key=lambda iv: iv.end, reverse=True)
+        self.left = _IntervalTree(left) if left else None
+        self.right = _IntervalTree(right) if right else None
+
+    def overlapping(self, start, end):
+        """Intervals intersecting [start, end]."""
+        found = []
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if end < node.center:
+                # Every interval here ends at or after center > end: test starts only
+                for iv in node.by_start:
+                    if iv.start > end:
+                        break
+                    found.append(iv)
+                if node.left:
+                    stack.append(node.left)
+            elif start > node.center:
+                for iv in node.by_end:
+                    if iv.end < start:
+                        break
+                    found.append(iv)
+                if node.right:
+                    stack.append(node.right)
+            else:
+                found.extend(node.by_start)
+                if node.left:
+                    stack.append(node.left)
+                if node.right:
+                    stack.append(node.right)
+        return found
+
+class _EmployeeLeave:
+    """One employee's leave, with merged runs cached per status set."""
+
+    def __init__(self, intervals):
+        self.intervals = intervals
+        self._runs = {}
+
+    def runs(self, statuses):
+        """(starts, ends, prefix_days) of the disjoint runs covered by leave in these statuses."""
+        key = frozenset(statuses)
+        cached = self._runs.get(key)
+        if cached is None:
+            starts, ends = [], []
+            for iv in sorted((iv for iv in self.intervals if iv.status in key), key=lambda iv: iv.start):
+                if ends and iv.start <= ends[-1] + timedelta(days=1):
+                    ends[-1] = max(ends[-1], iv.end)
+                else:
+                    starts.append(iv.start)
+                    ends.append(iv.end)
+            prefix = [0]
+            for s, e in zip(starts, ends):
+                prefix.append(prefix[-1] + (e - s).days + 1)
+            cached = self._runs[key] = (starts, ends, prefix)
+        return cached
+
+    def days_between(self, start, end, statuses):
+        starts, ends, prefix = self.runs(statuses)
+        # Runs are disjoint and sorted, so ends are sorted too
+        first = bisect_left(ends, start)
+        last = bisect_right(starts, end)
+        if first >= last:
+            return 0
+        days = prefix[last] - prefix[first]
+        # Trim the runs that stick out of [start, end]
+        if starts[first] < start:
+            days -= (start - starts[first]).days
+        if ends[last - 1] > end:
+            days -= (ends[last - 1] - end).days
+        return days
+
+class LeaveCalendar:
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._employees = {}
+        self._tree = None
+        self._tree_stale = True
+        self._stale = ALL
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def invalidate(self, employee_ids=ALL):
+        """Reload these employees (or everyone) on the next read."""
+        with self._lock:
+            if employee_ids is ALL or self._stale is ALL:
+                self._stale = ALL
+            else:
+                self._stale = self._stale | set(employee_ids)
+
+    def _load(self, employee_ids=None):
+        query = select(
+            LeaveRequest.id, LeaveRequest.employee_id, LeaveRequest.start_date,
+            LeaveRequest.end_date, LeaveRequest.leave_type, LeaveRequest.status
+        ).where(LeaveRequest.status.in_(CALENDAR_STATUSES))
+        if employee_ids is not None:
+            query = query.where(LeaveRequest.employee_id.in_(employee_ids))
+        grouped = {employee_id: [] for employee_id in employee_ids or ()}
+        # Own connection: only committed leave goes into the shared calendar
+        with db.engine.connect() as conn:
+            for row in conn.execute(query):
+                if row.start_date and row.end_date and row.start_date <= row.end_date:
+                    grouped.setdefault(row.employee_id, []).append(LeaveInterval(*row))
+        return grouped
+
+    def _refresh(self):
+        with self._lock:
+            stale = self._stale
+            if time.monotonic() - self._loaded_at > self.ttl:
+                stale = ALL
+            if not stale:
+                return
+            if stale is ALL:
+                self._employees = {e: _EmployeeLeave(ivs) for e, ivs in self._load().items()}
+                self._loaded_at = time.monotonic()
+            else:
+                for e, ivs in self._load(sorted(stale)).items():
+                    if ivs:
+                        self._employees[e] = _EmployeeLeave(ivs)
+                    else:
+                        self._employees.pop(e, None)
+            self._stale = set()
+            self._tree_stale = True
+
+    def _intervals_tree(self):
+        self._refresh()
+        with self._lock:
+            if self._tree_stale:
+                intervals = [iv for leave in self._employees.values() for iv in leave.intervals]
+                self._tree = _IntervalTree(intervals) if intervals else None
+                self._tree_stale = False
+            return self._tree
+
+    def overlapping(self, start, end, statuses=ON_LEAVE_STATUSES):
+        """LeaveIntervals in these statuses that intersect [start, end]."""
+        tree = self._intervals_tree()
+        if tree is None:
+            return []
+        return [iv for iv in tree.overlapping(start, end) if iv.status in statuses]
+
+    def on_leave(self, day, statuses=ON_LEAVE_STATUSES):
+        """{employee_id: LeaveInterval} for everyone on leave on day (earliest-starting leave wins)."""
+        result = {}
+        for iv in sorted(self.overlapping(day, day, statuses), key=lambda iv: (iv.start, iv.id)):
+            result.setdefault(iv.employee_id, iv)
+        return result
+
+    def employees_on_leave(self, start, end, statuses=ON_LEAVE_STATUSES):
+        """Ids of employees with leave intersecting [start, end]."""
+        return {iv.employee_id for iv in self.overlapping(start, end, statuses)}
+
+    def is_on_leave(self, employee_id, start, end=None, statuses=ON_LEAVE_STATUSES):
+        return self.leave_days(employee_id, start, end or start, statuses) > 0
+
+    def leave_days(self, employee_id, start, end, statuses=ON_LEAVE_STATUSES):
+        """Calendar days in [start, end] on which the employee is on leave (overlaps counted once)."""
+        self._refresh()
+        leave = self._employees.get(employee_id)
+        return leave.days_between(start, end, statuses) if leave else 0
+
+    def leave_days_by_employee(self, start, end, employee_ids=None, statuses=ON_LEAVE_STATUSES):
+        """{employee_id: leave days in [start, end]} for employees with any leave there."""
+        candidates = self.employees_on_leave(start, end, statuses)
+        if employee_ids is not None:
+            candidates &= set(employee_ids)
+        return {e: self.leave_days(e, start, end, statuses) for e in candidates}
+
+def get_leave_calendar():
+    """The current app's leave calendar."""
+    extensions = current_app.extensions
+    if 'leave_calendar' not in extensions:
+        extensions['leave_calendar'] = LeaveCalendar(ttl=current_app.config.get('LEAVE_CALENDAR_TTL', 300))
+    return extensions['leave_calendar']
+
+# Mark employees whose leave changed; the calendar reloads them after commit
+
+def _mark_employees(session, employee_ids):
+    dirty = session.info.get(_DIRTY_KEY)
+    if dirty is ALL:
+        return
+    if employee_ids is ALL:
+        session.info[_DIRTY_KEY] = ALL
+    else:
+        session.info.setdefault(_DIRTY_KEY, set()).update(employee_ids)
+
+@event.listens_for(Session, 'before_flush')
+def _collect_leave_employees(session, flush_context, instances):
+    employee_ids = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, LeaveRequest):
+            employee_ids.update(v for v in attributes.get_history(obj, 'employee_id').sum() if v is not None)
+    if employee_ids:
+        _mark_employees(session, employee_ids)
+
+@event.listens_for(Session, 'do_orm_execute')
+def _collect_leave_statements(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, 'table', None)
+        if getattr(table, 'name', None) == LeaveRequest.__tablename__:
+            _mark_employees(orm_execute_state.session, ALL)
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_leave_calendar(session):
+    employee_ids = session.info.pop(_DIRTY_KEY, None)
+    if employee_ids and has_app_context():
+        calendar = current_app.extensions.get('leave_calendar')
+        if calendar is not None:
+            calendar.invalidate(employee_ids)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_leave_employees(session):
+    session.info.pop(_DIRTY_KEY, None)
@@ -0,0 +1,227 @@
+from datetime import date, datetime
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import func, insert, delete, update
+from src.models.models import db, User, LeaveRequest, LeaveBalance, LeaveLedgerEntry
+
+# Leave balance ledger.
+#
+# Every change to an employee's leave balance is appended to leave_ledger
+# (allocation changes, authorised leave, recomputes), and leave_balances keeps
+# the running total per employee and leave year, so reading a balance is a
+# primary-key lookup instead of a scan over the employee's leave history.
+#
+# Leave counts against the leave year its start date falls in. A year with no
+# leave_balances row has nothing booked against it yet: its balance is the
+# employee's annual allocation. Each row records the allocation that applied
+# to its year, so later allocation changes do not rewrite past years.
+#
+# `flask --app src.main leave-recompute [--year YYYY | --all-years]` rebuilds
+# balances from the authorised leave for the whole workforce, e.g. to open
+# balances for a new year at rollover.
+
+LEDGER_BATCH_SIZE = 500
+
+# Leave statuses deducted from the balance
+DEDUCTED_STATUSES = ('authorised',)
+
+def leave_year_for(day):
+    return day.year
+
+def current_leave_year():
+    return leave_year_for(date.today())
+
+def _chunks(items, size=LEDGER_BATCH_SIZE):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+def _allocation(employee):
+    return float(employee.total_no_leave_days_annual or 0)
+
+def _append(entries, row, entry_type, days, leave_request_id=None, note=None, created_by=None):
+    entries.append({
+        'employee_id': row.employee_id,
+        'leave_year': row.leave_year,
+        'entry_type': entry_type,
+        'days': days,
+        'balance': row.balance,
+        'leave_request_id': leave_request_id,
+        'note': note,
+        'created_by': created_by,
+        'created_at': datetime.utcnow()
+    })
+
+def _write_entries(entries):
+    # Plain executemany: ORM-added entries would be inserted one by one on SQLite
+    for chunk in _chunks(entries):
+        db.session.execute(insert(LeaveLedgerEntry), chunk)
+
+def _open_row(employee, year, entries, created_by=None):
+    allocated = _allocation(employee)
+    row = LeaveBalance(employee_id=employee.id, leave_year=year, allocated=allocated, used=0, balance=allocated)
+    db.session.add(row)
+    _append(entries, row, 'allocation', allocated, note='Opening allocation', created_by=created_by)
+    return row
+
+def _locked_rows(employees, pairs, entries, created_by=None):
+    """{(employee_id, year): balance row} for the pairs, opening missing rows from the allocation.
+
+    employees maps employee_id -> User. One query for any number of pairs;
+    opening ledger entries are appended to entries.
+    """
+    rows = {}
+    query = LeaveBalance.query.filter(
+        LeaveBalance.employee_id.in_({e for e, _ in pairs}),
+        LeaveBalance.leave_year.in_({y for _, y in pairs})
+    ).with_for_update()
+    for row in query:
+        if (row.employee_id, row.leave_year) in pairs:
+            rows[(row.employee_id, row.leave_year)] = row
+    for employee_id, year in sorted(set(pairs) - rows.keys()):
+        rows[(employee_id, year)] = _open_row(employees[employee_id], year, entries, created_by)
+    return rows
+
+def get_balance(employee, year=None):
+    """Remaining leave days for the year (default: current leave year)."""
+    year = year or current_leave_year()
+    row = db.session.get(LeaveBalance, (employee.id, year))
+    return row.balance if row is not None else _allocation(employee)
+
+def projected_balance(employee, days, year=None):
+    """What the balance would be after taking `days` more leave in the year."""
+    return get_balance(employee, year) - float(days or 0)
+
+def record_leaves(leave_requests, employees, created_by=None):
+    """Deduct authorised leave requests in bulk; the caller commits.
+
+    employees maps employee_id -> User. Requests are deducted in start-date
+    order. Returns {leave_request_id: balance after that request}.
+    """
+    pairs = {(lr.employee_id, leave_year_for(lr.start_date)) for lr in leave_requests}
+    entries = []
+    rows = _locked_rows(employees, pairs, entries, created_by) if pairs else {}
+    now = datetime.utcnow()
+    remaining = {}
+    for lr in sorted(leave_requests, key=lambda lr: (lr.start_date, lr.id)):
+        row = rows[(lr.employee_id, leave_year_for(lr.start_date))]
+        days = float(lr.days or 0)
+        row.used += days
+        row.balance -= days
+        row.updated_at = now
+        _append(entries, row, 'leave', -days, leave_request_id=lr.id, created_by=created_by)
+        remaining[lr.id] = row.balance
+    _write_entries(entries)
+    return remaining
+
+def record_leave(leave_request, employee, created_by=None):
+    """Deduct an authorised leave request. Returns the new balance; the caller commits."""
+    return record_leaves([leave_request], {employee.id: employee}, created_by)[leave_request.id]
+
+def set_allocation(employee, allocated, year=None, created_by=None):
+    """Change the employee's allocation for the year. Returns the new balance; the caller commits.
+
+    Call before updating employee.total_no_leave_days_annual, so a year
+    without a balance row is opened from the previous allocation.
+    """
+    year = year or current_leave_year()
+    entries = []
+    row = _locked_rows({employee.id: employee}, {(employee.id, year)}, entries, created_by)[(employee.id, year)]
+    delta = float(allocated or 0) - row.allocated
+    if delta:
+        row.allocated += delta
+        row.balance += delta
+        row.updated_at = datetime.utcnow()
+        _append(entries, row, 'allocation', delta, note='Allocation changed', created_by=created_by)
+    _write_entries(entries)
+    return row.balance
+
+def recompute_balances(year, created_by=None):
+    """Rebuild every employee's balance for a leave year from the authorised leave.
+
+    Set-based: one query each for allocations, used days and current
+    balances, then chunked bulk writes. Employees whose balance changes get a
+    'recompute' ledger entry. For the current year the users' remaining-days
+    column is refreshed too. The caller commits. Returns the number of
+    balances that changed.
+
+    A past year keeps the allocation recorded on its balance row; the users'
+    current allocation only applies to the current and later years, and to
+    past years that have no row yet.
+    """
+    allocations = dict(db.session.query(User.id, User.total_no_leave_days_annual))
+    used = dict(
+        db.session.query(LeaveRequest.employee_id, func.sum(LeaveRequest.days))
+        .filter(
+            LeaveRequest.status.in_(DEDUCTED_STATUSES),
+            LeaveRequest.start_date >= date(year, 1, 1),
+            LeaveRequest.start_date < date(year + 1, 1, 1)
+        )
+        .group_by(LeaveRequest.employee_id)
+    )
+    existing = {
+        row.employee_id: row
+        for row in db.session.query(LeaveBalance.employee_id, LeaveBalance.allocated, LeaveBalance.used, LeaveBalance.balance)
+        .filter(LeaveBalance.leave_year == year)
+    }
+
+    past_year = year < current_leave_year()
+    now = datetime.utcnow()
+    balances, entries = [], []
+    for employee_id, allocation in allocations.items():
+        old = existing.get(employee_id)
+        allocated = old.allocated if past_year and old is not None else float(allocation or 0)
+        used_days = float(used.get(employee_id) or 0)
+        balance = allocated - used_days
+        balances.append({
+            'employee_id': employee_id, 'leave_year': year, 'allocated': allocated,
+            'used': used_days, 'balance': balance, 'updated_at': now
+        })
+        if old is None or (old.allocated, old.used, old.balance) != (allocated, used_days, balance):
+            entries.append({
+                'employee_id': employee_id, 'leave_year': year, 'entry_type': 'recompute',
+                'days': balance - (old.balance if old is not None else 0), 'balance': balance,
+                'note': 'Recomputed from leave history', 'created_by': created_by, 'created_at': now
+            })
+
+    db.session.execute(delete(LeaveBalance).where(LeaveBalance.leave_year == year))
+    for chunk in _chunks(balances):
+        db.session.execute(insert(LeaveBalance), chunk)
+    _write_entries(entries)
+
+    if year == current_leave_year():
+        remaining = [
+            {'id': b['employee_id'], 'total_no_leave_days_annual_float': b['balance']}
+            for b in balances if allocations[b['employee_id']] is not None
+        ]
+        for chunk in _chunks(remaining):
+            db.session.execute(update(User), chunk)
+    return len(entries)
+
+def years_with_leave():
+    """Leave years that have deducted leave, plus the current year."""
+    bounds = db.session.query(func.min(LeaveRequest.start_date), func.max(LeaveRequest.start_date)).filter(
+        LeaveRequest.status.in_(DEDUCTED_STATUSES)
+    ).one()
+    years = {current_leave_year()}
+    if bounds[0] is not None:
+        years.update(range(leave_year_for(bounds[0]), leave_year_for(bounds[1]) + 1))
+    return sorted(years)
+
+def ledger_missing():
+    """True when there is deducted leave but no balances yet (e.g. right after upgrading)."""
+    return (
+        db.session.query(LeaveBalance.employee_id).first() is None
+        and db.session.query(LeaveRequest.id).filter(LeaveRequest.status.in_(DEDUCTED_STATUSES)).first() is not None
+    )
+
+@click.command('leave-recompute')
+@click.option('--year', type=int, help='Leave year to rebuild (default: the current year).')
+@click.option('--all-years', is_flag=True, help='Rebuild every year that has authorised leave.')
+@with_appcontext
+def leave_recompute_command(year, all_years):
+    """Rebuild leave balances for the whole workforce from the authorised leave."""
+    years = years_with_leave() if all_years else [year or current_leave_year()]
+    for leave_year in years:
+        changed = recompute_balances(leave_year)
+        click.echo(f'{leave_year}: {changed} balances changed')
+    db.session.commit()
@@ -0,0 +1,71 @@
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+
+# Process-wide logging setup, driven by LOG_LEVEL and LOG_BUFFERED.
+#
+# Buffered logging puts records on an in-memory queue; a listener thread
+# formats and writes them, so request threads never wait on stderr.
+# Threads do not survive fork(), so each process (e.g. every gunicorn
+# worker forked from a --preload master) starts its own listener on its
+# first record.
+
+LOG_FORMAT = '%(asctime)s %(levelname)s [%(process)d] %(name)s: %(message)s'
+
+class ProcessQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler whose listener thread belongs to the process that emits."""
+
+    def __init__(self, handler):
+        super().__init__(queue.SimpleQueue())
+        self.target = handler
+        self._listener = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        # The parent's listener thread (and anything it held) is gone
+        self._start_lock = threading.Lock()
+        self._listener = None
+        self._pid = None
+
+    def _ensure_listener(self):
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            # Records the parent queued but did not write belong to the parent
+            self.queue = queue.SimpleQueue()
+            self._listener = logging.handlers.QueueListener(self.queue, self.target, respect_handler_level=True)
+            self._listener.start()
+            self._pid = os.getpid()
+
+    def emit(self, record):
+        self._ensure_listener()
+        super().emit(record)
+
+    def close(self):
+        # Called by logging.shutdown() at exit; drains the queue first
+        if self._listener is not None and self._pid == os.getpid():
+            self._listener.stop()
+            self._listener = None
+        super().close()
+
+def configure_logging(config):
+    level = logging.getLevelName(str(config.get('LOG_LEVEL', 'DEBUG')).upper())
+    if not isinstance(level, int):
+        raise ValueError(f"Unknown LOG_LEVEL '{config.get('LOG_LEVEL')}'")
+
+    root = logging.getLogger()
+    if config.get('LOG_BUFFERED'):
+        if not any(isinstance(h, ProcessQueueHandler) for h in root.handlers):
+            handler = logging.StreamHandler()
+            handler.setFormatter(logging.Formatter(LOG_FORMAT))
+            root.handlers = [ProcessQueueHandler(handler)]
+    else:
+        logging.basicConfig(format=LOG_FORMAT)
+    root.setLevel(level)
@@ -0,0 +1,117 @@
+import base64
+import json
+from datetime import date, datetime, time
+from flask import request
+from sqlalchemy import and_, or_
+
+# Opt-in keyset (cursor) pagination for listing endpoints.
+# Clients that send neither ``limit`` nor ``cursor`` get the full result set
+# exactly as before. A page is fetched with a seek predicate on the sort key
+# instead of OFFSET, so cost stays flat however deep into history it goes.
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+class CursorError(ValueError):
+    """Raised for a malformed ``limit`` or ``cursor`` query parameter."""
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    if isinstance(value, date):
+        return {'d': value.isoformat()}
+    if isinstance(value, time):
+        return {'t': value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if 'dt' in value:
+            return datetime.fromisoformat(value['dt'])
+        if 'd' in value:
+            return date.fromisoformat(value['d'])
+        if 't' in value:
+            return time.fromisoformat(value['t'])
+        raise CursorError('Invalid cursor')
+    return value
+
+
+def encode_cursor(values):
+    """Encode the sort-key values of the last row into an opaque token."""
+    payload = json.dumps([_encode_value(v) for v in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """Decode a token produced by encode_cursor() back into key values."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if not isinstance(values, list):
+            raise CursorError('Invalid cursor')
+        return [_decode_value(v) for v in values]
+    except CursorError:
+        raise
+    except Exception:
+        raise CursorError('Invalid cursor')
+
+
+def get_page_args():
+    """Read ``limit`` and ``cursor`` from the request query string.
+
+    Returns (limit, cursor_values). limit is None when the client did not
+    ask for pagination, in which case the caller keeps its legacy behaviour.
+    """
+    raw_limit = request.args.get('limit')
+    raw_cursor = request.args.get('cursor')
+    if raw_limit is None and not raw_cursor:
+        return None, None
+
+    limit = DEFAULT_PAGE_SIZE
+    if raw_limit is not None:
+        try:
+            limit = int(raw_limit)
+        except ValueError:
+            raise CursorError('limit must be an integer')
+        if limit < 1:
+            raise CursorError('limit must be at least 1')
+        limit = min(limit, MAX_PAGE_SIZE)
+
+    cursor = decode_cursor(raw_cursor) if raw_cursor else None
+    return limit, cursor
+
+
+def _seek_predicate(keys, values):
+    """Rows strictly after ``values`` in the order described by ``keys``."""
+    clauses = []
+    for i, (column, descending) in enumerate(keys):
+        prefix = [keys[j][0] == values[j] for j in range(i)]
+        step = column < values[i] if descending else column > values[i]
+        clauses.append(and_(*prefix, step))
+    return or_(*clauses)
+
+
+def paginate(query, keys, key_fn, limit, cursor=None):
+    """Fetch one keyset page from ``query``.
+
+    keys   -- list of (column, descending) pairs; the last one must be unique
+    key_fn -- maps a result row to its sort-key values (same order as keys)
+
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    if cursor is not None:
+        if len(cursor) != len(keys):
+            raise CursorError('Invalid cursor')
+        query = query.filter(_seek_predicate(keys, cursor))
+
+    order = [column.desc() if descending else column.asc() for column, descending in keys]
+    rows = query.order_by(*order).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(key_fn(rows[-1]))
+    return rows, next_cursor
@@ -0,0 +1,284 @@
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import func, insert, inspect, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from src.models.models import db, ShiftRoster, User, Shift
+from src.models.rollups import mark_dates_dirty
+from src.utils.leave_calendar import get_leave_calendar, CALENDAR_STATUSES
+
+# Roster writes shared by the roster and leave routes.
+#
+# shift_roster has a unique index on (employee_id, date), so "is this employee
+# already scheduled?" is answered by the insert itself: on SQLite and Postgres
+# rows are written with INSERT ... ON CONFLICT according to a conflict policy:
+#   skip    -- keep the existing entry, ignore the new one
+#   replace -- overwrite the existing entry's shift, hours, notes and status
+#   error   -- reject the write (RosterConflictError)
+# Other databases fall back to one range query followed by plain writes, as
+# do databases whose index could not be created because of existing duplicate
+# rows (ON CONFLICT needs the index).
+
+ROSTER_BATCH_SIZE = 500
+
+REQUIRED_ENTRY_FIELDS = ['employee_id', 'shift_id', 'date', 'hours']
+
+CONFLICT_POLICIES = ('skip', 'replace', 'error')
+
+_UPSERT_INSERTS = {'sqlite': sqlite_insert, 'postgresql': postgresql_insert}
+
+_CONFLICT_COLUMNS = ['employee_id', 'date']
+
+# Columns overwritten by the 'replace' policy; approval state is reset with them
+_REPLACE_COLUMNS = [
+    'shift_id', 'area_of_responsibility_id', 'hours', 'status',
+    'approved_by', 'approved_at', 'accepted_at', 'notes'
+]
+
+LEAVE_SHIFT_NAME = 'On Leave'
+
+# The 'On Leave' shift id is looked up once per app (app.extensions); shift
+# admin routes call invalidate_leave_shift() when shifts change
+_LEAVE_SHIFT_KEY = 'leave_shift_id'
+
+# Whether shift_roster has its unique (employee_id, date) index, checked once per app
+_UNIQUE_INDEX_KEY = 'roster_unique_index'
+
+class RosterConflictError(ValueError):
+    """Raised when a write hits an existing (employee_id, date) entry under the 'error' policy."""
+
+def _chunks(items, size=ROSTER_BATCH_SIZE):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+def _as_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def resolve_conflict_policy(policy=None):
+    """The requested conflict policy, or ROSTER_CONFLICT_POLICY from config."""
+    policy = policy or current_app.config.get('ROSTER_CONFLICT_POLICY', 'error')
+    if policy not in CONFLICT_POLICIES:
+        raise ValueError(f"Invalid conflict policy '{policy}'. Use one of: {', '.join(CONFLICT_POLICIES)}")
+    return policy
+
+def _existing_ids(column, ids):
+    found = set()
+    for chunk in _chunks(sorted(ids)):
+        found.update(row[0] for row in db.session.query(column).filter(column.in_(chunk)))
+    return found
+
+def _scheduled(employee_ids, dates):
+    """{(employee_id, date): roster id} for entries within the given employees/dates."""
+    if not employee_ids or not dates:
+        return {}
+    scheduled = {}
+    for chunk in _chunks(sorted(employee_ids)):
+        rows = (
+            db.session.query(ShiftRoster.id, ShiftRoster.employee_id, ShiftRoster.date)
+            .filter(
+                ShiftRoster.employee_id.in_(chunk),
+                ShiftRoster.date >= min(dates),
+                ShiftRoster.date <= max(dates),
+            )
+        )
+        for roster_id, employee_id, roster_date in rows:
+            scheduled[(employee_id, roster_date)] = roster_id
+    return scheduled
+
+def has_roster_unique_index():
+    """Whether shift_roster has a unique index on (employee_id, date) (cached per app)."""
+    extensions = current_app.extensions
+    if _UNIQUE_INDEX_KEY not in extensions:
+        inspector = inspect(db.engine)
+        table = ShiftRoster.__tablename__
+        # Unique constraints have no 'unique' key; they are unique by definition
+        candidates = inspector.get_indexes(table) + inspector.get_unique_constraints(table)
+        extensions[_UNIQUE_INDEX_KEY] = any(
+            index.get('unique', True) and set(index['column_names']) == set(_CONFLICT_COLUMNS)
+            for index in candidates
+        )
+    return extensions[_UNIQUE_INDEX_KEY]
+
+def duplicate_roster_pairs():
+    """Number of (employee_id, date) pairs with more than one roster entry."""
+    duplicates = (
+        db.session.query(ShiftRoster.employee_id, ShiftRoster.date)
+        .group_by(ShiftRoster.employee_id, ShiftRoster.date)
+        .having(func.count() > 1)
+        .subquery()
+    )
+    return db.session.query(func.count()).select_from(duplicates).scalar()
+
+def _upsert(insert_fn, rows, policy):
+    stmt = insert_fn(ShiftRoster.__table__)
+    if policy == 'skip':
+        stmt = stmt.on_conflict_do_nothing(index_elements=_CONFLICT_COLUMNS)
+    elif policy == 'replace':
+        stmt = stmt.on_conflict_do_update(
+            index_elements=_CONFLICT_COLUMNS,
+            set_={column: stmt.excluded[column] for column in _REPLACE_COLUMNS}
+        )
+    stmt = stmt.returning(ShiftRoster.id, ShiftRoster.employee_id, ShiftRoster.date)
+
+    written = {}
+    for chunk in _chunks(rows):
+        for roster_id, employee_id, roster_date in db.session.execute(stmt, chunk):
+            written[(employee_id, roster_date)] = roster_id
+    return written
+
+def _read_then_write(rows, policy):
+    scheduled = _scheduled({r['employee_id'] for r in rows}, {r['date'] for r in rows})
+    conflicts = [r for r in rows if (r['employee_id'], r['date']) in scheduled]
+    if conflicts and policy == 'error':
+        raise RosterConflictError('Employee already has a shift scheduled for this date')
+    if conflicts and policy == 'replace':
+        db.session.execute(update(ShiftRoster), [
+            dict({column: r.get(column) for column in _REPLACE_COLUMNS},
+                 id=scheduled[(r['employee_id'], r['date'])], status=r.get('status') or 'pending')
+            for r in conflicts
+        ])
+
+    new_rows = [r for r in rows if (r['employee_id'], r['date']) not in scheduled]
+    for chunk in _chunks(new_rows):
+        db.session.execute(insert(ShiftRoster), chunk)
+
+    written = {}
+    if new_rows:
+        created = _scheduled({r['employee_id'] for r in new_rows}, {r['date'] for r in new_rows})
+        written.update({(r['employee_id'], r['date']): created[(r['employee_id'], r['date'])] for r in new_rows})
+    if policy == 'replace':
+        written.update({(r['employee_id'], r['date']): scheduled[(r['employee_id'], r['date'])] for r in conflicts})
+    return written
+
+def write_roster_rows(rows, policy='error'):
+    """Insert shift_roster rows (dicts of column values) under a conflict policy.
+
+    Each (employee_id, date) may appear at most once in rows. The caller
+    commits. Returns {(employee_id, date): roster id} for the rows that were
+    written; entries skipped under the 'skip' policy are absent.
+    """
+    if not rows:
+        return {}
+    # Core writes bypass the ORM flush hooks that keep dashboard rollups current
+    mark_dates_dirty(db.session, [r['date'] for r in rows])
+    insert_fn = _UPSERT_INSERTS.get(db.engine.dialect.name)
+    if insert_fn is None or not has_roster_unique_index():
+        return _read_then_write(rows, policy)
+    try:
+        return _upsert(insert_fn, rows, policy)
+    except IntegrityError as e:
+        if policy != 'error':
+            raise
+        raise RosterConflictError('Employee already has a shift scheduled for this date') from e
+
+def create_roster_entries(entries, policy='error'):
+    """Validate and write roster entries in bulk.
+
+    Errors are reported per entry ("Entry N: ...") as before; nothing is
+    written if any entry is invalid. Under the 'error' policy existing
+    assignments are reported per entry too (one range query); the unique
+    index still guards against a concurrent writer. The caller commits or
+    rolls back.
+
+    Entries that schedule an employee on approved or authorised leave are
+    still written but reported in warnings.
+
+    Returns (ids of the written entries in request order, errors, warnings).
+    """
+    errors = []
+    warnings = []
+    parsed = []
+    for i, entry_data in enumerate(entries):
+        try:
+            missing = [field for field in REQUIRED_ENTRY_FIELDS if field not in entry_data]
+            if missing:
+                errors.extend(f'Entry {i+1}: {field} is required' for field in missing)
+                continue
+            try:
+                roster_date = datetime.strptime(entry_data['date'], '%Y-%m-%d').date()
+            except (TypeError, ValueError):
+                roster_date = None
+            parsed.append((i, entry_data, _as_int(entry_data['employee_id']), _as_int(entry_data['shift_id']), roster_date))
+        except Exception as e:
+            errors.append(f'Entry {i+1}: {str(e)}')
+
+    employee_ids = _existing_ids(User.id, {p[2] for p in parsed if p[2] is not None})
+    shift_ids = _existing_ids(Shift.id, {p[3] for p in parsed if p[3] is not None})
+    scheduled = set()
+    if policy == 'error':
+        scheduled = set(_scheduled(employee_ids, {p[4] for p in parsed if p[4] is not None}))
+
+    calendar = get_leave_calendar()
+    rows = []
+    requested = set()
+    for i, entry_data, employee_id, shift_id, roster_date in parsed:
+        if employee_id not in employee_ids:
+            errors.append(f'Entry {i+1}: Employee not found')
+            continue
+        if shift_id not in shift_ids:
+            errors.append(f'Entry {i+1}: Shift not found')
+            continue
+        if roster_date is None:
+            errors.append(f'Entry {i+1}: Invalid date format')
+            continue
+        # Later entries in the same request conflict with earlier ones under every policy
+        if (employee_id, roster_date) in scheduled or (employee_id, roster_date) in requested:
+            errors.append(f'Entry {i+1}: Employee already scheduled for this date')
+            continue
+        requested.add((employee_id, roster_date))
+        if calendar.is_on_leave(employee_id, roster_date, statuses=CALENDAR_STATUSES):
+            warnings.append(f'Entry {i+1}: Employee is on leave on this date')
+
+        rows.append({
+            'employee_id': employee_id,
+            'shift_id': shift_id,
+            'date': roster_date,
+            'hours': entry_data['hours'],
+            'notes': entry_data.get('notes', '')
+        })
+
+    if errors:
+        return [], errors, warnings
+
+    written = write_roster_rows(rows, policy)
+    return [written[(r['employee_id'], r['date'])] for r in rows if (r['employee_id'], r['date']) in written], errors, warnings
+
+def get_leave_shift_id():
+    """Id of the 'On Leave' shift, or None if there is no such shift (cached)."""
+    extensions = current_app.extensions
+    if extensions.get(_LEAVE_SHIFT_KEY) is None:
+        # A missing shift is not cached, so one created later is picked up
+        extensions[_LEAVE_SHIFT_KEY] = db.session.query(Shift.id).filter(Shift.name == LEAVE_SHIFT_NAME).scalar()
+    return extensions[_LEAVE_SHIFT_KEY]
+
+def invalidate_leave_shift():
+    current_app.extensions.pop(_LEAVE_SHIFT_KEY, None)
+
+def materialize_leave(leave_requests):
+    """Write 'On Leave' roster rows for every day of the given leave requests.
+
+    The date series of all requests is written with the 'skip' policy, so the
+    (employee_id, date) index anti-joins it against existing entries (days
+    that already have a shift keep it) in one statement per chunk, however
+    long or many the leaves. The caller commits. Returns write_roster_rows()'s
+    {(employee_id, date): roster id} for the rows written.
+    """
+    shift_id = get_leave_shift_id()
+    if shift_id is None:
+        return {}
+    rows = {}
+    for lr in leave_requests:
+        for i in range((lr.end_date - lr.start_date).days + 1):
+            day = lr.start_date + timedelta(days=i)
+            rows.setdefault((lr.employee_id, day), {
+                'employee_id': lr.employee_id,
+                'shift_id': shift_id,
+                'date': day,
+                'hours': 0,
+                'status': 'approved'
+            })
+    return write_roster_rows(list(rows.values()), policy='skip')
@@ -0,0 +1,84 @@
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# Tables written by the current transaction, shared by the modules that act
+# on them at commit time (dashboard rollups, HTTP and analytics caches).
+#
+# ORM changes are collected before each flush; Core insert/update/delete
+# statements run through the session are collected as they execute
+# (statements on a raw connection are not seen). A single before_commit hook
+# runs the registered steps in stage order, so derived writes made by an
+# earlier stage (the rollup refresh) are visible to later ones (the table
+# version bump). after_commit hooks receive the final set.
+
+# before_commit stages
+REFRESH = 0  # recompute derived tables from this transaction's writes
+PUBLISH = 1  # record what the transaction wrote; runs last
+
+_WRITTEN_KEY = 'written_tables'
+
+_before_commit_hooks = []
+_after_commit_hooks = []
+
+def on_before_commit(stage):
+    """Register fn(session) to run inside the committing transaction."""
+    def decorator(fn):
+        _before_commit_hooks.append((stage, fn))
+        # Stable: hooks of one stage keep their registration order
+        _before_commit_hooks.sort(key=lambda hook: hook[0])
+        return fn
+    return decorator
+
+def on_after_commit(fn):
+    """Register fn(session, tables) to run once the transaction has committed."""
+    _after_commit_hooks.append(fn)
+    return fn
+
+def mark_tables_written(session, tables):
+    session.info.setdefault(_WRITTEN_KEY, set()).update(tables)
+
+def written_tables(session):
+    return frozenset(session.info.get(_WRITTEN_KEY, ()))
+
+def _flush_pending(session):
+    if session.new or session.dirty or session.deleted:
+        session.flush()
+
+@event.listens_for(Session, 'before_flush')
+def _collect_flushed_tables(session, flush_context, instances):
+    # Collection changes (e.g. user.skills) leave the owning object dirty, so
+    # its table stands in for the association table
+    tables = {
+        obj.__table__.name
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted)
+        if getattr(obj, '__table__', None) is not None
+    }
+    if tables:
+        mark_tables_written(session, tables)
+
+@event.listens_for(Session, 'do_orm_execute')
+def _collect_executed_tables(orm_execute_state):
+    # Bulk Core inserts/updates/deletes run through the session bypass the flush
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, 'table', None)
+        if table is not None and hasattr(table, 'name'):
+            mark_tables_written(orm_execute_state.session, {table.name})
+
+@event.listens_for(Session, 'before_commit')
+def _run_before_commit_hooks(session):
+    # Pending changes are flushed after this hook; flush now so they are seen
+    _flush_pending(session)
+    for _, hook in _before_commit_hooks:
+        hook(session)
+        _flush_pending(session)
+
+@event.listens_for(Session, 'after_commit')
+def _run_after_commit_hooks(session):
+    tables = frozenset(session.info.pop(_WRITTEN_KEY, ()))
+    if tables:
+        for hook in _after_commit_hooks:
+            hook(session, tables)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_written_tables(session):
+    session.info.pop(_WRITTEN_KEY, None)
@@ -0,0 +1,70 @@
+import os
+import shutil
+import sys
+import tempfile
+
+# Shared setup for the script tests in this directory.
+#
+# Each test runs as `python tests/test_<name>.py` against its own temporary
+# SQLite database seeded by src/init_db.py, prints what it checks and exits
+# non-zero on the first failure. Call use_temp_database() before importing
+# anything from src: importing src builds the default app against
+# DATABASE_URL (src/__init__.py imports src.main).
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+ADMIN = ('admin@company.com', 'admin123')
+MANAGER = ('manager@company.com', 'manager123')
+EMPLOYEE = ('employee1@company.com', 'employee123')
+EMPLOYEE_2 = ('employee2@company.com', 'employee456')
+
+_temp_dir = None
+
+def use_temp_database(prefix='shift-roster-test-'):
+    """Point DATABASE_URL at a new SQLite file and return its path."""
+    global _temp_dir
+    _temp_dir = tempfile.mkdtemp(prefix=prefix)
+    path = os.path.join(_temp_dir, 'app.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+    return path
+
+def seeded_app(**config):
+    """Seed the temporary database and build a fresh app on it.
+
+    The app is created after seeding so its startup tasks (migrations,
+    rollup and ledger backfills) see the sample data. config overrides
+    app.config after creation.
+    """
+    from src.init_db import init_database
+    from src.main import create_app
+    init_database()
+    app = create_app()
+    app.config.update(config)
+    return app
+
+def cleanup(app=None):
+    if app is not None:
+        from src.models.models import db
+        with app.app_context():
+            db.engine.dispose()
+    if _temp_dir:
+        shutil.rmtree(_temp_dir, ignore_errors=True)
+
+def fail(message):
+    raise SystemExit(f"FAIL: {message}")
+
+def check(label, response, expected):
+    """Print the response status and fail unless it is expected."""
+    print(f"{label}: {response.status_code}")
+    if response.status_code != expected:
+        print(response.get_data(as_text=True)[:300])
+        fail(f"{label} returned {response.status_code}, expected {expected}")
+    return response
+
+def login(client, user=ADMIN):
+    """Authorization headers for one of the seeded users."""
+    email, google_id = user
+    r = check(f'login {email}', client.post('/api/auth/google', json={'email': email, 'google_id': google_id}), 200)
+    return {'Authorization': f"Bearer {r.get_json()['access_token']}"}
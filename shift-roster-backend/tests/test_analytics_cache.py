@@ -0,0 +1,91 @@
+import time
+from datetime import date
+
+import support
+
+# Analytics response cache: keyed on the endpoint's own query parameters,
+# retired only by committed writes to the tables the endpoint reads, expired
+# after ANALYTICS_CACHE_TTL, and shared between workers by the shared backend.
+
+support.use_temp_database('analytics-cache-')
+
+# Importing src builds the default app against the empty database
+from src.main import create_app
+from src.models.models import db, Shift, ShiftRoster, User
+from src.utils.analytics_cache import SharedCacheBackend, get_cache_backend
+
+SHIFTS_URL = '/api/analytics/employees-by-shift?start_date=2030-01-01&end_date=2030-01-31'
+
+def cache_state(client, headers, url):
+    r = support.check(url, client.get(url, headers=headers), 200)
+    return r.headers.get('X-Cache')
+
+def expect(label, client, headers, url, state):
+    found = cache_state(client, headers, url)
+    if found != state:
+        support.fail(f'{label}: expected X-Cache {state}, got {found}')
+
+def add_roster(client, headers, employee_id, shift_id, day):
+    support.check('create roster entry', client.post('/api/roster', headers=headers, json={
+        'employee_id': employee_id, 'shift_id': shift_id, 'hours': 8, 'date': day.isoformat()
+    }), 201)
+
+if __name__ == "__main__":
+    app = support.seeded_app(ANALYTICS_CACHE_TTL=1)
+    client = app.test_client()
+    admin = support.login(client)
+    employee = support.login(client, support.EMPLOYEE)
+    with app.app_context():
+        employee_ids = [u.id for u in User.query.order_by(User.id)]
+        shift_id = Shift.query.filter(Shift.name != 'On Leave').first().id
+
+    # Only the endpoint's declared parameters are part of the key
+    expect('first read', client, admin, SHIFTS_URL, 'MISS')
+    expect('second read', client, admin, SHIFTS_URL, 'HIT')
+    expect('cache-busting parameter', client, admin, f'{SHIFTS_URL}&_=12345', 'HIT')
+    expect('other range', client, admin, '/api/analytics/employees-by-shift?start_date=2030-02-01', 'MISS')
+
+    # A committed write retires only the endpoints that read the written table
+    expect('leave summary', client, admin, '/api/analytics/leave-summary', 'MISS')
+    support.check('leave request', client.post('/api/leave', headers=employee, json={
+        'leave_type': 'annual', 'reason': 'test', 'start_date': '2030-01-07', 'end_date': '2030-01-08'
+    }), 201)
+    expect('leave summary after leave write', client, admin, '/api/analytics/leave-summary', 'MISS')
+    expect('shift counts after leave write', client, admin, SHIFTS_URL, 'HIT')
+
+    # A rolled back write retires nothing
+    with app.app_context():
+        db.session.add(ShiftRoster(employee_id=employee_ids[0], shift_id=shift_id, date=date(2030, 1, 2), hours=8))
+        db.session.flush()
+        db.session.rollback()
+    expect('shift counts after rollback', client, admin, SHIFTS_URL, 'HIT')
+    add_roster(client, admin, employee_ids[0], shift_id, date(2030, 1, 2))
+    expect('shift counts after roster write', client, admin, SHIFTS_URL, 'MISS')
+
+    # Entries expire after the TTL without any write
+    expect('before expiry', client, admin, SHIFTS_URL, 'HIT')
+    time.sleep(1.2)
+    expect('after expiry', client, admin, SHIFTS_URL, 'MISS')
+
+    # Two workers on the shared backend see each other's entries and invalidations
+    workers = []
+    for _ in range(2):
+        worker = create_app()
+        worker.config.update(ANALYTICS_CACHE_BACKEND='shared', ANALYTICS_CACHE_URL='memory://')
+        workers.append(worker)
+    with workers[0].app_context():
+        store = get_cache_backend().client
+    workers[1].extensions['analytics_cache'] = SharedCacheBackend(store)
+    first, second = (w.test_client() for w in workers)
+    expect('worker 1 fills', first, admin, SHIFTS_URL, 'MISS')
+    expect('worker 2 reads', second, admin, SHIFTS_URL, 'HIT')
+    add_roster(second, admin, employee_ids[1], shift_id, date(2030, 1, 3))
+    expect('worker 1 after worker 2 wrote', first, admin, SHIFTS_URL, 'MISS')
+
+    # Caching can be turned off
+    off = create_app()
+    off.config['ANALYTICS_CACHE_BACKEND'] = 'none'
+    expect('cache off', off.test_client(), admin, SHIFTS_URL, None)
+
+    support.cleanup(app)
+    print("ANALYTICS CACHE PASS")
@@ -0,0 +1,111 @@
+from datetime import date
+
+import support
+
+# Availability in the employee-search and skill-search reports: on shift,
+# on leave (which wins over a shift) or available, resolved for all matched
+# employees at once, with the same answer above and below the IN-list limit.
+
+support.use_temp_database('availability-')
+
+# Importing src builds the default app against the empty database
+from sqlalchemy import event, insert
+from src.models.models import db, EmployeeLicense, LeaveRequest, License, Role, Shift, ShiftRoster, User
+from src.utils import availability
+from src.utils.availability import AVAILABLE, ON_LEAVE, ON_SHIFT, availability_snapshot
+from support import check
+
+def count_queries(app, send):
+    statements = []
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        return send(), len(statements)
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+if __name__ == "__main__":
+    app = support.seeded_app()
+    client = app.test_client()
+    admin = support.login(client)
+    today = date.today()
+    with app.app_context():
+        e0, e1, e2, e3 = [u.id for u in User.query.order_by(User.id)][:4]
+        shift_id = Shift.query.filter(Shift.name != 'On Leave').first().id
+        db.session.add_all([
+            ShiftRoster(employee_id=e0, shift_id=shift_id, date=today, hours=8, status='approved'),
+            ShiftRoster(employee_id=e1, shift_id=shift_id, date=today, hours=8, status='approved'),
+            ShiftRoster(employee_id=e2, shift_id=shift_id, date=today, hours=8, status='pending'),
+            LeaveRequest(employee_id=e1, leave_type='sick', days=1, status='approved', start_date=today, end_date=today),
+            LeaveRequest(employee_id=e3, leave_type='annual', days=1, status='pending', start_date=today, end_date=today),
+        ])
+        crane, forklift = License(name='Tower Crane'), License(name='Reach Truck')
+        db.session.add_all([crane, forklift])
+        db.session.flush()
+        db.session.add_all([EmployeeLicense(employee_id=e0, license_id=crane.id),
+                            EmployeeLicense(employee_id=e1, license_id=forklift.id)])
+        db.session.commit()
+        crane_id = crane.id
+
+        expected = {e0: ON_SHIFT, e1: ON_LEAVE, e2: AVAILABLE, e3: AVAILABLE}
+        snapshot = availability_snapshot([e0, e1, e2, e3], with_rosters=True)
+        if {e: a.status for e, a in snapshot.items()} != expected:
+            support.fail(f'snapshot is {snapshot}')
+        if snapshot[e1].leave_type != 'sick' or snapshot[e0].roster is None or snapshot[e0].roster.employee_id != e0:
+            support.fail('snapshot is missing the leave type or the roster entry')
+        # Large sets read the whole day instead of an IN list, with the same result
+        availability.MAX_IN_LIST = 1
+        if {e: a.status for e, a in availability_snapshot([e0, e1, e2, e3]).items()} != expected:
+            support.fail('date-only snapshot differs from the IN-list snapshot')
+        availability.MAX_IN_LIST = 500
+        db.session.remove()
+
+    r = check('employee search', client.get('/api/reports/employee-search', headers=admin), 200)
+    statuses = {e['id']: e['current_status'] for e in r.get_json()}
+    print(f'employee search: {statuses}')
+    if (statuses[e0], statuses[e1], statuses[e2], statuses[e3]) != ('On Shift', 'On Leave (sick)', 'Available', 'Available'):
+        support.fail('employee search statuses are wrong')
+
+    # The license filter matches holders of that license only
+    r = check('search by license', client.get(f'/api/reports/employee-search?license_ids={crane_id}', headers=admin), 200)
+    if [e['id'] for e in r.get_json()] != [e0]:
+        support.fail(f"license filter matched {[e['id'] for e in r.get_json()]}")
+
+    found = {}
+    for role in ('Admin', 'Manager', 'Employee'):
+        r = check(f'skill search {role}', client.get(f'/api/analytics/skill-search?role={role}', headers=admin), 200)
+        found.update((e['id'], (e['shift_status'], e['today_shift'])) for e in r.get_json()['employees'])
+    if found[e0][0] != 'on_shift' or found[e0][1]['employee_id'] != e0:
+        support.fail(f'skill search for an employee on shift: {found[e0]}')
+    if found[e1][0] != 'on_sick_leave' or found[e2] != ('available', None):
+        support.fail(f'skill search statuses: {found[e1][0]}, {found[e2]}')
+
+    # Past the IN-list limit, doubling the matched employees runs the same queries
+    url = '/api/analytics/skill-search?role=Employee'
+    with app.app_context():
+        role_id = Role.query.filter_by(name='Employee').one().id
+    counts = {}
+    for batch in range(2):
+        with app.app_context():
+            db.session.execute(insert(User), [
+                {'google_id': f'bulk-{batch}-{i}', 'email': f'bulk{batch}-{i}@company.com', 'name': 'Bulk',
+                 'surname': str(i), 'contact_no': '', 'role_id': role_id}
+                for i in range(600)
+            ])
+            if not batch:
+                db.session.add(ShiftRoster(employee_id=db.session.query(User.id).filter_by(google_id='bulk-0-7').scalar(),
+                                           shift_id=shift_id, date=today, hours=8, status='approved'))
+            db.session.commit()
+        r, queries = count_queries(app, lambda: check('skill search (bulk)', client.get(url, headers=admin), 200))
+        counts[r.get_json()['total']] = queries
+        if sum(e['shift_status'] == 'on_shift' for e in r.get_json()['employees']) != 1:
+            support.fail('the bulk employee on shift was not found above the IN-list limit')
+    print(f'skill search queries by matched employees: {counts}')
+    if len(set(counts.values())) != 1:
+        support.fail('skill search ran more queries for more matched employees')
+
+    support.cleanup(app)
+    print("AVAILABILITY PASS")
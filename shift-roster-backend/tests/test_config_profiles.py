@@ -0,0 +1,115 @@
+import logging
+import os
+import tempfile
+import threading
+
+import support
+
+# Configuration profiles: FLASK_ENV picks the profile, production runs
+# without debug on a sized connection pool that holds no startup
+# connections, unhandled errors are logged and returned as JSON, and
+# buffered logging writes records from a listener thread.
+
+support.use_temp_database('config-profiles-')
+os.environ['EXPORT_JOB_DIR'] = tempfile.mkdtemp(prefix='config-profiles-exports-')
+
+# Importing src builds the default app against the empty database
+from src.config import DevelopmentConfig, ProductionConfig
+from src.init_db import init_database
+from src.main import create_app
+from src.models.engine import engine_options
+from src.models.models import db
+from src.utils.log_config import ProcessQueueHandler, configure_logging
+
+def settings(profile, url):
+    return {**{k: getattr(profile, k) for k in dir(profile) if k.isupper()}, 'SQLALCHEMY_DATABASE_URI': url}
+
+class Collect(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append((record.getMessage(), threading.current_thread().name))
+
+if __name__ == "__main__":
+    # Pool options: sized in production, pre-ping and recycle on server databases only
+    server = 'postgresql://shift:roster@db/roster'
+    expected = {
+        (ProductionConfig, server): {'pool_size': 10, 'max_overflow': 20, 'pool_timeout': 30,
+                                     'pool_recycle': 1800, 'pool_pre_ping': True},
+        (ProductionConfig, 'sqlite:////srv/app.db'): {'pool_size': 10, 'max_overflow': 20, 'pool_timeout': 30},
+        (ProductionConfig, 'sqlite://'): {},
+        (DevelopmentConfig, server): {},
+    }
+    for (profile, url), options in expected.items():
+        if engine_options(settings(profile, url)) != options:
+            support.fail(f'{profile.__name__} on {url}: {engine_options(settings(profile, url))}')
+
+    init_database()
+    try:
+        create_app('staging')
+        support.fail('an unknown profile was accepted')
+    except ValueError:
+        pass
+    export_dir, ProductionConfig.EXPORT_JOB_DIR = ProductionConfig.EXPORT_JOB_DIR, None
+    try:
+        create_app('production')
+        support.fail('production started without EXPORT_JOB_DIR')
+    except ValueError:
+        pass
+    finally:
+        ProductionConfig.EXPORT_JOB_DIR = export_dir
+
+    # FLASK_ENV selects the profile
+    os.environ['FLASK_ENV'] = 'production'
+    try:
+        app = create_app()
+    finally:
+        del os.environ['FLASK_ENV']
+    print(f'production: debug={app.debug} log_level={logging.getLevelName(logging.getLogger().level)}')
+    if app.debug or app.config['LOG_LEVEL'] != 'INFO' or not app.config['LOG_BUFFERED']:
+        support.fail('FLASK_ENV=production did not select the production profile')
+    with app.app_context():
+        pool = db.engine.pool
+    if pool.size() != 10 or pool.checkedin():
+        support.fail(f'production pool has size {pool.size()} and {pool.checkedin()} startup connections')
+    if [type(h) for h in logging.getLogger().handlers] != [ProcessQueueHandler]:
+        support.fail(f'buffered logging installed {logging.getLogger().handlers}')
+
+    # Unhandled errors are logged and returned as compact JSON
+    @app.route('/boom')
+    def boom():
+        raise RuntimeError('boom')
+    collect = Collect()
+    app.logger.addHandler(collect)
+    r = support.check('unhandled error', app.test_client().get('/boom'), 500)
+    if r.get_json() != {'error': 'boom'} or r.get_data(as_text=True).count('\n') != 1:
+        support.fail(f'error response is {r.get_data(as_text=True)!r}')
+    if not any('Unhandled exception: boom' in message for message, _ in collect.records):
+        support.fail('the unhandled error was not logged')
+    app.logger.removeHandler(collect)
+
+    # Buffered records are written by the listener thread, and close() drains the queue
+    collect = Collect()
+    handler = ProcessQueueHandler(collect)
+    logger = logging.getLogger('config-profiles')
+    logger.addHandler(handler)
+    logger.propagate = False
+    for i in range(100):
+        logger.warning('record %d', i)
+    handler.close()
+    logger.removeHandler(handler)
+    if [message for message, _ in collect.records] != [f'record {i}' for i in range(100)]:
+        support.fail(f'{len(collect.records)} of 100 buffered records were written')
+    if {name for _, name in collect.records} & {threading.current_thread().name}:
+        support.fail('buffered records were written by the logging thread')
+
+    try:
+        configure_logging({'LOG_LEVEL': 'LOUD'})
+        support.fail('an unknown LOG_LEVEL was accepted')
+    except ValueError:
+        pass
+
+    support.cleanup(app)
+    print("CONFIG PROFILES PASS")
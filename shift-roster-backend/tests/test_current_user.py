@@ -0,0 +1,68 @@
+from datetime import date
+
+import support
+
+# The current user and their role are loaded once per request, however many
+# decorators and helpers ask for them, and cached role permissions follow
+# edits made through the admin routes.
+
+support.use_temp_database('current-user-')
+
+# Importing src builds the default app against the empty database
+from sqlalchemy import event
+from src.models.models import db, LeaveRequest, Role, User
+from support import check
+
+def user_lookups(app, user_id, send):
+    """Response of send() and the lookups of user_id with its role that it ran."""
+    statements = []
+    def record(conn, cursor, statement, parameters, *args):
+        if 'FROM users LEFT OUTER JOIN roles' in statement and tuple(parameters) == (user_id,):
+            statements.append(statement)
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        return send(), statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+if __name__ == "__main__":
+    app = support.seeded_app()
+    client = app.test_client()
+    admin = support.login(client)
+    manager = support.login(client, support.MANAGER)
+    with app.app_context():
+        manager_role = Role.query.filter_by(name='Manager').one().id
+        employee_id = User.query.filter_by(email=support.EMPLOYEE[0]).one().id
+        manager_id = User.query.filter_by(email=support.MANAGER[0]).one().id
+        leave = LeaveRequest(employee_id=employee_id, leave_type='annual', days=1, status='pending',
+                             start_date=date(2030, 5, 6), end_date=date(2030, 5, 6))
+        db.session.add(leave)
+        db.session.commit()
+        leave_id = leave.id
+
+    # manager_required and the route's get_current_user() share one lookup
+    # (an invalid action is rejected before the commit reloads the user)
+    r, lookups = user_lookups(app, manager_id, lambda: client.post(f'/api/leave/{leave_id}/approve', headers=manager,
+                                                                   json={'action': 'maybe'}))
+    check('approve leave with a bad action', r, 400)
+    print(f'user lookups: {len(lookups)}')
+    if len(lookups) != 1:
+        support.fail(f'the request looked the current user up {len(lookups)} times')
+
+    # Role edits are seen by the next request
+    check('manager creates area', client.post('/api/areas', headers=manager, json={'name': 'Yard'}), 403)
+    r = check('roles', client.get('/api/roles', headers=admin), 200)
+    permissions = next(role['permissions'] for role in r.get_json()['roles'] if role['id'] == manager_role)
+    check('grant manage_areas', client.put(f'/api/roles/{manager_role}', headers=admin, json={
+        'permissions': {**permissions, 'manage_areas': True}
+    }), 200)
+    check('manager creates area', client.post('/api/areas', headers=manager, json={'name': 'Yard'}), 201)
+    check('revoke manage_areas', client.put(f'/api/roles/{manager_role}', headers=admin, json={
+        'permissions': permissions
+    }), 200)
+    check('manager creates area', client.post('/api/areas', headers=manager, json={'name': 'Quay'}), 403)
+
+    support.cleanup(app)
+    print("CURRENT USER PASS")
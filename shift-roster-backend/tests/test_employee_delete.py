@@ -0,0 +1,38 @@
+import support
+
+# Deleting an employee whose leave allocation was edited. The edit writes
+# leave ledger and balance rows that the delete route does not remove, so
+# the default SQLite PRAGMA profile must not enforce foreign keys.
+
+support.use_temp_database('employee-delete-')
+
+# Importing src builds the default app against the empty database
+from src.models.models import LeaveBalance, LeaveLedgerEntry, Role
+from support import check
+
+if __name__ == "__main__":
+    app = support.seeded_app()
+    client = app.test_client()
+    admin = support.login(client)
+
+    with app.app_context():
+        role_id = Role.query.filter_by(name='Employee').one().id
+    r = client.post('/api/employees', headers=admin, json={
+        'google_id': 'delete-me', 'email': 'delete.me@company.com',
+        'name': 'Delete', 'surname': 'Me', 'role_id': role_id
+    })
+    check('create employee', r, 201)
+    employee_id = r.get_json()['employee']['id']
+
+    check('edit allocation', client.put(f'/api/employees/{employee_id}', headers=admin,
+                                        json={'total_no_leave_days_annual': 25}), 200)
+    with app.app_context():
+        ledger_rows = LeaveLedgerEntry.query.filter_by(employee_id=employee_id).count()
+        balance_rows = LeaveBalance.query.filter_by(employee_id=employee_id).count()
+    if not ledger_rows or not balance_rows:
+        support.fail("allocation edit wrote no ledger/balance rows; the test no longer covers them")
+
+    check('delete employee', client.delete(f'/api/employees/{employee_id}', headers=admin), 200)
+
+    support.cleanup(app)
+    print("EMPLOYEE DELETE PASS")
@@ -0,0 +1,71 @@
+import io
+import sqlite3
+
+import support
+
+# Employee import: invalid rows are reported one by one and the valid rows
+# around them are still imported, including when the database itself
+# rejects a row in the middle of a chunk.
+
+DB_PATH = support.use_temp_database('employee-import-')
+
+# Importing src builds the default app against the empty database
+from src.models.models import User
+from support import check
+
+HEADER = 'Employee ID,Name,Surname,Email,Role,Skills\n'
+
+def upload(client, headers, rows):
+    data = {'file': (io.BytesIO((HEADER + ''.join(rows)).encode('utf-8')), 'employees.csv')}
+    return client.post('/api/import/employees/csv', headers=headers, data=data, content_type='multipart/form-data')
+
+if __name__ == "__main__":
+    app = support.seeded_app()
+    client = app.test_client()
+    admin = support.login(client)
+
+    # A trigger stands in for a constraint the validation cannot see (e.g. a
+    # concurrent import taking the email between validation and insert)
+    conn = sqlite3.connect(DB_PATH)
+    conn.execute(
+        "CREATE TRIGGER reject_import BEFORE INSERT ON users WHEN NEW.email = 'taken@company.com' "
+        "BEGIN SELECT RAISE(ABORT, 'email taken'); END"
+    )
+    conn.commit()
+    conn.close()
+
+    rows = [
+        'IMP001,Ann,One,ann@company.com,Employee,"Forklift, First Aid"\n',
+        'IMP002,Bad,Email,not-an-email,Employee,\n',
+        'IMP003,Ben,Two,ben@company.com,Employee,\n',
+        f"IMP004,{'x' * 150},Long,long@company.com,Employee,\n",
+        'EMP001,Dup,Id,dup@company.com,Employee,\n',
+        'IMP005,Taken,Row,taken@company.com,Employee,\n',
+        'IMP006,Cat,Three,cat@company.com,Supervisor,\n',
+    ]
+    r = check('import', upload(client, admin, rows), 200)
+    body = r.get_json()
+    print(body['errors'])
+    if body['imported_count'] != 3:
+        support.fail(f"expected 3 imported employees, got {body['imported_count']}")
+    expected = ['Row 3: Invalid email format', 'Row 5: Name is longer than 100 characters',
+                'Row 6: Employee ID EMP001 already exists']
+    for message in expected:
+        if message not in body['errors']:
+            support.fail(f"missing error {message!r}")
+    if not any(e.startswith('Row 7: could not be imported') for e in body['errors']):
+        support.fail('database rejection of row 7 was not reported')
+    if len(body['errors']) != 4:
+        support.fail(f"expected 4 errors, got {len(body['errors'])}")
+
+    with app.app_context():
+        imported = {u.email: u for u in User.query.filter(User.employee_id.like('IMP%'))}
+        if sorted(imported) != ['ann@company.com', 'ben@company.com', 'cat@company.com']:
+            support.fail(f'unexpected imported employees: {sorted(imported)}')
+        if sorted(s.name for s in imported['ann@company.com'].skills) != ['First Aid', 'Forklift']:
+            support.fail('skills of an imported employee were not linked')
+        if imported['cat@company.com'].role_ref.name != 'Supervisor':
+            support.fail('new role was not created for an imported employee')
+
+    support.cleanup(app)
+    print("EMPLOYEE IMPORT PASS")
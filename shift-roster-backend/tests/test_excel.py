@@ -0,0 +1,71 @@
+import io
+from datetime import date, timedelta
+
+import support
+
+# Excel exports written through the write-only openpyxl backend: rows and
+# column widths survive the spool-and-replay, and the roster grid handles
+# ranges wider than 26 columns.
+
+support.use_temp_database('excel-')
+
+# Importing src builds the default app against the empty database
+from openpyxl import load_workbook
+from src.models.models import Shift, User
+from src.utils.excel import write_xlsx
+from support import check
+
+def read_sheet(data):
+    sheet = load_workbook(io.BytesIO(data)).active
+    return sheet, [list(row) for row in sheet.iter_rows(values_only=True)]
+
+if __name__ == "__main__":
+    # Sequence and dict rows, widths from the longest value, capped by max_width
+    headers = ['Name', 'Notes']
+    rows = [['Ann', 'short'], {'Name': 'Bartholomew', 'Notes': 'x' * 80}, ['Cy', None]]
+    with write_xlsx('People', headers, iter(rows), max_width=30) as output:
+        sheet, values = read_sheet(output.read())
+    if values != [headers, ['Ann', 'short'], ['Bartholomew', 'x' * 80], ['Cy', None]]:
+        support.fail(f'write_xlsx wrote {values}')
+    widths = (sheet.column_dimensions['A'].width, sheet.column_dimensions['B'].width)
+    print(f'sheet {sheet.title}: {len(values) - 1} rows, widths {widths}')
+    if sheet.title != 'People' or widths != (len('Bartholomew') + 2, 30):
+        support.fail(f'unexpected sheet title or column widths: {sheet.title} {widths}')
+
+    app = support.seeded_app()
+    client = app.test_client()
+    admin = support.login(client)
+    with app.app_context():
+        employee_ids = [u.id for u in User.query.order_by(User.id)]
+        shift = Shift.query.filter(Shift.name != 'On Leave').first()
+        shift_id, shift_name = shift.id, shift.name
+
+    # A 40-day range needs grid columns past Z
+    start = date(2030, 3, 1)
+    end = start + timedelta(days=39)
+    check('bulk create', client.post('/api/roster/bulk', headers=admin, json={'return': 'ids', 'entries': [
+        {'employee_id': employee_id, 'shift_id': shift_id, 'hours': 8, 'date': (start + timedelta(days=i)).isoformat()}
+        for employee_id in employee_ids for i in (0, 39)
+    ]}), 201)
+
+    r = check('roster excel', client.get(f'/api/export/roster/excel?start_date={start}&end_date={end}', headers=admin), 200)
+    _, values = read_sheet(r.get_data())
+    print(f'roster rows: {len(values) - 1}')
+    if len(values) - 1 != 2 * len(employee_ids):
+        support.fail(f'roster export has {len(values) - 1} rows')
+
+    r = check('roster grid excel', client.get(f'/api/export/roster/grid/excel?start_date={start}&end_date={end}',
+                                              headers=admin), 200)
+    sheet, values = read_sheet(r.get_data())
+    print(f'grid: {len(values) - 1} rows x {len(values[0])} columns')
+    if len(values[0]) != 41 or len(values) - 1 != len(employee_ids):
+        support.fail(f'grid export is {len(values) - 1} x {len(values[0])}')
+    if any(row[1] != shift_name or row[40] != shift_name or any(row[2:40]) for row in values[1:]):
+        support.fail('grid export cells do not match the roster')
+    if not sheet.column_dimensions['AO'].width:
+        support.fail('grid export has no width for column AO')
+
+    check('grid without dates', client.get('/api/export/roster/grid/excel', headers=admin), 400)
+
+    support.cleanup(app)
+    print("EXCEL PASS")
@@ -0,0 +1,80 @@
+import json
+import os
+import stat
+import time
+
+import support
+
+# Background export jobs: artifacts are private to the app's user, expire on
+# read, and production refuses to start without an explicit directory.
+
+support.use_temp_database('export-jobs-')
+os.environ.pop('EXPORT_JOB_DIR', None)
+
+# Importing src builds the default app against the empty database
+from src.main import create_app
+from support import check
+
+def mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+def wait_for(client, headers, job_id):
+    for _ in range(100):
+        r = check('job status', client.get(f'/api/export/jobs/{job_id}', headers=headers), 200)
+        if r.get_json()['job']['status'] in ('finished', 'failed'):
+            return r.get_json()['job']
+        time.sleep(0.1)
+    support.fail(f'export job {job_id} did not finish')
+
+if __name__ == "__main__":
+    job_dir = os.path.join(os.path.dirname(os.environ['DATABASE_URL'][len('sqlite:///'):]), 'exports')
+    # A pre-existing, world-readable directory is tightened on first use
+    os.makedirs(job_dir)
+    os.chmod(job_dir, 0o755)
+    app = support.seeded_app(EXPORT_JOB_DIR=job_dir)
+    client = app.test_client()
+    admin = support.login(client)
+
+    r = check('submit', client.post('/api/export/jobs', headers=admin, json={'export': 'employees', 'format': 'csv'}), 202)
+    job = wait_for(client, admin, r.get_json()['job']['id'])
+    if job['status'] != 'finished':
+        support.fail(f"export job failed: {job['error']}")
+    r = check('download', client.get(f"/api/export/jobs/{job['id']}/download", headers=admin), 200)
+    if b'admin@company.com' not in r.get_data():
+        support.fail('downloaded export is missing employee rows')
+    r.close()
+
+    if mode(job_dir) != 0o700:
+        support.fail(f'export directory mode is {oct(mode(job_dir))}, expected 0o700')
+    for name in os.listdir(job_dir):
+        if mode(os.path.join(job_dir, name)) != 0o600:
+            support.fail(f'{name} mode is {oct(mode(os.path.join(job_dir, name)))}, expected 0o600')
+
+    # Finished jobs expire EXPORT_JOB_TTL seconds after they finish
+    app.config['EXPORT_JOB_TTL'] = 0
+    check('expired status', client.get(f"/api/export/jobs/{job['id']}", headers=admin), 404)
+    check('expired download', client.get(f"/api/export/jobs/{job['id']}/download", headers=admin), 404)
+    if os.listdir(job_dir):
+        support.fail(f'expired job left files behind: {os.listdir(job_dir)}')
+
+    # A job left queued by a dead worker is dropped once it is stale
+    stale_id = 'f' * 32
+    with open(os.path.join(job_dir, f'{stale_id}.json'), 'w', encoding='utf-8') as f:
+        json.dump({
+            'id': stale_id, 'export': 'employees', 'format': 'csv', 'params': {}, 'status': 'queued',
+            'rows_processed': 0, 'error': None, 'user_id': 1, 'file': f'{stale_id}.csv',
+            'mimetype': 'text/csv', 'download_name': 'employees.csv',
+            'created_at': '2020-01-01T00:00:00', 'created_ts': time.time() - 7 * 3600,
+            'finished_at': None, 'finished_ts': None,
+        }, f)
+    check('stale job', client.get(f'/api/export/jobs/{stale_id}', headers=admin), 404)
+
+    try:
+        create_app('production')
+    except ValueError as e:
+        print(f'production without EXPORT_JOB_DIR: {e}')
+    else:
+        support.fail('production config started without EXPORT_JOB_DIR')
+
+    support.cleanup(app)
+    print("EXPORT JOBS PASS")
@@ -0,0 +1,83 @@
+import csv
+import io
+
+import support
+
+# Streamed exports over more rows than one fetch window: every row is
+# written exactly once and in order, for the CSV and Excel downloads. Errors
+# before the first row are a 500; errors while streaming abort the download
+# instead of ending a truncated file as if it were complete.
+
+support.use_temp_database('exports-')
+
+# Importing src builds the default app against the empty database
+from openpyxl import load_workbook
+from sqlalchemy import insert
+from src.models.models import db, Role, User
+from src.routes import export
+from src.routes.export import EXPORT_BATCH_SIZE, _employee_query, _keyset_windows
+from support import check
+
+def failing_after(real, count):
+    """Wrap an export row builder so it fails on row count + 1."""
+    calls = []
+    def row(emp):
+        calls.append(emp)
+        if len(calls) > count:
+            raise RuntimeError('export row failed')
+        return real(emp)
+    return row
+
+def add_employees(count):
+    role_id = Role.query.filter_by(name='Employee').one().id
+    db.session.execute(insert(User), [
+        {'google_id': f'bulk-{i}', 'email': f'bulk{i}@company.com', 'name': 'Bulk', 'surname': f'{i:05d}',
+         'employee_id': f'BULK{i:05d}', 'contact_no': '', 'role_id': role_id}
+        for i in range(count)
+    ])
+    db.session.commit()
+
+if __name__ == "__main__":
+    app = support.seeded_app()
+    client = app.test_client()
+    admin = support.login(client)
+    with app.app_context():
+        # Three windows, the last one partial
+        add_employees(2 * EXPORT_BATCH_SIZE + 7 - User.query.count())
+        expected = [emp_id or '' for (emp_id,) in db.session.query(User.employee_id).order_by(User.id)]
+        # A total that is an exact multiple of the window ends on an empty window
+        windowed = [u.employee_id or '' for u in _keyset_windows(_employee_query(), User.id, size=len(expected) // 7)]
+        db.session.remove()
+    if windowed != expected:
+        support.fail(f'keyset windows returned {len(windowed)} rows, expected {len(expected)} in id order')
+
+    r = check('employees csv', client.get('/api/export/employees/csv', headers=admin), 200)
+    rows = list(csv.DictReader(io.StringIO(r.get_data(as_text=True))))
+    if [row['Employee ID'] for row in rows] != expected:
+        support.fail(f'CSV export has {len(rows)} rows, expected {len(expected)} in id order')
+    print(f'csv rows: {len(rows)}')
+
+    r = check('employees excel', client.get('/api/export/employees/excel', headers=admin), 200)
+    sheet = load_workbook(io.BytesIO(r.get_data()), read_only=True).active
+    ids = [row[0] or '' for row in sheet.iter_rows(min_row=2, values_only=True)]
+    if ids != expected:
+        support.fail(f'Excel export has {len(ids)} rows, expected {len(expected)} in id order')
+    print(f'excel rows: {len(ids)}')
+
+    check('roster csv with a bad date', client.get('/api/export/roster/csv?start_date=2024-13-01', headers=admin), 400)
+
+    real_row = export._employee_export_row
+    export._employee_export_row = failing_after(real_row, 0)
+    check('employees csv failing on the first row', client.get('/api/export/employees/csv', headers=admin), 500)
+    export._employee_export_row = failing_after(real_row, EXPORT_BATCH_SIZE + 10)
+    r = check('employees csv failing while streaming', client.get('/api/export/employees/csv', headers=admin), 200)
+    try:
+        r.get_data()
+    except RuntimeError as e:
+        print(f'stream aborted: {e}')
+    else:
+        support.fail('an error while streaming ended the CSV as if it were complete')
+    export._employee_export_row = real_row
+
+    support.cleanup(app)
+    print("EXPORTS PASS")
@@ -0,0 +1,77 @@
+import gzip
+from datetime import date, timedelta
+
+import support
+
+# Conditional GET, response compression and commit-time invalidation.
+#
+# A roster write must bump shift_roster and, through the rollup refresh that
+# runs before the bump, dashboard_daily_rollup in the same commit; it must
+# also retire the cached analytics responses that read shift_roster.
+
+support.use_temp_database('http-cache-')
+
+# Importing src builds the default app against the empty database
+from src.models.models import db, Shift, User
+from src.utils.http_cache import table_versions
+from support import check
+
+def versions(app, *tables):
+    with app.app_context():
+        result = table_versions(tables)
+        db.session.remove()
+    return {t: result.get(t, 0) for t in tables}
+
+if __name__ == "__main__":
+    app = support.seeded_app(COMPRESS_MIN_SIZE=200)
+    client = app.test_client()
+    admin = support.login(client)
+
+    r = check('dashboard', client.get('/api/analytics/dashboard', headers=admin), 200)
+    etag = r.headers.get('ETag')
+    if not etag:
+        support.fail('dashboard response has no ETag')
+    check('dashboard revalidated', client.get('/api/analytics/dashboard', headers=dict(admin, **{'If-None-Match': etag})), 304)
+
+    r = check('dashboard gzip', client.get('/api/analytics/dashboard', headers=dict(admin, **{'Accept-Encoding': 'gzip'})), 200)
+    if r.headers.get('Content-Encoding') != 'gzip':
+        support.fail(f"expected a gzip body, got Content-Encoding {r.headers.get('Content-Encoding')}")
+    gzip.decompress(r.get_data())
+    if r.headers.get('ETag') != f'{etag[:-1]}-gzip"':
+        support.fail(f"gzip ETag {r.headers.get('ETag')} does not extend {etag}")
+    if 'Accept-Encoding' not in r.headers.get('Vary', ''):
+        support.fail('compressed response does not vary on Accept-Encoding')
+    check('gzip revalidated', client.get('/api/analytics/dashboard', headers=dict(admin, **{
+        'Accept-Encoding': 'gzip', 'If-None-Match': r.headers['ETag']
+    })), 304)
+
+    check('weekly trends (fill cache)', client.get('/api/analytics/weekly-approval-trends', headers=admin), 200)
+    r = check('weekly trends', client.get('/api/analytics/weekly-approval-trends', headers=admin), 200)
+    if r.headers.get('X-Cache') != 'HIT':
+        support.fail(f"expected a cached analytics response, got X-Cache {r.headers.get('X-Cache')}")
+
+    before = versions(app, 'shift_roster', 'dashboard_daily_rollup')
+    with app.app_context():
+        employee_id = User.query.filter_by(email=support.EMPLOYEE[0]).one().id
+        shift_id = Shift.query.filter(Shift.name != 'On Leave').first().id
+    check('create roster entry', client.post('/api/roster', headers=admin, json={
+        'employee_id': employee_id, 'shift_id': shift_id, 'hours': 8,
+        'date': (date.today() + timedelta(days=1)).isoformat()
+    }), 201)
+    after = versions(app, 'shift_roster', 'dashboard_daily_rollup')
+    for table in before:
+        if after[table] != before[table] + 1:
+            support.fail(f'{table} version went from {before[table]} to {after[table]}, expected one bump')
+
+    check('dashboard after write', client.get('/api/analytics/dashboard', headers=dict(admin, **{'If-None-Match': etag})), 200)
+    r = check('weekly trends after write', client.get('/api/analytics/weekly-approval-trends', headers=admin), 200)
+    if r.headers.get('X-Cache') != 'MISS':
+        support.fail('analytics cache was not invalidated by the roster write')
+
+    # Reads commit nothing and bump nothing
+    client.get('/api/roster', headers=admin)
+    if versions(app, 'shift_roster', 'dashboard_daily_rollup') != after:
+        support.fail('a read bumped table versions')
+
+    support.cleanup(app)
+    print("HTTP CACHE PASS")
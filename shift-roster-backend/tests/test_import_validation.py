@@ -0,0 +1,76 @@
+import io
+
+import support
+
+# /api/import/employees/validate: row-level diagnostics for duplicates in the
+# file, identifiers already in the database and missing or malformed emails,
+# capped in the response but counted in full. Nothing is written.
+
+support.use_temp_database('import-validation-')
+
+# Importing src builds the default app against the empty database
+from src.models.models import User
+from src.routes.import_data import MAX_ROW_ERRORS
+from support import check
+
+HEADER = 'Employee ID,Name,Surname,Email,Role\n'
+
+def validate(client, headers, text, filename='employees.csv'):
+    data = {'file': (io.BytesIO(text.encode('utf-8')), filename)}
+    r = check(f'validate {filename}', client.post('/api/import/employees/validate', headers=headers, data=data,
+                                                  content_type='multipart/form-data'), 200)
+    return r.get_json()
+
+if __name__ == "__main__":
+    app = support.seeded_app()
+    client = app.test_client()
+    admin = support.login(client)
+    with app.app_context():
+        users_before = User.query.count()
+
+    body = validate(client, admin, HEADER + ''.join([
+        'NEW001,Ann,One,ann@company.com,Employee\n',      # row 2: fine
+        'NEW002,Ben,Two,ben@company.com,Employee\n',      # row 3: email repeated on row 4
+        'NEW003,Cat,Three,ben@company.com,Employee\n',    # row 4
+        'EMP001,Dan,Four,dan@company.com,Employee\n',     # row 5: id in the database
+        'NEW004,Eve,Five,admin@company.com,Employee\n',   # row 6: email in the database
+        'NEW005,Fay,Six,,Employee\n',                     # row 7: no email
+        'NEW005,Gus,Seven,not-an-email,Employee\n',       # row 8: bad email, id repeated on row 7
+    ]))
+    found = [(e['row'], e['column'], e['issue']) for e in body['row_errors']]
+    for error in found:
+        print(error)
+    expected = [
+        (3, 'Email', 'Duplicate email in file'),
+        (4, 'Email', 'Duplicate email in file'),
+        (5, 'Employee ID', 'Employee ID already exists in database'),
+        (6, 'Email', 'Email already exists in database'),
+        (7, 'Employee ID', 'Duplicate Employee ID in file'),
+        (7, 'Email', 'Email is required'),
+        (8, 'Employee ID', 'Duplicate Employee ID in file'),
+        (8, 'Email', 'Invalid email format'),
+    ]
+    if sorted(found) != sorted(expected) or [row for row, _, _ in found] != sorted(row for row, _, _ in found):
+        support.fail('row diagnostics differ from the expected rows, columns and issues')
+    if body['row_error_count'] != len(expected) or not body['valid'] or body['total_rows'] != 7:
+        support.fail(f"unexpected summary: {body['row_error_count']} errors, valid={body['valid']}")
+    if not any(w.startswith('Rows without an email will be skipped: 1') for w in body['warnings']):
+        support.fail(f"missing-email warning not reported: {body['warnings']}")
+
+    # The response carries at most MAX_ROW_ERRORS diagnostics, the count is complete
+    count = MAX_ROW_ERRORS + 50
+    body = validate(client, admin, HEADER + ''.join(f'BAD{i:05d},Bad,Row,bad{i},Employee\n' for i in range(count)))
+    print(f"large file: {body['row_error_count']} errors, {len(body['row_errors'])} returned")
+    if body['row_error_count'] != count or len(body['row_errors']) != MAX_ROW_ERRORS:
+        support.fail('row diagnostics were not capped or not counted in full')
+
+    body = validate(client, admin, 'Name,Surname\nAnn,One\n')
+    if body['valid'] or sorted(body['missing_columns']) != ['Email', 'Employee ID']:
+        support.fail(f"missing columns not reported: {body['missing_columns']}")
+
+    with app.app_context():
+        if User.query.count() != users_before:
+            support.fail('validation wrote employees')
+
+    support.cleanup(app)
+    print("IMPORT VALIDATION PASS")
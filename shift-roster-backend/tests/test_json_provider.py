@@ -0,0 +1,99 @@
+import json
+from collections import namedtuple
+from datetime import date, datetime, time
+from decimal import Decimal
+
+import support
+
+# JSON provider: orjson and the standard library encoders write the same
+# JSON for dates, times, Decimals and namedtuples, and API responses are the
+# same under either backend.
+
+support.use_temp_database('json-provider-')
+
+# Importing src builds the default app against the empty database
+from src.models.models import db, Shift, ShiftRoster, User
+from src.utils.json_provider import FastJSONProvider, orjson
+from support import check
+
+Point = namedtuple('Point', ['x', 'y'])
+
+PAYLOAD = {
+    'date': date(2030, 1, 2),
+    'datetime': datetime(2030, 1, 2, 3, 4, 5, 678901),
+    'time': time(7, 30),
+    'hours': Decimal('7.50'),
+    'point': Point(1, 2),
+    'by_id': {2: 'b', 1: 'a'},
+    'nested': [{'day': date(2030, 12, 31), 'none': None}],
+}
+
+EXPECTED = {
+    'date': '2030-01-02',
+    'datetime': '2030-01-02T03:04:05.678901',
+    'time': '07:30:00',
+    'hours': 7.5,
+    'point': [1, 2],
+    'by_id': {'1': 'a', '2': 'b'},
+    'nested': [{'day': '2030-12-31', 'none': None}],
+}
+
+def responses(app, urls, headers):
+    client = app.test_client()
+    return {url: check(url, client.get(url, headers=headers), 200).get_json() for url in urls}
+
+if __name__ == "__main__":
+    app = support.seeded_app()
+    backends = ['stdlib'] + (['orjson'] if orjson is not None else [])
+    print(f'backends: {backends}')
+    for backend in backends:
+        provider = FastJSONProvider(app, backend=backend)
+        text = provider.dumps(PAYLOAD)
+        if json.loads(text) != EXPECTED:
+            support.fail(f'{backend} encoded {text}')
+        if list(json.loads(text)) != sorted(EXPECTED):
+            support.fail(f'{backend} did not sort keys')
+        with app.app_context():
+            body = provider.response(PAYLOAD).get_data()
+        if json.loads(body) != EXPECTED or not body.endswith(b'\n'):
+            support.fail(f'{backend} response body is {body!r}')
+
+    try:
+        FastJSONProvider(app, backend='simplejson')
+        support.fail('an unknown JSON_BACKEND was accepted')
+    except ValueError:
+        pass
+    if orjson is None:
+        try:
+            FastJSONProvider(app, backend='orjson')
+            support.fail("JSON_BACKEND 'orjson' was accepted without orjson installed")
+        except RuntimeError:
+            pass
+
+    # Roster and timesheet payloads read the same under either backend
+    with app.app_context():
+        employee_id = User.query.order_by(User.id).first().id
+        shift_id = Shift.query.filter(Shift.name != 'On Leave').first().id
+        db.session.add(ShiftRoster(employee_id=employee_id, shift_id=shift_id, date=date(2030, 5, 6),
+                                   hours=Decimal('7.5'), status='approved'))
+        db.session.commit()
+    client = app.test_client()
+    admin = support.login(client)
+    check('generate timesheets', client.post('/api/timesheets/generate', json={
+        'start_date': '2030-05-01', 'end_date': '2030-05-31'
+    }), 201)
+    urls = ['/api/roster?start_date=2030-05-01&end_date=2030-05-31', '/api/timesheets?start_date=2030-05-01&end_date=2030-05-31']
+    found = {}
+    for backend in backends:
+        app.json = FastJSONProvider(app, backend=backend)
+        found[backend] = responses(app, urls, admin)
+    if any(payload != found['stdlib'] for payload in found.values()):
+        support.fail('API responses differ between backends')
+    entry, = found['stdlib'][urls[0]]['roster']
+    timesheet, = found['stdlib'][urls[1]]
+    if (entry['date'], entry['hours'], entry['shift']['start_time']) != ('2030-05-06', 7.5, '06:00') or \
+            (timesheet['date'], timesheet['hours_worked']) != ('2030-05-06', 7.5):
+        support.fail(f'roster entry {entry}, timesheet {timesheet}')
+
+    support.cleanup(app)
+    print("JSON PROVIDER PASS")
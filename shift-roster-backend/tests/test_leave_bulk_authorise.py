@@ -0,0 +1,110 @@
+from datetime import date, timedelta
+
+import support
+
+# POST /api/leave/authorise/bulk: all-or-nothing validation, balances
+# deducted per employee, "On Leave" roster rows for every leave day except
+# days that already have a shift, and a query count that does not grow with
+# the length of the leave.
+
+support.use_temp_database('leave-bulk-')
+
+# Importing src builds the default app against the empty database
+from sqlalchemy import event
+from src.models.models import db, LeaveRequest, Shift, ShiftRoster, User
+from support import check
+
+def approved_leave(employee_id, start, days, status='approved'):
+    return LeaveRequest(employee_id=employee_id, leave_type='annual', reason='test', days=days, status=status,
+                        start_date=start, end_date=start + timedelta(days=days - 1))
+
+def add_leave(app, *leaves):
+    with app.app_context():
+        db.session.add_all(leaves)
+        db.session.commit()
+        return [lr.id for lr in leaves]
+
+def authorise(client, headers, ids):
+    return client.post('/api/leave/authorise/bulk', headers=headers, json={'ids': ids, 'action_comment': 'Year end'})
+
+def balance(client, headers, employee_id, year):
+    r = check(f'balance {year}', client.get(f'/api/leave/balance?employee_id={employee_id}&year={year}', headers=headers), 200)
+    return r.get_json()['balance']
+
+def count_queries(app, send):
+    statements = []
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        return send(), len(statements)
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+if __name__ == "__main__":
+    app = support.seeded_app()
+    client = app.test_client()
+    admin = support.login(client)
+    with app.app_context():
+        e1, e2 = [u.id for u in User.query.filter(User.email.in_([support.EMPLOYEE[0], support.EMPLOYEE_2[0]])).order_by(User.id)]
+        work_shift = Shift.query.filter(Shift.name != 'On Leave').first().id
+        leave_shift = Shift.query.filter_by(name='On Leave').one().id
+        # e1 already works on 2030-04-03, inside the leave below
+        db.session.add(ShiftRoster(employee_id=e1, shift_id=work_shift, date=date(2030, 4, 3), hours=8, status='approved'))
+        db.session.commit()
+    before = {e: balance(client, admin, e, 2030) for e in (e1, e2)}
+
+    ids = add_leave(app, approved_leave(e1, date(2030, 4, 1), 5), approved_leave(e2, date(2030, 4, 2), 2),
+                    approved_leave(e1, date(2030, 6, 1), 2))
+    pending, = add_leave(app, approved_leave(e2, date(2030, 7, 1), 1, status='pending'))
+
+    # One bad id rejects the whole batch
+    r = check('bulk with errors', authorise(client, admin, ids + [pending, 9999]), 400)
+    errors = r.get_json()['errors']
+    print(errors)
+    if errors != ['Leave request 9999: not found', f'Leave request {pending}: must be approved first']:
+        support.fail('bulk errors differ from the expected ones')
+    with app.app_context():
+        if LeaveRequest.query.filter_by(status='authorised').count() or ShiftRoster.query.filter_by(shift_id=leave_shift).count():
+            support.fail('a rejected batch authorised leave or wrote roster rows')
+    check('bulk with bad ids', authorise(client, admin, [True]), 400)
+    check('bulk without ids', authorise(client, admin, []), 400)
+    check('bulk as employee', authorise(client, support.login(client, support.EMPLOYEE), ids), 403)
+
+    r = check('bulk authorise', authorise(client, admin, ids), 200)
+    if r.get_json()['authorised_count'] != 3 or r.get_json()['ids'] != sorted(ids):
+        support.fail(f'bulk authorise returned {r.get_json()}')
+    after = {e: balance(client, admin, e, 2030) for e in (e1, e2)}
+    print(f'balances {before} -> {after}')
+    if (before[e1] - after[e1], before[e2] - after[e2]) != (7, 2):
+        support.fail('balances were not deducted by the authorised days')
+
+    # Every leave day is on the roster, except the day e1 already works
+    with app.app_context():
+        rows = {(r.employee_id, r.date): r.shift_id for r in ShiftRoster.query.filter(ShiftRoster.date < date(2031, 1, 1))}
+        leaves = {lr.id: lr for lr in LeaveRequest.query.filter(LeaveRequest.id.in_(ids))}
+        if any(lr.status != 'authorised' or not lr.action_comment.endswith('Auth: Year end') for lr in leaves.values()):
+            support.fail('requests were not marked authorised with the comment')
+    expected = {(e, d): leave_shift for e, start, n in [(e1, date(2030, 4, 1), 5), (e2, date(2030, 4, 2), 2), (e1, date(2030, 6, 1), 2)]
+                for d in (start + timedelta(days=i) for i in range(n))}
+    expected[(e1, date(2030, 4, 3))] = work_shift
+    if rows != expected:
+        support.fail(f'roster after authorising is {rows}')
+    check('authorise twice', authorise(client, admin, ids[:1]), 400)
+
+    # A month of leave per employee runs the same queries as a day
+    short = add_leave(app, approved_leave(e1, date(2031, 3, 2), 1), approved_leave(e2, date(2031, 3, 2), 1))
+    long = add_leave(app, approved_leave(e1, date(2032, 3, 1), 30), approved_leave(e2, date(2032, 3, 1), 30))
+    _, small = count_queries(app, lambda: check('authorise a day', authorise(client, admin, short), 200))
+    _, large = count_queries(app, lambda: check('authorise a month', authorise(client, admin, long), 200))
+    print(f'queries: {small} for 2 days of leave, {large} for 60')
+    if large != small:
+        support.fail('bulk authorisation ran more queries for longer leave')
+    with app.app_context():
+        if ShiftRoster.query.filter(ShiftRoster.date >= date(2032, 1, 1), ShiftRoster.shift_id == leave_shift).count() != 60:
+            support.fail('the month of leave was not put on the roster')
+
+    support.cleanup(app)
+    print("LEAVE BULK AUTHORISE PASS")
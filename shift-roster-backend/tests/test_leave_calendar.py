@@ -0,0 +1,129 @@
+import random
+import sqlite3
+from datetime import date, timedelta
+
+import support
+
+# In-process leave calendar: overlap queries and leave days agree with a
+# day-by-day count, committed leave writes are seen on the next read while
+# uncommitted or rolled back ones are not, and writes from outside the
+# process are picked up after LEAVE_CALENDAR_TTL.
+
+DB_PATH = support.use_temp_database('leave-calendar-')
+
+# Importing src builds the default app against the empty database
+from src.models.models import db, LeaveRequest, Shift, User
+from src.utils.leave_calendar import CALENDAR_STATUSES, get_leave_calendar
+from support import check
+
+START = date(2030, 3, 1)
+STATUSES = ('approved', 'authorised', 'pending', 'rejected')
+
+def leave_dates(leaves, employee_id, statuses):
+    """Days covered by the employee's leave in these statuses, counted once."""
+    days = set()
+    for employee, start, end, status in leaves:
+        if employee == employee_id and status in statuses:
+            days.update(start + timedelta(days=i) for i in range((end - start).days + 1))
+    return days
+
+if __name__ == "__main__":
+    app = support.seeded_app()
+    client = app.test_client()
+    admin = support.login(client)
+    random.seed(18)
+    with app.app_context():
+        employee_ids = [u.id for u in User.query.order_by(User.id)]
+        leaves = []
+        for _ in range(60):
+            start = START + timedelta(days=random.randrange(60))
+            leaves.append((random.choice(employee_ids), start, start + timedelta(days=random.randrange(6)),
+                           random.choice(STATUSES)))
+        db.session.add_all(LeaveRequest(employee_id=e, leave_type='annual', days=(end - start).days + 1,
+                                        start_date=start, end_date=end, status=status)
+                           for e, start, end, status in leaves)
+        db.session.commit()
+
+        # Overlaps and leave days match a day-by-day count, for both status sets
+        calendar = get_leave_calendar()
+        for statuses in (('approved',), CALENDAR_STATUSES):
+            covered = {e: leave_dates(leaves, e, statuses) for e in employee_ids}
+            for offset in range(-3, 66, 4):
+                a = START + timedelta(days=offset)
+                b = a + timedelta(days=random.randrange(10))
+                window = {a + timedelta(days=i) for i in range((b - a).days + 1)}
+                expected = {e: len(days & window) for e, days in covered.items() if days & window}
+                if calendar.employees_on_leave(a, b, statuses) != set(expected):
+                    support.fail(f'employees on leave {a}..{b} {statuses}')
+                if calendar.leave_days_by_employee(a, b, statuses=statuses) != expected:
+                    support.fail(f'leave days {a}..{b} {statuses}: {calendar.leave_days_by_employee(a, b, statuses=statuses)}'
+                                 f' expected {expected}')
+                if set(calendar.on_leave(a, statuses)) != {e for e, days in covered.items() if a in days}:
+                    support.fail(f'on leave on {a} {statuses}')
+        print(f'calendar agrees with a day-by-day count for {len(leaves)} leave requests')
+
+        # Overlapping requests count their shared days once
+        e = employee_ids[0]
+        db.session.add_all([
+            LeaveRequest(employee_id=e, leave_type='annual', days=5, status='approved',
+                         start_date=date(2031, 1, 1), end_date=date(2031, 1, 5)),
+            LeaveRequest(employee_id=e, leave_type='sick', days=5, status='approved',
+                         start_date=date(2031, 1, 3), end_date=date(2031, 1, 7)),
+        ])
+        db.session.flush()
+        if calendar.is_on_leave(e, date(2031, 1, 2)):
+            support.fail('uncommitted leave is in the calendar')
+        db.session.commit()
+        if calendar.leave_days(e, date(2031, 1, 1), date(2031, 1, 31)) != 7:
+            support.fail(f'overlapping leave counted {calendar.leave_days(e, date(2031, 1, 1), date(2031, 1, 31))} days')
+
+        # A rolled back request never shows; a bulk update is seen after commit
+        db.session.add(LeaveRequest(employee_id=e, leave_type='annual', days=1, status='approved',
+                                    start_date=date(2031, 2, 1), end_date=date(2031, 2, 1)))
+        db.session.flush()
+        db.session.rollback()
+        if calendar.is_on_leave(e, date(2031, 2, 1)):
+            support.fail('rolled back leave is in the calendar')
+        LeaveRequest.query.filter(LeaveRequest.start_date >= date(2031, 1, 1)).update({'status': 'rejected'})
+        db.session.commit()
+        if calendar.is_on_leave(e, date(2031, 1, 3)):
+            support.fail('a bulk update to rejected left the leave in the calendar')
+
+    # Writes that bypass the session are seen once the TTL has passed
+    with app.app_context():
+        db.engine.dispose()
+    conn = sqlite3.connect(DB_PATH)
+    conn.execute("INSERT INTO leave_requests (employee_id, leave_type, days, status, start_date, end_date, created_at) "
+                 "VALUES (?, 'annual', 1, 'approved', '2031-03-02', '2031-03-02', '2031-03-01')", (employee_ids[1],))
+    conn.commit()
+    conn.close()
+    with app.app_context():
+        calendar = get_leave_calendar()
+        if calendar.is_on_leave(employee_ids[1], date(2031, 3, 2)):
+            support.fail('the calendar reloaded before the TTL')
+        calendar.ttl = 0
+        if not calendar.is_on_leave(employee_ids[1], date(2031, 3, 2)):
+            support.fail('the calendar did not reload after the TTL')
+        calendar.ttl = 300
+
+    # The multi-day dashboard counts employees with approved leave in the range
+    a, b = START + timedelta(days=10), START + timedelta(days=16)
+    expected = {e for e in employee_ids if leave_dates(leaves, e, ('approved',)) & {a + timedelta(days=i) for i in range(7)}}
+    r = check('dashboard', client.get(f'/api/analytics/dashboard?start_date={a}&end_date={b}', headers=admin), 200)
+    if r.get_json()['metrics']['employees_on_leave'] != len(expected):
+        support.fail(f"dashboard counted {r.get_json()['metrics']['employees_on_leave']} on leave, expected {len(expected)}")
+
+    # Roster entries on authorised leave days are written with a warning
+    with app.app_context():
+        shift_id = Shift.query.filter(Shift.name != 'On Leave').first().id
+        db.session.add(LeaveRequest(employee_id=employee_ids[2], leave_type='annual', days=1, status='authorised',
+                                    start_date=date(2032, 5, 5), end_date=date(2032, 5, 5)))
+        db.session.commit()
+    r = check('roster on leave day', client.post('/api/roster', headers=admin, json={
+        'employee_id': employee_ids[2], 'shift_id': shift_id, 'hours': 8, 'date': '2032-05-05'
+    }), 201)
+    if r.get_json().get('warning') != 'Employee is on leave on this date':
+        support.fail('no warning for a roster entry on an authorised leave day')
+
+    support.cleanup(app)
+    print("LEAVE CALENDAR PASS")
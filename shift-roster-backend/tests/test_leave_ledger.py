@@ -0,0 +1,95 @@
+import sqlite3
+from datetime import date, timedelta
+
+import support
+
+# Leave balances across leave years: authorising leave, opening next year's
+# balance, allocation changes that must not rewrite a past year on
+# recompute, and balance reads by a user whose role no longer exists.
+
+DB_PATH = support.use_temp_database('leave-ledger-')
+
+# Importing src builds the default app against the empty database
+from src.models.models import db, LeaveBalance, LeaveRequest, User
+from src.utils.leave_ledger import current_leave_year, recompute_balances
+from support import check
+
+def balance(client, headers, employee_id, year):
+    r = check(f'balance {year}', client.get(f'/api/leave/balance?employee_id={employee_id}&year={year}', headers=headers), 200)
+    return r.get_json()
+
+def request_leave(client, headers, start, days):
+    r = check('leave request', client.post('/api/leave', headers=headers, json={
+        'leave_type': 'annual', 'reason': 'test',
+        'start_date': start.isoformat(), 'end_date': (start + timedelta(days=days - 1)).isoformat()
+    }), 201)
+    return r.get_json()['id']
+
+def authorise(client, admin, leave_id):
+    check('leave approve', client.post(f'/api/leave/{leave_id}/approve', headers=admin, json={'action': 'approve'}), 200)
+    check('leave authorise', client.post(f'/api/leave/{leave_id}/authorise', headers=admin, json={'action': 'authorise'}), 200)
+
+if __name__ == "__main__":
+    app = support.seeded_app()
+    client = app.test_client()
+    admin = support.login(client)
+    employee = support.login(client, support.EMPLOYEE)
+    this_year = current_leave_year()
+    last_year = this_year - 1
+
+    with app.app_context():
+        employee_id = User.query.filter_by(email=support.EMPLOYEE[0]).one().id
+    check('set allocation', client.put(f'/api/employees/{employee_id}', headers=admin,
+                                       json={'total_no_leave_days_annual': 20}), 200)
+    if balance(client, admin, employee_id, this_year)['balance'] != 20:
+        support.fail('allocation change did not reach the current balance')
+
+    # Leave in the next year is booked against that year only
+    next_year_leave = request_leave(client, employee, date(this_year + 1, 3, 2), 3)
+    authorise(client, admin, next_year_leave)
+    upcoming = balance(client, admin, employee_id, this_year + 1)
+    if (upcoming['allocated'], upcoming['used'], upcoming['balance']) != (20, 3, 17):
+        support.fail(f'next year balance is {upcoming}')
+    with app.app_context():
+        remaining = db.session.get(User, employee_id).total_no_leave_days_annual_float
+    if remaining != 20 or balance(client, admin, employee_id, this_year)['balance'] != 20:
+        support.fail(f'next year leave changed the current remaining days ({remaining})')
+
+    # Last year: authorised leave and a balance opened at the old allocation
+    with app.app_context():
+        db.session.add(LeaveRequest(
+            employee_id=employee_id, leave_type='annual', reason='old', days=4, status='authorised',
+            start_date=date(last_year, 6, 1), end_date=date(last_year, 6, 4)
+        ))
+        recompute_balances(last_year)
+        db.session.commit()
+    past = balance(client, admin, employee_id, last_year)
+    if (past['allocated'], past['balance']) != (20, 16):
+        support.fail(f'last year balance is {past}')
+
+    # Raising the allocation applies from the current year on
+    check('raise allocation', client.put(f'/api/employees/{employee_id}', headers=admin,
+                                         json={'total_no_leave_days_annual': 25}), 200)
+    with app.app_context():
+        for year in (last_year, this_year):
+            recompute_balances(year)
+        db.session.commit()
+        rows = {row.leave_year: (row.allocated, row.balance) for row in LeaveBalance.query.filter_by(employee_id=employee_id)}
+    print(f'balances after recompute: {rows}')
+    if rows[last_year] != (20, 16):
+        support.fail(f'recompute rewrote last year with the current allocation: {rows[last_year]}')
+    if rows[this_year] != (25, 25):
+        support.fail(f'current year balance is {rows[this_year]}')
+
+    # A user whose role was deleted can read their own balance and nobody else's
+    conn = sqlite3.connect(DB_PATH)
+    conn.execute('UPDATE users SET role_id = 9999 WHERE id = ?', (employee_id,))
+    conn.commit()
+    conn.close()
+    check('own balance without a role', client.get('/api/leave/balance', headers=employee), 200)
+    with app.app_context():
+        other_id = User.query.filter_by(email=support.ADMIN[0]).one().id
+    check("other's balance without a role", client.get(f'/api/leave/balance?employee_id={other_id}', headers=employee), 403)
+
+    support.cleanup(app)
+    print("LEAVE LEDGER PASS")
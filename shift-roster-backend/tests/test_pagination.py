@@ -0,0 +1,104 @@
+from datetime import date, time, timedelta
+
+import support
+
+# Keyset pagination on the listing endpoints: walking next_cursor returns
+# every row exactly once in the documented order, requests without
+# limit/cursor keep the full list, and bad parameters are a 400.
+
+support.use_temp_database('pagination-')
+
+# Importing src builds the default app against the empty database
+from src.models.models import db, LeaveRequest, Shift, ShiftRoster, User
+from src.utils.pagination import decode_cursor, encode_cursor
+from support import check
+
+def walk(client, headers, url, key, limit):
+    """Follow next_cursor from the first page; returns (items, pages)."""
+    items, pages, cursor = [], 0, None
+    separator = '&' if '?' in url else '?'
+    while True:
+        page_url = f'{url}{separator}limit={limit}' + (f'&cursor={cursor}' if cursor else '')
+        body = client.get(page_url, headers=headers).get_json()
+        items.extend(body[key])
+        pages += 1
+        cursor = body['next_cursor']
+        if cursor is None:
+            return items, pages
+        if pages > 100:
+            support.fail(f'{url} did not reach the last page')
+
+def check_walk(label, client, headers, url, key, full, sort_key, limit=4):
+    items, pages = walk(client, headers, url, key, limit)
+    print(f'{label}: {len(items)} rows in {pages} pages')
+    if [i['id'] for i in items] != [i['id'] for i in sorted(full, key=sort_key)]:
+        support.fail(f'{label} pages do not cover the full list once, in order')
+    if pages != max(1, -(-len(full) // limit)):
+        support.fail(f'{label} took {pages} pages for {len(full)} rows')
+
+if __name__ == "__main__":
+    app = support.seeded_app()
+    client = app.test_client()
+    admin = support.login(client)
+    with app.app_context():
+        employee_ids = [u.id for u in User.query.order_by(User.id)]
+        shifts = Shift.query.filter(Shift.name != 'On Leave').order_by(Shift.start_time).all()
+        start_times = {s.id: s.start_time.isoformat() for s in shifts}
+        shift_ids = [s.id for s in shifts]
+
+    # Several entries per day with different start times, created out of order
+    start = date.today() - timedelta(days=5)
+    check('bulk create', client.post('/api/roster/bulk', headers=admin, json={'return': 'ids', 'entries': [
+        {'employee_id': employee_id, 'shift_id': shift_ids[-1 - n % len(shift_ids)], 'hours': 8,
+         'date': (start + timedelta(days=i)).isoformat()}
+        for n, employee_id in enumerate(employee_ids) for i in range(5)
+    ]}), 201)
+    full = check('full roster', client.get('/api/roster', headers=admin), 200).get_json()['roster']
+    if len(full) != 5 * len(employee_ids):
+        support.fail(f'unpaged roster returned {len(full)} entries')
+    check_walk('roster', client, admin, '/api/roster', 'roster', full,
+               lambda e: (e['date'], start_times[e['shift_id']], e['id']))
+
+    with app.app_context():
+        ShiftRoster.query.update({'status': 'approved'})
+        db.session.commit()
+    check('generate timesheets', client.post('/api/timesheets/generate', json={
+        'start_date': start.isoformat(), 'end_date': date.today().isoformat()
+    }), 201)
+    full = check('full timesheets', client.get('/api/timesheets', headers=admin), 200).get_json()
+    check_walk('timesheets', client, admin, '/api/timesheets', 'timesheets', full,
+               lambda t: (-date.fromisoformat(t['date']).toordinal(), -t['id']))
+
+    with app.app_context():
+        db.session.add_all([
+            LeaveRequest(employee_id=employee_ids[n % len(employee_ids)], leave_type='annual', days=1, status='pending',
+                         start_date=date(2030, 1, 1) + timedelta(days=n // 3), end_date=date(2030, 1, 1) + timedelta(days=n // 3))
+            for n in range(10)
+        ])
+        db.session.commit()
+    full = check('full leave', client.get('/api/leave', headers=admin), 200).get_json()
+    check_walk('leave', client, admin, '/api/leave', 'leave_requests', full,
+               lambda r: (-date.fromisoformat(r['start_date']).toordinal(), -r['id']))
+
+    full = check('full employees', client.get('/api/employees', headers=admin), 200).get_json()['employees']
+    check_walk('employees', client, admin, '/api/employees', 'employees', full, lambda e: e['id'], limit=3)
+
+    # Filters apply to every page
+    employee_id = employee_ids[0]
+    items, _ = walk(client, admin, f'/api/roster?employee_id={employee_id}', 'roster', 2)
+    if len(items) != 5 or {e['employee_id'] for e in items} != {employee_id}:
+        support.fail(f'filtered roster pages returned {[(e["id"], e["employee_id"]) for e in items]}')
+
+    # Cursors round-trip dates, times and ids
+    values = [date(2030, 1, 2), time(6, 30), 7]
+    if decode_cursor(encode_cursor(values)) != values:
+        support.fail('cursor did not round-trip its values')
+
+    for query in ('limit=0', 'limit=abc', 'cursor=not-a-cursor', f'cursor={encode_cursor([1])}'):
+        check(f'roster {query}', client.get(f'/api/roster?{query}', headers=admin), 400)
+    check('leave bad cursor', client.get('/api/leave?cursor=%%%', headers=admin), 400)
+    check('timesheets bad limit', client.get('/api/timesheets?limit=-1', headers=admin), 400)
+    check('employees bad cursor', client.get('/api/employees?cursor=e30', headers=admin), 400)
+
+    support.cleanup(app)
+    print("PAGINATION PASS")
@@ -0,0 +1,89 @@
+import sqlite3
+
+import support
+
+# JWT_ROLE_CLAIMS mode: tokens carry the role and a permission bitmask that
+# authorise without loading the user, and every way of taking a role or a
+# permission away (role edit, role reassignment, employee deletion, a bump
+# from another worker) sends old tokens back to the database check.
+
+DB_PATH = support.use_temp_database('role-claims-')
+
+# Importing src builds the default app against the empty database
+from flask_jwt_extended import decode_token
+from sqlalchemy import event
+from src.models.models import db, Role, User
+from src.utils.claims import mask_to_permissions
+from support import check
+
+def set_manager_permissions(client, admin, manager_role, permissions):
+    check('edit manager role', client.put(f'/api/roles/{manager_role}', headers=admin, json={
+        'permissions': {name: True for name in permissions}
+    }), 200)
+
+def create_area(client, headers, name):
+    return client.post('/api/areas', headers=headers, json={'name': name})
+
+if __name__ == "__main__":
+    app = support.seeded_app(JWT_ROLE_CLAIMS=True, ROLE_VERSION_TTL=0)
+    client = app.test_client()
+    admin = support.login(client)
+    with app.app_context():
+        roles = {r.name: r.id for r in Role.query}
+        user_ids = {u.email: u.id for u in User.query}
+    manager_permissions = ['view_team_rosters', 'approve_rosters', 'approve_timesheets', 'view_analytics', 'export_data']
+
+    # Grant the manager role manage_areas and log in with a token that carries it
+    set_manager_permissions(client, admin, roles['Manager'], manager_permissions + ['manage_areas'])
+    manager = support.login(client, support.MANAGER)
+    with app.app_context():
+        claims = decode_token(manager['Authorization'].split()[1])
+    print(f"manager claims: role={claims['role']} rv={claims['rv']}")
+    if claims['role_id'] != roles['Manager'] or 'manage_areas' not in mask_to_permissions(claims['perms']):
+        support.fail(f'access token is missing the role claims: {claims}')
+
+    # A current token is authorised from its claims alone
+    user_reads = []
+    def count_user_reads(conn, cursor, statement, *args):
+        if 'FROM users' in statement:
+            user_reads.append(statement)
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', count_user_reads)
+        check('area with current claims', create_area(client, manager, 'Dock A'), 201)
+        event.remove(db.engine, 'before_cursor_execute', count_user_reads)
+    if user_reads:
+        support.fail(f'claims-authorised request still loaded the user: {user_reads[0][:120]}')
+
+    # Taking the permission away from the role invalidates the token
+    set_manager_permissions(client, admin, roles['Manager'], manager_permissions)
+    check('area after permission removed', create_area(client, manager, 'Dock B'), 403)
+
+    # Another worker bumping the role version is seen once the TTL lapses
+    set_manager_permissions(client, admin, roles['Manager'], manager_permissions + ['manage_areas'])
+    manager = support.login(client, support.MANAGER)
+    check('area with new token', create_area(client, manager, 'Dock C'), 201)
+    conn = sqlite3.connect(DB_PATH)
+    conn.execute("UPDATE roles SET version = version + 1, permissions = '{}' WHERE id = ?", (roles['Manager'],))
+    conn.commit()
+    conn.close()
+    check('area after version bumped elsewhere', create_area(client, manager, 'Dock D'), 403)
+    set_manager_permissions(client, admin, roles['Manager'], manager_permissions)
+
+    # Reassigning the employee's role revokes the old role's claims
+    manager = support.login(client, support.MANAGER)
+    check('manager export', client.get('/api/export/employees/csv', headers=manager), 200)
+    check('demote manager', client.put(f"/api/employees/{user_ids[support.MANAGER[0]]}", headers=admin,
+                                       json={'role_id': roles['Employee']}), 200)
+    check('export after demotion', client.get('/api/export/employees/csv', headers=manager), 403)
+
+    # Deleting the employee revokes their token
+    employee_id = user_ids[support.EMPLOYEE_2[0]]
+    check('promote employee', client.put(f'/api/employees/{employee_id}', headers=admin,
+                                         json={'role_id': roles['Manager']}), 200)
+    promoted = support.login(client, support.EMPLOYEE_2)
+    check('promoted export', client.get('/api/export/employees/csv', headers=promoted), 200)
+    check('delete employee', client.delete(f'/api/employees/{employee_id}', headers=admin), 200)
+    check('export after deletion', client.get('/api/export/employees/csv', headers=promoted), 404)
+
+    support.cleanup(app)
+    print("ROLE CLAIMS PASS")
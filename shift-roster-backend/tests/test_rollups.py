@@ -0,0 +1,89 @@
+from datetime import date, timedelta
+
+import support
+
+# Dashboard daily rollups: kept current per commit, written as per-date
+# upserts, and rebuilt from scratch only by the rollup-rebuild command.
+
+support.use_temp_database('rollups-')
+
+# Importing src builds the default app against the empty database
+from src.main import create_app
+from src.models.models import db, DashboardDailyRollup, Shift, User
+from src.models.rollups import _write_rows, rollups_missing
+from support import check
+
+def snapshot(app):
+    with app.app_context():
+        rows = {r.date: {k: v for k, v in r.to_dict().items() if k != 'updated_at'} for r in DashboardDailyRollup.query}
+        db.session.remove()
+    return rows
+
+if __name__ == "__main__":
+    app = support.seeded_app()
+    client = app.test_client()
+    admin = support.login(client)
+    with app.app_context():
+        employee_ids = [u.id for u in User.query.order_by(User.id)]
+        shift_id = Shift.query.filter(Shift.name != 'On Leave').first().id
+    start = date.today() - timedelta(days=3)
+    r = check('bulk create', client.post('/api/roster/bulk', headers=admin, json={'entries': [
+        {'employee_id': employee_id, 'shift_id': shift_id, 'hours': 8, 'date': (start + timedelta(days=i)).isoformat()}
+        for employee_id in employee_ids for i in range(5)
+    ]}), 201)
+    first_id = r.get_json()['entries'][0]['id']
+    check('approve', client.post(f'/api/roster/{first_id}/approve', headers=admin, json={'action': 'approve'}), 200)
+    incremental = snapshot(app)
+    if not incremental:
+        support.fail('roster writes produced no rollup rows')
+
+    # The command recomputes the same rows the per-commit refresh kept
+    result = app.test_cli_runner().invoke(args=['rollup-rebuild'])
+    print(result.output.strip())
+    if result.exit_code != 0 or snapshot(app) != incremental:
+        support.fail('rollup-rebuild disagrees with the incrementally maintained rollups')
+
+    # A roster write refreshes its day; clearing the day removes the row
+    employee_id = employee_ids[-1]
+    day = date.today() + timedelta(days=200)
+    r = check('create roster entry', client.post('/api/roster', headers=admin, json={
+        'employee_id': employee_id, 'shift_id': shift_id, 'hours': 7, 'date': day.isoformat()
+    }), 201)
+    entry_id = r.get_json()['roster_entry']['id']
+    if snapshot(app).get(day, {}).get('pending_shifts') != 1:
+        support.fail(f'no pending shift in the rollup for {day}: {snapshot(app).get(day)}')
+    check('delete roster entry', client.delete(f'/api/roster/{entry_id}', headers=admin), 200)
+    if day in snapshot(app):
+        support.fail(f'rollup row for the emptied day {day} was kept')
+
+    # Writing a day that already has a row (e.g. committed by another
+    # transaction in the meantime) updates it instead of failing
+    with app.app_context():
+        row = dict(DashboardDailyRollup.query.first().to_dict())
+        existing = date.fromisoformat(row['date'])
+        _write_rows(db.session, [{
+            'date': existing, 'approved_shifts': 99, 'pending_shifts': 0, 'approved_hours': 0.0,
+            'employees_on_shift': 0, 'employees_on_leave': 0, 'timesheet_hours': 0.0,
+            'pending_timesheets': 0, 'updated_at': None,
+        }])
+        db.session.commit()
+        if db.session.get(DashboardDailyRollup, existing).approved_shifts != 99:
+            support.fail('upsert did not update the existing rollup row')
+        db.session.remove()
+
+    # Startup reports missing rollups but leaves the rebuild to the command
+    with app.app_context():
+        db.session.query(DashboardDailyRollup).delete()
+        db.session.commit()
+        db.engine.dispose()
+    app = create_app()
+    with app.app_context():
+        if not rollups_missing():
+            support.fail('app startup rebuilt the rollups')
+    result = app.test_cli_runner().invoke(args=['rollup-rebuild'])
+    print(result.output.strip())
+    if snapshot(app) != incremental:
+        support.fail('rollup-rebuild did not restore the rollups')
+
+    support.cleanup(app)
+    print("ROLLUPS PASS")
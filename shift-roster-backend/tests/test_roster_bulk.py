@@ -0,0 +1,109 @@
+from datetime import date, timedelta
+
+import support
+
+# /api/roster/bulk: entries are checked against preloaded employees, shifts
+# and assignments, errors are reported per entry with nothing written, and
+# the number of queries does not grow with the number of entries.
+
+support.use_temp_database('roster-bulk-')
+
+# Importing src builds the default app against the empty database
+from sqlalchemy import event
+from src.models.models import db, LeaveRequest, Shift, ShiftRoster, User
+from support import check
+
+def bulk(client, headers, entries, **extra):
+    return client.post('/api/roster/bulk', headers=headers, json={'entries': entries, **extra})
+
+def count_queries(app, send):
+    statements = []
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        return send(), len(statements)
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+def days(employee_ids, shift_id, start, count):
+    return [
+        {'employee_id': employee_id, 'shift_id': shift_id, 'hours': 8, 'date': (start + timedelta(days=i)).isoformat()}
+        for employee_id in employee_ids for i in range(count)
+    ]
+
+if __name__ == "__main__":
+    app = support.seeded_app()
+    client = app.test_client()
+    admin = support.login(client)
+    with app.app_context():
+        employee_ids = [u.id for u in User.query.order_by(User.id)]
+        shift_id = Shift.query.filter(Shift.name != 'On Leave').first().id
+        # Approved leave on 2030-07-03 for the last employee
+        db.session.add(LeaveRequest(employee_id=employee_ids[-1], leave_type='annual', days=1, status='approved',
+                                    start_date=date(2030, 7, 3), end_date=date(2030, 7, 3)))
+        db.session.commit()
+
+    # Entries come back in request order, with a warning for the leave day
+    entries = days(reversed(employee_ids), shift_id, date(2030, 7, 1), 3)
+    r = check('bulk create', bulk(client, admin, entries), 201)
+    body = r.get_json()
+    returned = [(e['employee_id'], e['date']) for e in body['entries']]
+    if returned != [(e['employee_id'], e['date']) for e in entries] or body['created_count'] != len(entries):
+        support.fail('created entries are not returned in request order')
+    print(f"warnings: {body['warnings']}")
+    if body['warnings'] != ['Entry 3: Employee is on leave on this date']:
+        support.fail('the entry on an approved leave day was not reported')
+
+    # Every invalid entry is reported and nothing is written
+    with app.app_context():
+        before = ShiftRoster.query.count()
+    free_day = date(2030, 8, 1).isoformat()
+    r = check('bulk with errors', bulk(client, admin, [
+        {'employee_id': employee_ids[0], 'shift_id': shift_id, 'date': free_day},
+        {'employee_id': 9999, 'shift_id': shift_id, 'hours': 8, 'date': free_day},
+        {'employee_id': employee_ids[0], 'shift_id': 9999, 'hours': 8, 'date': free_day},
+        {'employee_id': employee_ids[0], 'shift_id': shift_id, 'hours': 8, 'date': '2030-02-30'},
+        {'employee_id': employee_ids[0], 'shift_id': shift_id, 'hours': 8, 'date': free_day},
+        {'employee_id': employee_ids[0], 'shift_id': shift_id, 'hours': 8, 'date': free_day},
+        {'employee_id': employee_ids[0], 'shift_id': shift_id, 'hours': 8, 'date': '2030-07-01'},
+    ]), 400)
+    errors = r.get_json()['errors']
+    for error in errors:
+        print(error)
+    if errors != [
+        'Entry 1: hours is required',
+        'Entry 2: Employee not found',
+        'Entry 3: Shift not found',
+        'Entry 4: Invalid date format',
+        'Entry 6: Employee already scheduled for this date',
+        'Entry 7: Employee already scheduled for this date',
+    ]:
+        support.fail('per-entry errors differ from the expected ones')
+    with app.app_context():
+        if ShiftRoster.query.count() != before:
+            support.fail('a bulk request with errors wrote entries')
+
+    check('bulk without entries', bulk(client, admin, []), 400)
+    check('bulk as employee', bulk(client, support.login(client, support.EMPLOYEE), entries), 403)
+
+    # skip keeps existing assignments and counts the skipped entries
+    r = check('bulk skip', bulk(client, admin, days(employee_ids, shift_id, date(2030, 7, 3), 2),
+                                on_conflict='skip', **{'return': 'ids'}), 201)
+    body = r.get_json()
+    if (body['created_count'], body['skipped_count'], len(body['ids'])) != (len(employee_ids), len(employee_ids), len(employee_ids)):
+        support.fail(f"skip policy created {body['created_count']} and skipped {body['skipped_count']}")
+
+    # A week and three months of entries run the same number of queries
+    _, small = count_queries(app, lambda: check('bulk week', bulk(
+        client, admin, days(employee_ids, shift_id, date(2031, 1, 1), 7)), 201))
+    _, large = count_queries(app, lambda: check('bulk quarter', bulk(
+        client, admin, days(employee_ids, shift_id, date(2031, 2, 1), 90)), 201))
+    print(f'queries: {small} for {7 * len(employee_ids)} entries, {large} for {90 * len(employee_ids)}')
+    if large != small:
+        support.fail('bulk creation ran more queries for more entries')
+
+    support.cleanup(app)
+    print("ROSTER BULK PASS")
@@ -0,0 +1,130 @@
+import sqlite3
+from datetime import date, timedelta
+
+import support
+
+# Roster writes against the (employee_id, date) uniqueness rule.
+#
+# First with the unique index in place: creating or moving an entry onto a
+# day the employee already works follows the on_conflict policy instead of
+# failing with 500. Then on a database whose shift_roster already has
+# duplicate rows, so the startup migration cannot create the index that
+# INSERT ... ON CONFLICT relies on and writes fall back to read-then-write.
+
+DB_PATH = support.use_temp_database('roster-duplicates-')
+
+# Importing src builds the default app against the empty database
+from src.main import create_app
+from src.models.models import db, ShiftRoster
+from src.utils.roster_writes import has_roster_unique_index
+
+def make_duplicates():
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        conn.execute('DROP INDEX uq_shift_roster_employee_date')
+        employee_id = conn.execute("SELECT id FROM users WHERE email = 'employee1@company.com'").fetchone()[0]
+        shift_id = conn.execute("SELECT id FROM shifts WHERE name != 'On Leave' ORDER BY id").fetchone()[0]
+        day = (date.today() - timedelta(days=30)).isoformat()
+        for _ in range(2):
+            conn.execute(
+                "INSERT INTO shift_roster (employee_id, shift_id, date, hours, status, notes, created_at) "
+                "VALUES (?, ?, ?, 8, 'pending', '', CURRENT_TIMESTAMP)",
+                (employee_id, shift_id, day)
+            )
+        conn.commit()
+        return employee_id, shift_id
+    finally:
+        conn.close()
+
+def entries_on(app, employee_id, day):
+    with app.app_context():
+        return [(e.id, e.hours) for e in ShiftRoster.query.filter_by(employee_id=employee_id, date=day)]
+
+def check_moves(app, employee_id, shift_id, offset):
+    """PUT /roster/<id> onto an occupied day under each conflict policy."""
+    client = app.test_client()
+    admin = support.login(client)
+    day = date.today() + timedelta(days=offset)
+    entry = {'employee_id': employee_id, 'shift_id': shift_id, 'hours': 8}
+    taken_id = support.check('create taken day', client.post('/api/roster', headers=admin, json=dict(entry, date=day.isoformat())), 201).get_json()['roster_entry']['id']
+    moving = support.check('create entry to move', client.post('/api/roster', headers=admin, json=dict(entry, date=(day + timedelta(days=1)).isoformat(), hours=5)), 201).get_json()['roster_entry']['id']
+    move = {'date': day.isoformat()}
+
+    support.check('move onto taken day (default policy)', client.put(f'/api/roster/{moving}', headers=admin, json=move), 400)
+    support.check('move onto taken day (error policy)', client.put(f'/api/roster/{moving}', headers=admin, json=dict(move, on_conflict='error')), 400)
+    support.check('move with unknown policy', client.put(f'/api/roster/{moving}', headers=admin, json=dict(move, on_conflict='merge')), 400)
+    r = support.check('move onto taken day (skip policy)', client.put(f'/api/roster/{moving}', headers=admin, json=dict(move, on_conflict='skip')), 200)
+    if r.get_json()['roster_entry']['date'] != (day + timedelta(days=1)).isoformat():
+        support.fail('skip policy moved the entry')
+    if entries_on(app, employee_id, day) != [(taken_id, 8)]:
+        support.fail(f'taken day changed by a rejected move: {entries_on(app, employee_id, day)}')
+
+    support.check('move onto taken day (replace policy)', client.put(f'/api/roster/{moving}', headers=admin, json=dict(move, on_conflict='replace')), 200)
+    if entries_on(app, employee_id, day) != [(moving, 5)]:
+        support.fail(f'replace policy left {entries_on(app, employee_id, day)}')
+
+    # Moving within the same day, or onto a free day, is not a conflict
+    support.check('move onto own day', client.put(f'/api/roster/{moving}', headers=admin, json=move), 200)
+    support.check('move onto free day', client.put(f'/api/roster/{moving}', headers=admin, json={'date': (day + timedelta(days=2)).isoformat()}), 200)
+
+def check_fallback(app, employee_id, shift_id):
+    """Creation and leave authorisation without the unique index."""
+    client = app.test_client()
+    admin = support.login(client)
+    day = date.today() + timedelta(days=40)
+    entry = {'employee_id': employee_id, 'shift_id': shift_id, 'date': day.isoformat(), 'hours': 8}
+
+    support.check('create', client.post('/api/roster', json=entry, headers=admin), 201)
+    support.check('create again (error policy)', client.post('/api/roster', json=dict(entry, on_conflict='error'), headers=admin), 400)
+    support.check('create again (skip policy)', client.post('/api/roster', json=dict(entry, on_conflict='skip'), headers=admin), 200)
+    support.check('create again (replace policy)', client.post('/api/roster', json=dict(entry, hours=6, on_conflict='replace'), headers=admin), 201)
+    support.check('bulk create', client.post('/api/roster/bulk', headers=admin, json={'entries': [
+        dict(entry, date=(day + timedelta(days=i)).isoformat()) for i in range(1, 4)
+    ]}), 201)
+
+    employee = support.login(client, support.EMPLOYEE)
+    leave_start = day + timedelta(days=10)
+    r = client.post('/api/leave', headers=employee, json={
+        'leave_type': 'annual', 'reason': 'test',
+        'start_date': leave_start.isoformat(), 'end_date': (leave_start + timedelta(days=2)).isoformat()
+    })
+    support.check('leave request', r, 201)
+    leave_id = r.get_json()['id']
+    support.check('leave approve', client.post(f'/api/leave/{leave_id}/approve', headers=admin, json={'action': 'approve'}), 200)
+    support.check('leave authorise', client.post(f'/api/leave/{leave_id}/authorise', headers=admin, json={'action': 'authorise'}), 200)
+
+    with app.app_context():
+        on_leave = ShiftRoster.query.filter(
+            ShiftRoster.employee_id == employee_id,
+            ShiftRoster.date >= leave_start,
+            ShiftRoster.date <= leave_start + timedelta(days=2),
+        ).count()
+    if on_leave != 3:
+        support.fail(f"expected 3 leave days on the roster, found {on_leave}")
+    if [hours for _, hours in entries_on(app, employee_id, day)] != [6]:
+        support.fail(f"expected one replaced entry, found {entries_on(app, employee_id, day)}")
+
+if __name__ == "__main__":
+    app = support.seeded_app()
+    with app.app_context():
+        if not has_roster_unique_index():
+            support.fail("unique index missing on a freshly seeded database")
+    conn = sqlite3.connect(DB_PATH)
+    employee_id = conn.execute("SELECT id FROM users WHERE email = 'employee1@company.com'").fetchone()[0]
+    shift_id = conn.execute("SELECT id FROM shifts WHERE name != 'On Leave' ORDER BY id").fetchone()[0]
+    conn.close()
+    check_moves(app, employee_id, shift_id, 60)
+    with app.app_context():
+        db.engine.dispose()
+
+    employee_id, shift_id = make_duplicates()
+    # A fresh app runs the startup migration against the duplicates
+    app = create_app()
+    with app.app_context():
+        if has_roster_unique_index():
+            support.fail("unique index was created despite duplicate rows")
+    check_moves(app, employee_id, shift_id, 80)
+    check_fallback(app, employee_id, shift_id)
+
+    support.cleanup(app)
+    print("ROSTER DUPLICATES PASS")
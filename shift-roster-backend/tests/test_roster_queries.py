@@ -0,0 +1,75 @@
+from datetime import date, timedelta
+
+import support
+
+# Roster read paths load every relationship their payload uses up front, so
+# the number of queries they run does not grow with the number of rows.
+
+support.use_temp_database('roster-queries-')
+
+# Importing src builds the default app against the empty database
+from sqlalchemy import event
+from src.models.models import db, Shift, ShiftRoster, User
+from support import check
+
+def count_queries(app, client, headers, url):
+    """Status, JSON body and number of SQL statements for one GET."""
+    statements = []
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        r = client.get(url, headers=headers)
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    check(url, r, 200)
+    return r.get_json(), len(statements)
+
+def add_roster(client, admin, employee_ids, shift_id, start, days):
+    r = check('bulk create', client.post('/api/roster/bulk', headers=admin, json={'return': 'ids', 'entries': [
+        {'employee_id': employee_id, 'shift_id': shift_id, 'hours': 8, 'date': (start + timedelta(days=i)).isoformat()}
+        for employee_id in employee_ids for i in range(days)
+    ]}), 201)
+    ids = r.get_json()['ids']
+    # Approved entries with timesheets exercise every relationship to_dict() reads
+    for roster_id in ids:
+        check('approve', client.post(f'/api/roster/{roster_id}/approve', headers=admin, json={'action': 'approve'}), 200)
+    check('generate timesheets', client.post('/api/timesheets/generate', json={
+        'start_date': start.isoformat(), 'end_date': (start + timedelta(days=days)).isoformat()
+    }), 201)
+
+if __name__ == "__main__":
+    app = support.seeded_app()
+    client = app.test_client()
+    admin = support.login(client)
+    with app.app_context():
+        employee_ids = [u.id for u in User.query.order_by(User.id)]
+        shift_id = Shift.query.filter(Shift.name != 'On Leave').first().id
+    urls = [
+        '/api/roster',
+        '/api/reports/shift-acceptance',
+        f'/api/reports/employee-history/{employee_ids[-1]}',
+    ]
+
+    add_roster(client, admin, employee_ids, shift_id, date(2030, 1, 1), 1)
+    small = {url: count_queries(app, client, admin, url) for url in urls}
+    add_roster(client, admin, employee_ids, shift_id, date(2030, 2, 1), 6)
+    large = {url: count_queries(app, client, admin, url) for url in urls}
+
+    for url in urls:
+        print(f'{url}: {small[url][1]} queries before, {large[url][1]} after adding rows')
+        if large[url][1] != small[url][1]:
+            support.fail(f'{url} ran {large[url][1]} queries for more rows, {small[url][1]} for fewer')
+
+    roster = large['/api/roster'][0]['roster']
+    with app.app_context():
+        if len(roster) != ShiftRoster.query.count():
+            support.fail(f'roster returned {len(roster)} entries')
+    entry = roster[-1]
+    if not (entry['employee']['role'] and entry['shift'] and entry['approver'] and entry['timesheet']):
+        support.fail(f'eager-loaded roster entry is missing related data: {entry}')
+
+    support.cleanup(app)
+    print("ROSTER QUERIES PASS")
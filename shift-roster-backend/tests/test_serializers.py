@@ -0,0 +1,75 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+import support
+
+# The projection serializers must return exactly what the model serializers
+# return for the same users, whatever related data each user has.
+
+support.use_temp_database('serializers-')
+
+# Importing src builds the default app against the empty database
+from src.models.models import (
+    db, User, Role, AreaOfResponsibility, Designation, Skill, License, EmployeeLicense, USER_SUMMARY_FIELDS
+)
+from src.models.serializers import serialize_users
+
+def add_variety():
+    """Give the seeded users every kind of related data, and one user none."""
+    users = User.query.order_by(User.id).all()
+    designation = Designation(designation_name='Shift Lead')
+    area = AreaOfResponsibility(name='Cold Store', description=None, color='#123456')
+    role = Role(name='Legacy', permissions='not json')
+    skills = [Skill(name='Welding', description='MIG'), Skill(name='Rigging')]
+    licenses = [License(name='Crane', description='Mobile crane'), License(name='Forklift Class B')]
+    db.session.add_all([designation, area, role] + skills + licenses)
+    db.session.flush()
+
+    users[0].designation_id = designation.designation_id
+    users[0].rate_type = 'hourly'
+    users[0].rate_value = Decimal('123.45')
+    users[0].total_no_leave_days_annual = 21
+    users[0].skills = skills
+    users[1].area_of_responsibility_id = area.id
+    users[1].role_id = role.id
+    users[1].skills = skills[1:]
+    users[1].alt_contact_name = 'Next of kin'
+    today = date.today()
+    db.session.add_all([
+        EmployeeLicense(employee_id=users[0].id, license_id=licenses[0].id, expiry_date=today - timedelta(days=3)),
+        EmployeeLicense(employee_id=users[0].id, license_id=licenses[1].id, expiry_date=today + timedelta(days=10)),
+        EmployeeLicense(employee_id=users[1].id, license_id=licenses[1].id, expiry_date=None),
+    ])
+    db.session.add(User(google_id='bare', email='bare@company.com', name='Bare', surname='User', role_id=role.id))
+    db.session.commit()
+
+if __name__ == "__main__":
+    app = support.seeded_app()
+    with app.app_context():
+        add_variety()
+        query = User.query.order_by(User.id)
+
+        expected = [u.to_dict() for u in query]
+        db.session.expire_all()
+        actual = serialize_users(query, 'full')
+        if actual != expected:
+            for a, e in zip(actual, expected):
+                for key in e:
+                    if a.get(key) != e[key]:
+                        print(f"user {e['id']} {key}: {a.get(key)!r} != {e[key]!r}")
+            support.fail("'full' view differs from User.to_dict()")
+        print(f"full view matches User.to_dict() for {len(expected)} users")
+
+        summaries = serialize_users(query, 'summary')
+        if summaries != [u.to_summary_dict() for u in query]:
+            support.fail("'summary' view differs from User.to_summary_dict()")
+        cards = serialize_users(query, 'card')
+        for card, full in zip(cards, expected):
+            if {k: card[k] for k in USER_SUMMARY_FIELDS} != {k: full[k] for k in USER_SUMMARY_FIELDS}:
+                support.fail(f"'card' view identity differs for user {full['id']}")
+            if card['role_name'] != (full['role'] or {}).get('name'):
+                support.fail(f"'card' view role differs for user {full['id']}")
+        db.session.remove()
+
+    support.cleanup(app)
+    print("SERIALIZERS PASS")
@@ -0,0 +1,114 @@
+from collections import Counter
+from datetime import date, timedelta
+
+import support
+
+# /api/analytics/shift-coverage: planned (pending + approved) and actual
+# (approved, up to today) counts per shift type, per day and area, and as a
+# dense matrix, all from one grouped query.
+
+support.use_temp_database('shift-coverage-')
+
+# Importing src builds the default app against the empty database
+from sqlalchemy import event
+from src.models.models import db, AreaOfResponsibility, Shift, ShiftRoster, User
+from support import check
+
+TODAY = date.today()
+START, END = TODAY - timedelta(days=3), TODAY + timedelta(days=3)
+RANGE = f'start_date={START}&end_date={END}'
+
+def expected_counts(entries, key):
+    """Counter of (planned, actual) per key(entry) for the entries in range."""
+    planned, actual = Counter(), Counter()
+    for e in entries:
+        if START <= e['date'] <= END and e['status'] in ('pending', 'approved'):
+            planned[key(e)] += 1
+            if e['status'] == 'approved' and e['date'] <= TODAY:
+                actual[key(e)] += 1
+    return planned, actual
+
+def coverage(client, headers, query):
+    return check(f'coverage {query}', client.get(f'/api/analytics/shift-coverage?{RANGE}&{query}', headers=headers), 200).get_json()
+
+def compare(label, rows, entries, key, row_key):
+    planned, actual = expected_counts(entries, key)
+    found_planned = {row_key(r): r['planned'] for r in rows if r['planned']}
+    found_actual = {row_key(r): r['actual'] for r in rows if r['actual']}
+    if found_planned != dict(planned) or found_actual != dict(actual):
+        support.fail(f'{label}: planned {found_planned} actual {found_actual}, expected {dict(planned)} {dict(actual)}')
+    for r in rows:
+        if r['utilization'] != (int(r['actual'] / r['planned'] * 100) if r['planned'] else 0):
+            support.fail(f'{label}: wrong utilization in {r}')
+
+if __name__ == "__main__":
+    app = support.seeded_app()
+    client = app.test_client()
+    admin = support.login(client)
+    with app.app_context():
+        employee_ids = [u.id for u in User.query.order_by(User.id)]
+        shift_ids = [s.id for s in Shift.query.filter(Shift.name != 'On Leave').order_by(Shift.id)]
+        area_ids = [a.id for a in AreaOfResponsibility.query.order_by(AreaOfResponsibility.id)][:2]
+        past, future = TODAY - timedelta(days=2), TODAY + timedelta(days=2)
+        e0, e1, e2, e3 = employee_ids[:4]
+        entries = [
+            dict(employee_id=e0, date=past, shift_id=shift_ids[0], status='approved', area_of_responsibility_id=area_ids[0]),
+            dict(employee_id=e1, date=past, shift_id=shift_ids[0], status='pending', area_of_responsibility_id=area_ids[1]),
+            dict(employee_id=e2, date=past, shift_id=shift_ids[1], status='approved', area_of_responsibility_id=area_ids[0]),
+            dict(employee_id=e3, date=past, shift_id=shift_ids[1], status='rejected', area_of_responsibility_id=area_ids[0]),
+            dict(employee_id=e0, date=future, shift_id=shift_ids[0], status='approved', area_of_responsibility_id=area_ids[1]),
+            dict(employee_id=e1, date=future, shift_id=shift_ids[1], status='approved', area_of_responsibility_id=None),
+            dict(employee_id=e2, date=END + timedelta(days=1), shift_id=shift_ids[0], status='approved', area_of_responsibility_id=None),
+        ]
+        db.session.add_all(ShiftRoster(hours=8, **e) for e in entries)
+        db.session.commit()
+        all_shifts = {s.id for s in Shift.query}
+
+    roster_reads = []
+    def record(conn, cursor, statement, *args):
+        if 'shift_roster' in statement:
+            roster_reads.append(statement)
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    rows = coverage(client, admin, '')['utilization']
+    event.remove(engine, 'before_cursor_execute', record)
+    if len(roster_reads) != 1:
+        support.fail(f'coverage read the roster {len(roster_reads)} times')
+    compare('per shift', rows, entries, lambda e: e['shift_id'], lambda r: r['shift_id'])
+    if {r['shift_id'] for r in rows} != all_shifts or len(rows) != len(all_shifts):
+        support.fail('every shift type should appear exactly once')
+
+    rows = coverage(client, admin, 'group_by=day')['utilization']
+    compare('per day', rows, entries, lambda e: (e['shift_id'], e['date'].isoformat()), lambda r: (r['shift_id'], r['date']))
+
+    rows = coverage(client, admin, 'group_by=day,area')['utilization']
+    compare('per day and area', rows, entries,
+            lambda e: (e['shift_id'], e['date'].isoformat(), e['area_of_responsibility_id']),
+            lambda r: (r['shift_id'], r['date'], r['area_id']))
+
+    rows = coverage(client, admin, f'area_id={area_ids[0]}')['utilization']
+    compare('one area', rows, [e for e in entries if e['area_of_responsibility_id'] == area_ids[0]],
+            lambda e: e['shift_id'], lambda r: r['shift_id'])
+
+    # The matrix has one cell per day for every shift, and per-day totals
+    body = coverage(client, admin, 'mode=matrix')
+    dates = [(START + timedelta(days=i)).isoformat() for i in range(7)]
+    if body['dates'] != dates or any(len(line['cells']) != 7 for line in body['shifts'] + [{'cells': body['totals']}]):
+        support.fail('matrix is not one cell per day')
+    cells = [dict(cell, shift_id=line['shift_id'], date=day)
+             for line in body['shifts'] for day, cell in zip(dates, line['cells'])]
+    compare('matrix cells', cells, entries, lambda e: (e['shift_id'], e['date'].isoformat()), lambda c: (c['shift_id'], c['date']))
+    totals = [dict(cell, date=day) for day, cell in zip(dates, body['totals'])]
+    compare('matrix totals', totals, entries, lambda e: e['date'].isoformat(), lambda c: c['date'])
+    print(f"matrix: {len(body['shifts'])} shifts x {len(dates)} days")
+
+    check('bad group_by', client.get(f'/api/analytics/shift-coverage?{RANGE}&group_by=week', headers=admin), 400)
+    check('reversed matrix', client.get(f'/api/analytics/shift-coverage?start_date={END}&end_date={START}&mode=matrix',
+                                        headers=admin), 400)
+    check('matrix over a year', client.get('/api/analytics/shift-coverage?start_date=2030-01-01&end_date=2031-01-02&mode=matrix',
+                                           headers=admin), 400)
+    check('coverage as employee', client.get('/api/analytics/shift-coverage', headers=support.login(client, support.EMPLOYEE)), 403)
+
+    support.cleanup(app)
+    print("SHIFT COVERAGE PASS")
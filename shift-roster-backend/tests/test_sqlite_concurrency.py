@@ -0,0 +1,137 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from sqlalchemy import Column, Date, Integer, MetaData, String, Table, create_engine, func, select, update
+from sqlalchemy.exc import OperationalError
+
+import support
+
+# Importing src builds the default app; keep it off the working database
+support.use_temp_database('sqlite-bench-app-')
+
+from src.models.engine import SQLITE_PRAGMA_PROFILES, install_sqlite_pragmas
+
+# Concurrent reader/writer throughput on a file SQLite database, with no
+# PRAGMAs ('none') versus the 'tuned' profile applied by create_app().
+#
+# Readers run export-style aggregate queries over a roster-sized table while
+# writers approve entries in small transactions, as managers do. With the
+# rollback journal every commit waits for the readers to drain and readers
+# queue behind the commit; under WAL they no longer block each other.
+# The profiles alternate over several rounds and are compared on their
+# totals, so a slow moment on a busy machine does not decide the result.
+
+DURATION = float(os.environ.get('BENCH_SECONDS', 3))
+READERS = int(os.environ.get('BENCH_READERS', 4))
+WRITERS = int(os.environ.get('BENCH_WRITERS', 2))
+ROUNDS = int(os.environ.get('BENCH_ROUNDS', 3))
+ROWS = 20000
+
+metadata = MetaData()
+roster = Table(
+    'shift_roster', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('employee_id', Integer, nullable=False),
+    Column('date', Date),
+    Column('status', String(20), nullable=False),
+)
+
+def make_engine(path, profile):
+    # Short driver timeout so lock waits come from busy_timeout when the profile sets one
+    engine = create_engine(f'sqlite:///{path}', connect_args={'timeout': 1})
+    install_sqlite_pragmas(engine, SQLITE_PRAGMA_PROFILES[profile])
+    return engine
+
+def seed(engine):
+    metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(roster.insert(), [
+            {'employee_id': i % 200, 'status': 'pending'} for i in range(ROWS)
+        ])
+
+def run(profile):
+    directory = tempfile.mkdtemp(prefix='sqlite-bench-')
+    path = os.path.join(directory, 'bench.db')
+    engine = make_engine(path, profile)
+    seed(engine)
+
+    counts = {'reads': 0, 'writes': 0, 'locked': 0}
+    lock = threading.Lock()
+    stop = time.monotonic() + DURATION
+
+    def count(key):
+        with lock:
+            counts[key] += 1
+
+    def reader():
+        query = select(roster.c.status, func.count()).group_by(roster.c.status)
+        while time.monotonic() < stop:
+            try:
+                with engine.connect() as conn:
+                    conn.execute(query).all()
+                count('reads')
+            except OperationalError:
+                count('locked')
+
+    def writer(offset):
+        row_id = offset
+        while time.monotonic() < stop:
+            row_id = row_id % ROWS + 1
+            try:
+                with engine.begin() as conn:
+                    conn.execute(update(roster).where(roster.c.id == row_id).values(status='approved'))
+                count('writes')
+            except OperationalError:
+                count('locked')
+
+    threads = [threading.Thread(target=reader) for _ in range(READERS)]
+    threads += [threading.Thread(target=writer, args=(i * 997,)) for i in range(WRITERS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    with engine.connect() as conn:
+        journal_mode = conn.exec_driver_sql('PRAGMA journal_mode').scalar()
+    engine.dispose()
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    os.rmdir(directory)
+
+    counts['journal_mode'] = journal_mode
+    return counts
+
+if __name__ == "__main__":
+    results = {profile: {'reads': 0, 'writes': 0, 'locked': 0} for profile in ('none', 'tuned')}
+    for _ in range(ROUNDS):
+        for profile, totals in results.items():
+            counts = run(profile)
+            for key in ('reads', 'writes', 'locked'):
+                totals[key] += counts[key]
+            totals['journal_mode'] = counts['journal_mode']
+    elapsed = DURATION * ROUNDS
+    for profile, r in results.items():
+        print(f"{profile:>5}: journal={r['journal_mode']:<6} "
+              f"reads/s={r['reads'] / elapsed:8.1f} writes/s={r['writes'] / elapsed:8.1f} locked={r['locked']}")
+
+    baseline, tuned = results['none'], results['tuned']
+    failures = []
+    if tuned['journal_mode'].lower() != 'wal':
+        failures.append(f"tuned profile journal_mode is {tuned['journal_mode']}, expected wal")
+    if tuned['locked']:
+        failures.append(f"tuned profile hit {tuned['locked']} 'database is locked' errors")
+    if tuned['reads'] + tuned['writes'] <= baseline['reads'] + baseline['writes']:
+        failures.append('tuned profile did not improve combined throughput')
+    if tuned['writes'] < baseline['writes']:
+        failures.append('tuned profile reduced write throughput')
+
+    if failures:
+        for failure in failures:
+            print("FAIL:", failure)
+        sys.exit(1)
+    support.cleanup()
+    print("SQLITE CONCURRENCY PASS")
@@ -0,0 +1,55 @@
+import os
+
+from sqlalchemy import create_engine
+
+import support
+
+# SQLite PRAGMA profiles: every connection of the app's engine runs the
+# 'tuned' profile, SQLITE_PRAGMAS overrides single entries, and 'none'
+# keeps SQLite's defaults. Throughput is compared in test_sqlite_concurrency.
+
+DB_PATH = support.use_temp_database('sqlite-pragmas-')
+
+# Importing src builds the default app against the empty database
+from src.models.engine import install_sqlite_pragmas, sqlite_pragmas
+from src.models.models import db
+
+CHECKED = ('journal_mode', 'synchronous', 'busy_timeout', 'mmap_size', 'cache_size', 'temp_store', 'foreign_keys')
+
+def read_pragmas(engine):
+    with engine.connect() as conn:
+        return {name: conn.exec_driver_sql(f'PRAGMA {name}').scalar() for name in CHECKED}
+
+def engine_with(config, name):
+    engine = create_engine(f"sqlite:///{os.path.join(os.path.dirname(DB_PATH), name)}")
+    install_sqlite_pragmas(engine, sqlite_pragmas(config))
+    return engine
+
+if __name__ == "__main__":
+    app = support.seeded_app()
+    tuned = {'journal_mode': 'wal', 'synchronous': 1, 'busy_timeout': 10000, 'mmap_size': 256 * 1024 * 1024,
+             'cache_size': -20000, 'temp_store': 2, 'foreign_keys': 0}
+    with app.app_context():
+        # Startup released its connections, so these are new ones from the pool
+        found = [read_pragmas(db.engine) for _ in range(2)]
+    print(f'app connections: {found[0]}')
+    if any(pragmas != tuned for pragmas in found):
+        support.fail(f'app connections run {found}, expected {tuned}')
+
+    overridden = read_pragmas(engine_with({'SQLITE_PRAGMA_PROFILE': 'tuned', 'SQLITE_PRAGMAS': {'foreign_keys': 'ON'}},
+                                          'override.db'))
+    if overridden != {**tuned, 'foreign_keys': 1}:
+        support.fail(f'SQLITE_PRAGMAS override gave {overridden}')
+
+    defaults = read_pragmas(engine_with({'SQLITE_PRAGMA_PROFILE': 'none'}, 'defaults.db'))
+    if defaults['journal_mode'] != 'delete' or defaults['mmap_size'] != 0:
+        support.fail(f"'none' profile changed the defaults: {defaults}")
+
+    try:
+        sqlite_pragmas({'SQLITE_PRAGMA_PROFILE': 'fast'})
+        support.fail('an unknown SQLITE_PRAGMA_PROFILE was accepted')
+    except ValueError:
+        pass
+
+    support.cleanup(app)
+    print("SQLITE PRAGMAS PASS")
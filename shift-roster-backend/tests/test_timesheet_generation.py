@@ -0,0 +1,105 @@
+import sqlite3
+from datetime import date, timedelta
+
+import support
+
+# /api/timesheets/generate: one pending timesheet per approved roster entry in
+# the range, idempotent across runs and concurrent runs, and reflected in the
+# dashboard rollups.
+
+DB_PATH = support.use_temp_database('timesheet-generation-')
+
+# Importing src builds the default app against the empty database
+from sqlalchemy.exc import IntegrityError
+from src.models.models import db, DashboardDailyRollup, Shift, ShiftRoster, Timesheet, User
+from src.routes import timesheets
+from support import check
+
+def generate(client, start, end, **extra):
+    r = check(f'generate {start}..{end}', client.post('/api/timesheets/generate', json={
+        'start_date': start.isoformat(), 'end_date': end.isoformat(), **extra
+    }), 201)
+    return r.get_json()['created']
+
+if __name__ == "__main__":
+    app = support.seeded_app()
+    client = app.test_client()
+    admin = support.login(client)
+    with app.app_context():
+        employee_ids = [u.id for u in User.query.order_by(User.id)]
+        shift_id = Shift.query.filter(Shift.name != 'On Leave').first().id
+
+    start = date(2030, 6, 1)
+    r = check('bulk create', client.post('/api/roster/bulk', headers=admin, json={'return': 'ids', 'entries': [
+        {'employee_id': employee_id, 'shift_id': shift_id, 'hours': 6 + i, 'date': (start + timedelta(days=i)).isoformat()}
+        for employee_id in employee_ids for i in range(4)
+    ]}), 201)
+    # Approve the first three days; the fourth stays pending
+    with app.app_context():
+        ShiftRoster.query.filter(ShiftRoster.date < start + timedelta(days=3)).update({'status': 'approved'})
+        db.session.commit()
+
+    # Only approved entries inside the range get a timesheet
+    if generate(client, start + timedelta(days=1), start + timedelta(days=3)) != 2 * len(employee_ids):
+        support.fail('generation did not cover exactly the approved entries in the range')
+    with app.app_context():
+        for ts in Timesheet.query:
+            roster = ts.roster
+            if (ts.employee_id, ts.date, float(ts.hours_worked), ts.status) != \
+                    (roster.employee_id, roster.date, float(roster.hours), 'pending'):
+                support.fail(f'timesheet {ts.id} does not match roster entry {roster.id}')
+        rollup = db.session.get(DashboardDailyRollup, start + timedelta(days=1))
+        if rollup is None or rollup.pending_timesheets != len(employee_ids):
+            support.fail(f'rollup for {start + timedelta(days=1)} does not count the new timesheets')
+
+    # Runs are idempotent
+    if generate(client, start, start + timedelta(days=3)) != len(employee_ids):
+        support.fail('second run did not add only the entries outside the first range')
+    if generate(client, start, start + timedelta(days=3)) != 0:
+        support.fail('third run created timesheets again')
+
+    # The unique roster_id index rejects a second timesheet for an entry
+    with app.app_context():
+        ts = Timesheet.query.first()
+        db.session.add(Timesheet(employee_id=ts.employee_id, roster_id=ts.roster_id, date=ts.date,
+                                 hours_worked=ts.hours_worked, status='pending'))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            print('duplicate timesheet rejected')
+        else:
+            support.fail('a second timesheet for one roster entry was accepted')
+
+    # A concurrent run that commits first makes ours retry against its rows;
+    # the employee filter keeps the retry to that employee's entry
+    with app.app_context():
+        ShiftRoster.query.update({'status': 'approved'})
+        db.session.commit()
+        pending_day = start + timedelta(days=3)
+        rosters = [(r.id, r.employee_id) for r in ShiftRoster.query.filter_by(date=pending_day).order_by(ShiftRoster.id)]
+    real_insert = timesheets._insert_missing_timesheets
+    calls = []
+    def racing_insert(start_dt, end_dt, employee_id=None):
+        calls.append(employee_id)
+        if len(calls) == 1:
+            conn = sqlite3.connect(DB_PATH)
+            conn.execute("INSERT INTO timesheets (employee_id, roster_id, date, hours_worked, status) "
+                         "VALUES (?, ?, ?, 9, 'pending')", (rosters[0][1], rosters[0][0], pending_day.isoformat()))
+            conn.commit()
+            conn.close()
+            raise IntegrityError('INSERT INTO timesheets', None, Exception('UNIQUE constraint failed'))
+        return real_insert(start_dt, end_dt, employee_id)
+    timesheets._insert_missing_timesheets = racing_insert
+    created = generate(client, pending_day, pending_day, employee_id=rosters[0][1])
+    timesheets._insert_missing_timesheets = real_insert
+    if len(calls) != 2 or created != 0:
+        support.fail(f'retry after a concurrent run: {len(calls)} attempts, {created} created')
+    if generate(client, pending_day, pending_day) != len(employee_ids) - 1:
+        support.fail('the rest of the day was not generated')
+    with app.app_context():
+        if Timesheet.query.count() != ShiftRoster.query.count():
+            support.fail('every roster entry should now have exactly one timesheet')
+
+    support.cleanup(app)
+    print("TIMESHEET GENERATION PASS")